@@ -6,22 +6,93 @@ ai class model
 
 import threading
 
+from ai.evaluation_cache import shared_evaluation_cache
+from bitboard import COLOR_INDEX
+from book import opening_book
 from move import Move
 from position import Position
+from tablebase import tablebase
+
+DEFAULT_TIME_LIMIT = 5.0  # seconds
 
 
 class Ai:
-    def __init__(self, position: Position, color: str):
-        self.position = position
+    # time budget of a move, for the AIs which search
+    time_limit = DEFAULT_TIME_LIMIT
+    # AIs which can search the position after the expected reply during the opponent's
+    # time (see Engine.ponder); the time budget is ignored while pondering is True
+    can_ponder = False
+    pondering = False
+    # play the moves of the opening book (config.BOOK_FILE) when there is one
+    use_book = True
+    # play the moves of the endgame tables (config.TABLEBASE_DIR) when there are some
+    use_tablebase = True
+
+    def __init__(self, position: Position, color: str, start: bool = True):
+        # the search plays moves on its own copy, the game keeps showing the real position
+        self.position = position.copy()
         self.color = color
         self.get_next_move_finished = False
+        self.stop_requested = False
         self.move: Move
+        # expected moves (ints, see Position.legal_codes) from the position searched
+        self.principal_variation: list[int] = []
+        # scores of the positions already evaluated, kept between moves
+        self.evaluation_cache = shared_evaluation_cache()
 
         # create thread on method get_next_move, the game object will
         # use get_next_move_finished to detect end of thread
-        thread = threading.Thread(target=self.get_next_move, args=())
-        thread.daemon = True
-        thread.start()
+        # (start=False: the AI object is only used to search, e.g. in a worker process)
+        if start:
+            thread = threading.Thread(target=self.get_next_move, args=())
+            thread.daemon = True
+            thread.start()
 
     def get_next_move(self) -> None:
         pass
+
+    def search(self, position: Position, time_limit: float | None = None) -> None:
+        # search position in the calling thread (see ai/engine.py), the AI object and its
+        # caches are kept from one move to the next. stop_requested is not reset here but
+        # by the caller when the job starts: a stop sent before the search runs is kept
+        self.position = position.copy()
+        if time_limit is not None:
+            self.time_limit = time_limit
+        self.get_next_move_finished = False
+        self.get_next_move()
+
+    def get_book_move(self) -> Move | None:
+        # move of the opening book for the position, None if out of book
+        book = opening_book() if self.use_book else None
+        if book is None:
+            return None
+        return self.known_move(book.choose(self.position))
+
+    def get_tablebase_move(self) -> Move | None:
+        # best move of the endgame tables for the position, None if it is not in the tables
+        tables = tablebase() if self.use_tablebase else None
+        if tables is None:
+            return None
+        return self.known_move(tables.best_move(self.position))
+
+    def known_move(self, code: int) -> Move | None:
+        # Move of a legal move code of the book or the tables, None for 0 (no move). Built
+        # from the code: valid_moves only keeps the queen promotion of each pawn move
+        if not code:
+            return None
+        move = self.position.move_from_code(code)
+        if move.is_promotion:
+            move.promotion = "NBRQ"[code >> 12 & 3]
+        return move
+
+    def stop(self) -> None:
+        # the search returns as soon as possible with the best move found so far
+        self.stop_requested = True
+
+    def quit(self) -> None:
+        # the AI is not used any more (game over or restarted): release what it holds
+        self.stop()
+
+    def evaluate_board(self, position: Position, color: str) -> int:
+        # score of position for color ("w" or "b"), higher is better
+        return self.evaluation_cache.evaluate(position, COLOR_INDEX[color])
@@ -7,16 +7,14 @@ basic ai class; evaluate board and go with move giving the biggest note
 from random import randint
 
 from ai.ai import Ai
+from bitboard import COLOR_INDEX
 from move import Move
-from piece import Piece
 from position import Position
 
-PIECE_VALUE = {"P": 10, "N": 30, "B": 30, "R": 50, "Q": 90, "K": 900}
-
 
 class Basic_Ai(Ai):
-    def __init__(self, position: Position, color: str):
-        super().__init__(position, color)
+    def __init__(self, position: Position, color: str, start: bool = True):
+        super().__init__(position, color, start)
 
     def get_next_move(self) -> None:
         # to be implemented by each AI
@@ -29,22 +27,30 @@ class Basic_Ai(Ai):
 
         self.move = self.get_get_best_move()
 
-        # promotion special case => always choose queen
-        if self.move.chess_move[0].islower():
-            if (self.color == "w" and self.move.square_to[0] == 0) or (
-                self.color == "b" and self.move.square_to[0] == 7
-            ):
-                self.move.chess_move += "Q"
+        # promotion special case => always choose queen, unless the move comes from the book
+        # or the tables (promoted piece already set, see Ai.known_move)
+        if self.move.is_promotion and not self.move.promotion:
+            self.move.promotion = "Q"
 
         self.get_next_move_finished = True
 
     def get_get_best_move(self) -> Move:
+        # no evaluation while in the opening book or the endgame tables
+        known_move = self.get_book_move() or self.get_tablebase_move()
+        if known_move is not None:
+            return known_move
+
+        # one ply: the incremental evaluation (ai/evaluation.py) of each child is cheaper
+        # than encoding the children for the batch evaluation (ai/batch_evaluation.py)
+        position = self.position
+        color = COLOR_INDEX[self.color]
         move_scores: list[tuple[Move, int]] = []
 
         max_score = -9999999999
-        for move in self.position.valid_moves:
-            board = self.position.get_board_after_move(move, self.position.board, self.color)
-            score = self.evaluate_board(board, self.color)
+        for move in position.valid_moves:
+            position.push(move.code)
+            score = self.evaluation_cache.evaluate(position, color)
+            position.pop()
             if score > max_score:
                 max_score = score
             move_scores.append((move, score))
@@ -52,18 +58,3 @@ class Basic_Ai(Ai):
         chosen_moves = [x[0] for x in move_scores if x[1] == max_score]
 
         return chosen_moves[randint(0, len(chosen_moves) - 1)]
-
-    def evaluate_board(self, board: list[list[Piece]], color: str) -> int:
-        score = 0
-        for line in range(8):
-            for col in range(8):
-                if board[line][col]:
-                    value = PIECE_VALUE[board[line][col].piece]
-                    if board[line][col].color == "w":
-                        score += value
-                    else:
-                        score -= value
-
-        if color == "b":
-            score = -score
-        return score
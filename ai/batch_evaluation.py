@@ -0,0 +1,139 @@
+"""
+
+evaluation of many positions at once with numpy
+
+positions are encoded as an (N, 64) int8 array of piece codes (EMPTY = -1, square order of
+bitboard.py); material and piece-square scores of all of them are summed with one table
+lookup and reduction. The bitboards and pawn keys of the pawn structure terms are built the
+same way, the terms themselves come from the pawn hash table. Scores are the same as
+evaluate in ai/evaluation.py.
+
+"""
+
+from collections.abc import Iterable
+
+import numpy as np
+import numpy.typing as npt
+
+from ai.evaluation import FREE_PASSED_PAWN, ROOK_OPEN_FILE
+from ai.evaluation_cache import EvaluationCache
+from ai.pawn_hash import PawnHashTable, shared_pawn_table
+from bitboard import BLACK, EMPTY, PAWN, ROOK, WHITE
+from position import Position
+from pst import EG_TABLE, MAX_PHASE, MG_TABLE, PHASE_WEIGHT
+from zobrist import PIECE_KEYS
+
+# one row per piece code, the last row (index -1 = EMPTY) is worth nothing
+_MG_TABLE = np.array(MG_TABLE + [[0] * 64], dtype=np.int64)
+_EG_TABLE = np.array(EG_TABLE + [[0] * 64], dtype=np.int64)
+_PHASE_WEIGHT = np.array(PHASE_WEIGHT + [0], dtype=np.int64)
+_SQUARES = np.arange(64)
+_BIT_INDEX = np.arange(64, dtype=np.uint64)
+_BITS = np.uint64(1) << _BIT_INDEX
+_PAWN_KEYS = np.zeros((13, 64), dtype=np.uint64)
+for _pawn in (WHITE * 6 + PAWN, BLACK * 6 + PAWN):
+    _PAWN_KEYS[_pawn] = PIECE_KEYS[_pawn * 64 : _pawn * 64 + 64]
+
+assert EMPTY == -1
+
+
+def encode(boards: Iterable[list[int]]) -> npt.NDArray[np.int8]:
+    # (N, 64) array of piece codes from mailboxes (e.g. BitBoard.squares)
+    return np.array(list(boards), dtype=np.int8).reshape(-1, 64)
+
+
+def encode_children(position: Position, moves: list[int]) -> npt.NDArray[np.int8]:
+    # boards after each move of position (moves as ints, see Position.legal_codes)
+    boards = np.empty((len(moves), 64), dtype=np.int8)
+    for index, move in enumerate(moves):
+        position.push(move)
+        boards[index] = position.bitboard.squares
+        position.pop()
+    return boards
+
+
+def structure_batch(
+    boards: npt.NDArray[np.int8], table: PawnHashTable
+) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.int64]]:
+    # middlegame and endgame pawn structure scores (white - black) of each board
+    # pawn terms from the table, the pawn bitboards are only built for the misses
+    white_pawns = boards == WHITE * 6 + PAWN
+    black_pawns = boards == BLACK * 6 + PAWN
+    keys = np.bitwise_xor.reduce(_PAWN_KEYS[boards, _SQUARES], axis=1).tolist()
+    entries = []
+    for index, key in enumerate(keys):
+        entry = table.get(key)
+        if entry is None:
+            entry = table.put(
+                key,
+                int(_BITS[white_pawns[index]].sum()),
+                int(_BITS[black_pawns[index]].sum()),
+            )
+        entries.append(entry)
+    _, mg_pawns, eg_pawns, passed_masks, open_masks = zip(*entries, strict=True)
+    mg_score = np.array(mg_pawns, dtype=np.int64)
+    eg_score = np.array(eg_pawns, dtype=np.int64)
+
+    if any(open_masks):
+        # rooks on open files
+        open_files = (np.array(open_masks, dtype=np.uint64)[:, None] >> _BIT_INDEX) & 1 == 1
+        rooks = np.count_nonzero(open_files & (boards == WHITE * 6 + ROOK), axis=1)
+        rooks -= np.count_nonzero(open_files & (boards == BLACK * 6 + ROOK), axis=1)
+        mg_score += ROOK_OPEN_FILE[0] * rooks
+        eg_score += ROOK_OPEN_FILE[1] * rooks
+
+    if any(passed_masks):
+        # passed pawns whose next square is empty (white pawns go toward line 0)
+        passed = (np.array(passed_masks, dtype=np.uint64)[:, None] >> _BIT_INDEX) & 1 == 1
+        empty = boards == EMPTY
+        free = np.count_nonzero(passed[:, 8:] & white_pawns[:, 8:] & empty[:, :-8], axis=1)
+        free -= np.count_nonzero(passed[:, :-8] & black_pawns[:, :-8] & empty[:, 8:], axis=1)
+        eg_score += FREE_PASSED_PAWN * free
+    return mg_score, eg_score
+
+
+def evaluate_batch(
+    boards: npt.NDArray[np.int8],
+    colors: int | npt.NDArray[np.int8] = WHITE,
+    table: PawnHashTable | None = None,
+) -> npt.NDArray[np.int64]:
+    # score in centipawns of each board from the point of view of colors (one or one per board)
+    codes = boards.astype(np.intp)
+    mg_structure, eg_structure = structure_batch(boards, table or shared_pawn_table())
+    mg_score = _MG_TABLE[codes, _SQUARES].sum(axis=1) + mg_structure
+    eg_score = _EG_TABLE[codes, _SQUARES].sum(axis=1) + eg_structure
+    phase = np.minimum(_PHASE_WEIGHT[codes].sum(axis=1), MAX_PHASE)
+    # tapered from the side of color, as in evaluate
+    sign = np.where(np.asarray(colors) == WHITE, 1, -1)
+    mg_score *= sign
+    eg_score *= sign
+    scores: npt.NDArray[np.int64] = (mg_score * phase + eg_score * (MAX_PHASE - phase)) // MAX_PHASE
+    return scores
+
+
+def evaluate_children(
+    position: Position, moves: list[int], color: int, cache: EvaluationCache | None = None
+) -> npt.NDArray[np.int64]:
+    # scores for color of the positions after each move, the ones in cache are not evaluated
+    scores = np.empty(len(moves), dtype=np.int64)
+    missing: list[int] = []
+    keys: list[int] = []
+    boards: list[list[int]] = []
+    for index, move in enumerate(moves):
+        position.push(move)
+        score = cache.get(position.key, color) if cache is not None else None
+        if score is None:
+            missing.append(index)
+            keys.append(position.key)
+            boards.append(position.bitboard.squares[:])
+        else:
+            scores[index] = score
+        position.pop()
+
+    if missing:
+        computed = evaluate_batch(encode(boards), color)
+        scores[missing] = computed
+        if cache is not None:
+            for key, score in zip(keys, computed.tolist(), strict=True):
+                cache.put(key, color, score)
+    return scores
@@ -0,0 +1,124 @@
+"""
+
+engine: one long-lived thread per AI player, fed with positions to search
+
+the AI object (and its caches: move ordering history, worker pool, ...) is kept for the
+whole game. A new search first stops the running one, stop makes the search return its best
+move so far, and quit ends the thread (e.g. when the game is restarted) and the AI (the
+worker processes of the parallel AI).
+
+pondering: during the opponent's time, the engine searches the position after the reply
+expected by its last search (second move of the principal variation), without time limit.
+If the opponent plays it (ponder hit), the running search goes on with the time budget
+counted from its start, so the answer comes (almost) at once; otherwise the new search
+stops it.
+
+"""
+
+import queue
+import threading
+
+from ai.ai import Ai
+from move import Move
+from position import Position
+
+# search job: job number, position, time budget (None: the AI default)
+JobT = tuple[int, Position, float | None]
+
+
+class Engine:
+    def __init__(self, ai: Ai) -> None:
+        # ai is built with start=False: its searches run in the engine thread
+        self.ai = ai
+        self.jobs: queue.Queue[JobT | None] = queue.Queue()
+        self.job_number = 0
+        self.move: Move | None = None
+        self.finished = False
+
+        # pondering: job number of the ponder search (0: none), position before the
+        # expected reply, and the reply
+        self.lock = threading.Lock()
+        self.ponder_job = 0
+        self.ponder_base: Position | None = None
+        self.ponder_move = 0
+        # job number of the last stop request: a job stopped before it starts stays stopped
+        self.stopped_job = 0
+        self.thread = threading.Thread(target=self.run, args=())
+        self.thread.daemon = True
+        self.thread.start()
+
+    def search(
+        self, position: Position, time_limit: float | None = None, ponder: bool = False
+    ) -> None:
+        # search position in the background, result in move once finished is True
+        with self.lock:
+            # the running search is stopped with the same lock held as the job number
+            # change: it can not start after the check of its number and miss the stop
+            self.job_number += 1
+            self.ai.stop()
+            self.ponder_job = self.job_number if ponder else 0
+            self.move = None
+            self.finished = False
+            self.jobs.put((self.job_number, position.copy(), time_limit))
+
+    def ponder(self, position: Position) -> None:
+        # position: after the move of the engine, the opponent is to play
+        variation = self.ai.principal_variation
+        if not self.ai.can_ponder or len(variation) < 2:
+            return
+        reply = variation[1]
+        if reply not in position.legal_codes():
+            return
+        self.ponder_base = position.copy()
+        self.ponder_move = reply
+        expected = position.copy()
+        expected.make_move(expected.move_from_code(reply))
+        self.search(expected, ponder=True)
+
+    def ponder_hit(self, move: Move) -> bool:
+        # the opponent played move: True if it was expected, the ponder search is then the
+        # search of the move, with the time budget counted from its start
+        with self.lock:
+            if not self.ponder_job or self.ponder_job != self.job_number:
+                return False
+            assert self.ponder_base is not None
+            if self.ponder_base.code_from_move(move) != self.ponder_move:
+                return False
+            self.ponder_job = 0
+            self.ai.pondering = False
+        return True
+
+    def stop(self) -> None:
+        # the running search returns its best move so far
+        with self.lock:
+            self.stopped_job = self.job_number
+            self.ai.stop()
+
+    def quit(self) -> None:
+        with self.lock:
+            # the jobs still queued are dropped
+            self.job_number += 1
+            self.ai.stop()
+        self.jobs.put(None)
+        self.thread.join()
+        self.ai.quit()
+
+    def run(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            job_number, position, time_limit = job
+            with self.lock:
+                if job_number != self.job_number:
+                    # replaced by a newer search before starting
+                    continue
+                self.ai.pondering = job_number == self.ponder_job
+                # the stop requests belong to the job
+                self.ai.stop_requested = job_number == self.stopped_job
+            self.ai.search(position, time_limit)
+            with self.lock:
+                # a search stopped by a newer one is not the answer
+                if job_number == self.job_number:
+                    self.move = self.ai.move if self.ai.get_next_move_finished else None
+                    self.finished = True
@@ -0,0 +1,54 @@
+"""
+
+evaluation of a position shared by the AIs: material and piece-square tables plus pawn
+structure, tapered between middlegame and endgame by the game phase
+
+the material and piece-square scores are kept up to date by Position make / unmake move
+(see pst.py) and the pawn structure terms come from the pawn hash table (see pawn_hash.py),
+so evaluating a leaf hardly looks at the board
+
+"""
+
+from ai.pawn_hash import PawnHashTable, shared_pawn_table
+from bitboard import BLACK, PAWN, ROOK, WHITE
+from position import Position
+from pst import tapered
+
+# (middlegame, endgame) per rook on a file without pawns
+ROOK_OPEN_FILE = (25, 10)
+# endgame bonus of a passed pawn whose next square is empty
+FREE_PASSED_PAWN = 15
+
+
+def structure_scores(
+    table: PawnHashTable, key: int, pieces: list[int], occupied: int
+) -> tuple[int, int]:
+    # middlegame and endgame score (white - black) of the pawn structure terms
+    # pieces: bitboards by piece code (BitBoard.pieces), key: pawn key of the position
+    white_pawns, black_pawns = pieces[WHITE * 6 + PAWN], pieces[BLACK * 6 + PAWN]
+    _, mg_score, eg_score, passed, open_files = table.probe(key, white_pawns, black_pawns)
+    if open_files:
+        white_rooks = (pieces[WHITE * 6 + ROOK] & open_files).bit_count()
+        black_rooks = (pieces[BLACK * 6 + ROOK] & open_files).bit_count()
+        mg_score += ROOK_OPEN_FILE[0] * (white_rooks - black_rooks)
+        eg_score += ROOK_OPEN_FILE[1] * (white_rooks - black_rooks)
+    if passed:
+        # white pawns go toward line 0
+        free = ((passed & white_pawns) >> 8 & ~occupied).bit_count()
+        free -= ((passed & black_pawns) << 8 & ~occupied).bit_count()
+        eg_score += FREE_PASSED_PAWN * free
+    return mg_score, eg_score
+
+
+def evaluate(position: Position, color: int, table: PawnHashTable | None = None) -> int:
+    # score in centipawns from the point of view of color
+    bitboard = position.bitboard
+    mg_score, eg_score = structure_scores(
+        table or shared_pawn_table(), position.pawn_key, bitboard.pieces, bitboard.occupied
+    )
+    mg_score += position.mg_score
+    eg_score += position.eg_score
+    if color == WHITE:
+        return tapered(mg_score, eg_score, position.phase)
+    # tapered from black's side, so that a mirrored position gets exactly the same score
+    return tapered(-mg_score, -eg_score, position.phase)
@@ -0,0 +1,111 @@
+"""
+
+Evaluation cache: scores of positions already evaluated, by zobrist key and color
+
+the same boards come back again and again (transpositions in a search, the same openings in
+batch games), so the evaluation is only computed once per position while it stays in the
+cache. The cache holds at most max_entries scores in fixed slots, replaced with the CLOCK
+scheme (an approximation of least recently used): a hand goes round the slots, a slot read
+since the hand last passed gets a second chance, the first other one is replaced.
+
+"""
+
+from random import Random
+
+from ai.evaluation import evaluate
+from position import Position
+
+DEFAULT_MAX_ENTRIES = 1 << 16
+
+# xored to the zobrist key: the scores of both colors of a position are separate entries
+_random = Random(0xE7A1)
+COLOR_KEYS = [0, _random.getrandbits(64)]
+
+
+class EvaluationCache:
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max(1, max_entries)
+        # entry key => slot
+        self.slots: dict[int, int] = {}
+        self.keys = [0] * self.max_entries
+        self.scores = [0] * self.max_entries
+        self.referenced = bytearray(self.max_entries)
+        self.hand = 0
+        self.used = 0
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self) -> None:
+        self.slots.clear()
+        self.referenced = bytearray(self.max_entries)
+        self.hand = self.used = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: int, color: int) -> int | None:
+        # score of the position with zobrist key for color, None if not cached
+        entry = key ^ COLOR_KEYS[color]
+        slot = self.slots.get(entry)
+        # the slot may have been given to another entry meanwhile by another AI thread
+        if slot is None or self.keys[slot] != entry:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.referenced[slot] = 1
+        return self.scores[slot]
+
+    def put(self, key: int, color: int, score: int) -> None:
+        entry = key ^ COLOR_KEYS[color]
+        slot = self.slots.get(entry)
+        if slot is None:
+            if self.used < self.max_entries:
+                slot = self.used
+                self.used += 1
+            else:
+                slot = self.replaced_slot()
+            self.slots[entry] = slot
+            self.keys[slot] = entry
+        self.scores[slot] = score
+
+    def replaced_slot(self) -> int:
+        # first slot not read since the last turn of the hand, its entry is dropped
+        referenced = self.referenced
+        hand = self.hand
+        while referenced[hand]:
+            referenced[hand] = 0
+            hand = (hand + 1) % self.max_entries
+        self.hand = (hand + 1) % self.max_entries
+        self.slots.pop(self.keys[hand], None)
+        self.evictions += 1
+        return hand
+
+    def evaluate(self, position: Position, color: int) -> int:
+        # evaluate (ai/evaluation.py) of the position, computed once while cached
+        score = self.get(position.key, color)
+        if score is None:
+            score = evaluate(position, color)
+            self.put(position.key, color, score)
+        return score
+
+    def stats(self) -> dict[str, float]:
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": self.used,
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+
+_shared_cache: EvaluationCache | None = None
+
+
+def shared_evaluation_cache() -> EvaluationCache:
+    # cache kept between moves and shared by the AIs of the process
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = EvaluationCache()
+    return _shared_cache
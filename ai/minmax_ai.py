@@ -1,72 +1,445 @@
 """
 
-minmax ai class; evaluate board with minmax at depth 3 and go with move giving the biggest note
+minmax ai class; negamax search with alpha-beta pruning and iterative deepening
+
+the search goes one ply deeper at each iteration until the depth limit or the time limit
+is reached, the move played is the best move of the last completed iteration
+
+selective search: null move pruning, late move reductions, futility pruning and razoring
+cut the moves unlikely to matter short, check extensions search the forcing lines deeper
+and mate distance pruning stops the search once a shorter mate is known. Each of them can
+be turned off (Minmax_Ai.use_... attributes) to measure what it brings, Plain_Minmax_Ai
+searches without any of them.
 
 """
 
-from random import randint
+import time
+from random import shuffle
+
+from loguru import logger
 
-from ai.ai import Ai
+from ai.ai import DEFAULT_TIME_LIMIT, Ai
+from ai.move_ordering import MAX_PLY, MoveOrdering
+from ai.pawn_hash import shared_pawn_table
+from ai.transposition import (
+    EXACT,
+    LOWER_BOUND,
+    UPPER_BOUND,
+    TranspositionTable,
+    shared_table,
+)
+from bitboard import BISHOP, CAPTURE, EP_CAPTURE, KNIGHT, PAWN, PROMOTION, QUEEN, ROOK
 from move import Move
-from piece import Piece
 from position import Position
+from pst import MG_VALUE
+from tablebase import DRAW, MAX_PIECES, WIN, decode, tablebase
+
+# quiescence: captures which can not raise alpha even with this margin (centipawns)
+# are not searched
+DELTA_MARGIN = 200
+
+# null move pruning: depth reduction of the search after a pass, and minimal depth
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# late move reductions: moves searched at full depth before the others are reduced
+# (the tt move, captures, killers and countermove are ordered first), minimal depth
+LMR_FULL_DEPTH_MOVES = 3
+LMR_MIN_DEPTH = 3
+# futility pruning and razoring below this depth, margins per ply of depth left (centipawns)
+FRONTIER_DEPTH = 3
+FUTILITY_MARGIN = 150
+RAZOR_MARGIN = 300
+
+MATE_SCORE = 1000000
+INFINITY = MATE_SCORE + 1
+
+DEFAULT_DEPTH = 4
+# the clock (and stop request) is only read every NODES_BETWEEN_TIME_CHECKS nodes
+NODES_BETWEEN_TIME_CHECKS = 256
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+def score_to_table(score: int, ply: int) -> int:
+    # mate scores are stored as distance from the position, not from the root
+    if score >= MATE_SCORE - MAX_PLY:
+        return score + ply
+    if score <= -(MATE_SCORE - MAX_PLY):
+        return score - ply
+    return score
 
-PIECE_VALUE = {"P": 10, "N": 30, "B": 30, "R": 50, "Q": 90, "K": 900}
+
+def score_from_table(score: int, ply: int) -> int:
+    if score >= MATE_SCORE - MAX_PLY:
+        return score - ply
+    if score <= -(MATE_SCORE - MAX_PLY):
+        return score + ply
+    return score
+
+
+def score_from_tablebase(value: int, ply: int) -> int:
+    # score of a tablebase value (see tablebase.decode) found at ply
+    result, plies = decode(value)
+    if result == DRAW:
+        return 0
+    score = MATE_SCORE - min(ply + plies, MAX_PLY - 1)
+    return score if result == WIN else -score
 
 
 class Minmax_Ai(Ai):
-    def __init__(self, position: Position, color: str):
-        super().__init__(position, color)
+    can_ponder = True
+    # selective search features
+    use_null_move = True
+    use_late_move_reductions = True
+    # futility pruning and razoring at frontier nodes
+    use_futility = True
+    use_check_extensions = True
+    use_mate_distance_pruning = True
 
-    def get_next_move(self) -> None:
-        # to be implemented by each AI
-        # example of a totally random AI
+    def __init__(
+        self,
+        position: Position,
+        color: str,
+        max_depth: int = DEFAULT_DEPTH,
+        time_limit: float = DEFAULT_TIME_LIMIT,
+        transposition_table: TranspositionTable | None = None,
+        start: bool = True,
+    ):
+        # set before the search thread is started by Ai
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        # the table is shared by all the searches of the game by default
+        self.transposition_table = transposition_table or shared_table()
+        self.tablebase = tablebase() if self.use_tablebase else None
+        self.move_ordering = MoveOrdering()
+        self.deadline = 0.0
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.depth_reached = 0
+        # plies from the root up to which checks are extended (twice the iteration depth)
+        self.extension_limit = 0
+        # statistics of the selective search
+        self.null_move_cutoffs = 0
+        self.reductions = 0
+        self.futility_prunes = 0
+        super().__init__(position, color, start)
 
+    def get_next_move(self) -> None:
         valid_move = self.position.valid_moves
 
         if not valid_move:
             return
 
-        self.move = self.get_get_best_move()
+        # no search while in the opening book or the endgame tables
+        known_move = self.get_book_move() or self.get_tablebase_move()
+        if known_move is not None:
+            self.move = known_move
+            self.principal_variation = [known_move.code]
+        else:
+            self.move = self.get_get_best_move()
 
-        # promotion special case => always choose queen
-        if self.move.chess_move[0].islower():
-            if (self.color == "w" and self.move.square_to[0] == 0) or (
-                self.color == "b" and self.move.square_to[0] == 7
-            ):
-                self.move.chess_move += "Q"
+        # promotion special case => always choose queen, unless the move comes from the book
+        # or the tables (promoted piece already set, see Ai.known_move)
+        if self.move.is_promotion and known_move is None:
+            self.move.promotion = "Q"
 
         self.get_next_move_finished = True
 
-    def minmax(self) -> None:
-        pass
-
     def get_get_best_move(self) -> Move:
-        move_scores: list[tuple[Move, int]] = []
-
-        max_score = -9999999999
-        for move in self.position.valid_moves:
-            board = self.position.get_board_after_move(move, self.position.board, self.color)
-            score = self.evaluate_board(board, self.color)
-            if score > max_score:
-                max_score = score
-            move_scores.append((move, score))
-
-        chosen_moves = [x[0] for x in move_scores if x[1] == max_score]
-
-        return chosen_moves[randint(0, len(chosen_moves) - 1)]
-
-    def evaluate_board(self, board: list[list[Piece]], color: str) -> int:
-        score = 0
-        for line in range(8):
-            for col in range(8):
-                if board[line][col]:
-                    value = PIECE_VALUE[board[line][col].piece]
-                    if board[line][col].color == "w":
-                        score += value
-                    else:
-                        score -= value
-
-        if color == "b":
-            score = -score
-        return score
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.quiescence_nodes = 0
+        self.depth_reached = 0
+        self.null_move_cutoffs = self.reductions = self.futility_prunes = 0
+        self.transposition_table.new_search()
+        self.move_ordering.new_search()
+        root_length = len(self.position.history)
+
+        # moves with the same score: the first one searched is kept, shuffle to vary the games
+        root_moves = {move.code: move for move in self.position.valid_moves}
+        codes = list(root_moves)
+        shuffle(codes)
+        best_move = codes[0]
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                move, score = self.search_root(codes, depth)
+            except SearchTimeout:
+                # unfinished iteration: back to the root position, keep previous best move
+                while len(self.position.history) > root_length:
+                    self.position.pop()
+                break
+            best_move = move
+            self.depth_reached = depth
+            # best move searched first at next iteration
+            codes.remove(best_move)
+            codes.insert(0, best_move)
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+
+        self.principal_variation = self.get_principal_variation(best_move)
+        elapsed = time.perf_counter() - start
+        stats = self.transposition_table.stats()
+        evaluation_stats = self.evaluation_cache.stats()
+        pawn_stats = shared_pawn_table().stats()
+        logger.debug(
+            f"minmax: depth {self.depth_reached} nodes {self.nodes} "
+            f"(quiescence {self.quiescence_nodes}) "
+            f"time {elapsed:.2f}s move {root_moves[best_move]} "
+            f"tt hits {stats['hits']} misses {stats['misses']} collisions {stats['collisions']} "
+            f"first move cutoffs {self.move_ordering.first_move_cutoff_rate():.0%} "
+            f"evaluation cache hit rate {evaluation_stats['hit_rate']:.0%} "
+            f"pawn hash hit rate {pawn_stats['hit_rate']:.0%} "
+            f"null move cutoffs {self.null_move_cutoffs} reductions {self.reductions} "
+            f"futility prunes {self.futility_prunes}"
+        )
+        return root_moves[best_move]
+
+    def time_is_up(self) -> bool:
+        if self.stop_requested:
+            return True
+        return not self.pondering and time.perf_counter() > self.deadline
+
+    def get_principal_variation(self, best_move: int) -> list[int]:
+        # best move then the moves of the transposition table, while they are legal
+        position = self.position
+        variation = [best_move]
+        position.push(best_move)
+        while len(variation) < max(self.depth_reached, 2):
+            entry = self.transposition_table.probe(position.key)
+            if entry is None or entry[0] not in position.legal_codes():
+                break
+            variation.append(entry[0])
+            position.push(entry[0])
+        for _ in variation:
+            position.pop()
+        return variation
+
+    def search_root(self, codes: list[int], depth: int, alpha: int = -INFINITY) -> tuple[int, int]:
+        # best move and score; (codes[0], alpha) if no move scores above alpha
+        position = self.position
+        best_move = codes[0]
+        self.extension_limit = 2 * depth
+        for move in codes:
+            position.push(move)
+            score = -self.negamax(depth - 1, -INFINITY, -alpha, 1)
+            position.pop()
+            if score > alpha:
+                alpha = score
+                best_move = move
+        return best_move, alpha
+
+    def negamax(
+        self, depth: int, alpha: int, beta: int, ply: int, null_move_allowed: bool = True
+    ) -> int:
+        # score of the position for the side to move, fail-soft alpha-beta
+        self.nodes += 1
+        if self.nodes % NODES_BETWEEN_TIME_CHECKS == 0 and self.time_is_up():
+            raise SearchTimeout
+
+        if self.use_mate_distance_pruning:
+            # nothing here can score better than mating at the next ply or worse than being
+            # mated now: no need to search if a shorter mate is already known
+            alpha = max(alpha, -(MATE_SCORE - ply))
+            beta = min(beta, MATE_SCORE - ply - 1)
+            if alpha >= beta:
+                return alpha
+
+        position = self.position
+        # few pieces left: exact result from the endgame tables
+        tables = self.tablebase
+        if tables is not None and position.bitboard.occupied.bit_count() <= MAX_PIECES:
+            value = tables.probe_value(position)
+            if value is not None:
+                return score_from_tablebase(value, ply)
+
+        in_check = position.in_check()
+        if in_check and self.use_check_extensions and ply < self.extension_limit:
+            # forcing line: one more ply (up to the limit, perpetual checks never end)
+            depth += 1
+
+        if depth <= 0:
+            return self.quiescence(alpha, beta, ply)
+
+        # position already searched deep enough (by another move order or a previous search)
+        table = self.transposition_table
+        key = position.key
+        tt_move = 0
+        entry = table.probe(key)
+        if entry is not None:
+            tt_move, tt_depth, bound, tt_score = entry
+            if tt_depth >= depth:
+                score = score_from_table(tt_score, ply)
+                if (
+                    bound == EXACT
+                    or (bound == LOWER_BOUND and score >= beta)
+                    or (bound == UPPER_BOUND and score <= alpha)
+                ):
+                    return score
+
+        color = position.color
+        # pruning on the static evaluation: not in check and no mate score to prove
+        static_score = -INFINITY
+        if not in_check and abs(beta) < MATE_SCORE - MAX_PLY:
+            if self.use_futility or self.use_null_move:
+                static_score = self.evaluation_cache.evaluate(position, color)
+            if self.use_futility and depth <= FRONTIER_DEPTH:
+                # reverse futility: so far above beta that no quiet move loses it all
+                if static_score - FUTILITY_MARGIN * depth >= beta:
+                    self.futility_prunes += 1
+                    return static_score
+                # razoring: so far below alpha that only captures can come back
+                if static_score + RAZOR_MARGIN * depth <= alpha:
+                    score = self.quiescence(alpha, beta, ply)
+                    if score <= alpha:
+                        self.futility_prunes += 1
+                        return score
+
+            # null move: even passing, the side to move stays above beta. Zugzwang guards:
+            # not twice in a row, not with pawns only (where passing can be best), and the
+            # cut is verified by a reduced search of the real moves
+            pieces = position.bitboard.pieces
+            base = color * 6
+            if (
+                self.use_null_move
+                and null_move_allowed
+                and depth >= NULL_MOVE_MIN_DEPTH
+                and static_score >= beta
+                and pieces[base + KNIGHT]
+                | pieces[base + BISHOP]
+                | pieces[base + ROOK]
+                | pieces[base + QUEEN]
+            ):
+                reduction = NULL_MOVE_REDUCTION + depth // 6
+                position.push_null()
+                score = -self.negamax(depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+                position.pop()
+                if (
+                    score >= beta
+                    and self.negamax(depth - reduction, beta - 1, beta, ply, False) >= beta
+                ):
+                    self.null_move_cutoffs += 1
+                    # a mate found after a pass is not a real one
+                    return beta if score >= MATE_SCORE - MAX_PLY else score
+
+        moves = position.legal_codes()
+        if not moves:
+            # checkmate (the sooner the better) or stalemate
+            return -(MATE_SCORE - ply) if in_check else 0
+
+        # most promising moves first: they are the most likely to cut
+        previous_move = position.history[-1][0] if position.history else 0
+        moves = self.move_ordering.order(
+            moves, position.bitboard.squares, color, ply, tt_move, previous_move
+        )
+
+        # futility pruning: quiet moves can not bring the static score back to alpha
+        futile = (
+            self.use_futility
+            and depth <= FRONTIER_DEPTH
+            and static_score > -INFINITY
+            and abs(alpha) < MATE_SCORE - MAX_PLY
+            and static_score + FUTILITY_MARGIN * depth <= alpha
+        )
+        reduce = self.use_late_move_reductions and depth >= LMR_MIN_DEPTH and not in_check
+
+        alpha_start = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for move_number, move in enumerate(moves):
+            position.push(move)
+            quiet = not move >> 12 & (CAPTURE | PROMOTION)
+            if move_number and quiet and (futile or reduce) and not position.in_check():
+                if futile:
+                    position.pop()
+                    self.futility_prunes += 1
+                    continue
+                if move_number >= LMR_FULL_DEPTH_MOVES:
+                    # late quiet move: searched less deep with a null window first, and
+                    # again at full depth only if it raises alpha
+                    self.reductions += 1
+                    reduction = 1 if move_number < 2 * LMR_FULL_DEPTH_MOVES else 2
+                    score = -self.negamax(depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                    if score <= alpha:
+                        position.pop()
+                        if score > best_score:
+                            best_score = score
+                        continue
+            score = -self.negamax(depth - 1, -beta, -alpha, ply + 1)
+            position.pop()
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self.move_ordering.update(
+                            move, color, depth, ply, move_number, previous_move
+                        )
+                        break
+
+        if best_score >= beta:
+            bound = LOWER_BOUND
+        elif best_score <= alpha_start:
+            bound = UPPER_BOUND
+            best_move = 0
+        else:
+            bound = EXACT
+        table.store(key, depth, bound, score_to_table(best_score, ply), best_move)
+        return best_score
+
+    def quiescence(self, alpha: int, beta: int, ply: int) -> int:
+        # search captures and promotions until the position is quiet, so that the evaluation
+        # is not made in the middle of an exchange
+        self.nodes += 1
+        self.quiescence_nodes += 1
+        if self.nodes % NODES_BETWEEN_TIME_CHECKS == 0 and self.time_is_up():
+            raise SearchTimeout
+
+        position = self.position
+        in_check = position.in_check()
+        if in_check:
+            # no stand pat in check: all the evasions are searched
+            moves = position.legal_codes()
+            if not moves:
+                return -(MATE_SCORE - ply)
+            best_score = stand_pat = -INFINITY
+        else:
+            # stand pat: the side to move can choose not to take
+            best_score = stand_pat = self.evaluation_cache.evaluate(position, position.color)
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+            moves = position.legal_captures()
+
+        squares = position.bitboard.squares
+        moves = self.move_ordering.order(moves, squares, position.color, min(ply, MAX_PLY - 1))
+        for move in moves:
+            flag = move >> 12
+            if not in_check and not flag & PROMOTION:
+                # delta pruning: taking the piece is not enough to come back to alpha
+                victim = PAWN if flag == EP_CAPTURE else squares[(move >> 6) & 63] % 6
+                if stand_pat + MG_VALUE[victim] + DELTA_MARGIN <= alpha:
+                    continue
+            position.push(move)
+            score = -self.quiescence(-beta, -alpha, ply + 1)
+            position.pop()
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best_score
+
+
+class Plain_Minmax_Ai(Minmax_Ai):
+    # alpha-beta search without the selective features: reference to measure them
+    use_null_move = False
+    use_late_move_reductions = False
+    use_futility = False
+    use_check_extensions = False
+    use_mate_distance_pruning = False
@@ -0,0 +1,111 @@
+"""
+
+Move ordering for the alpha-beta search: the sooner the best move is searched,
+the more moves are cut
+
+order: move of the transposition table, captures by MVV-LVA (most valuable victim, least
+valuable attacker), killer moves of the ply, countermove of the previous move, then quiet
+moves by history (how often they made a cut before)
+
+"""
+
+from bitboard import CAPTURE, EP_CAPTURE, PAWN, PROMOTION
+
+MAX_PLY = 128
+
+TT_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 22
+COUNTERMOVE_SCORE = 1 << 21
+# history scores are kept below the countermove score
+MAX_HISTORY = COUNTERMOVE_SCORE - 1
+
+# victim and attacker values by piece type (pawn, knight, bishop, rook, queen, king)
+MVV_LVA_VALUES = [1, 3, 3, 5, 9, 20]
+
+
+class MoveOrdering:
+    def __init__(self) -> None:
+        # two killer moves (quiet moves which made a cut) per ply
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        # butterfly history: index color * 4096 + from * 64 + to
+        self.history = [0] * (2 * 4096)
+        # best reply to a move: index from * 64 + to of the previous move
+        self.countermoves = [0] * 4096
+
+        # statistics: nodes with a cut, and cuts made by the first move searched
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self) -> None:
+        # killers belong to the previous position, history is kept but weighs less
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [x // 2 for x in self.history]
+        self.cutoffs = self.first_move_cutoffs = 0
+
+    def order(
+        self,
+        moves: list[int],
+        squares: list[int],
+        color: int,
+        ply: int,
+        tt_move: int = 0,
+        previous_move: int = 0,
+    ) -> list[int]:
+        # moves sorted from most to least promising
+        killers = self.killers[ply]
+        history = self.history
+        countermove = self.countermoves[previous_move & 4095] if previous_move else 0
+        base = color * 4096
+
+        def score(move: int) -> int:
+            if move == tt_move:
+                return TT_MOVE_SCORE
+            flag = move >> 12
+            if flag & CAPTURE:
+                attacker = squares[move & 63] % 6
+                victim = PAWN if flag == EP_CAPTURE else squares[(move >> 6) & 63] % 6
+                value = MVV_LVA_VALUES[victim] * 32 - MVV_LVA_VALUES[attacker]
+                if flag & PROMOTION:
+                    value += MVV_LVA_VALUES[1 + (flag & 3)] * 32
+                return CAPTURE_SCORE + value
+            if flag & PROMOTION:
+                return CAPTURE_SCORE + MVV_LVA_VALUES[1 + (flag & 3)] * 32 - 32
+            if move == killers[0]:
+                return KILLER_SCORE + 1
+            if move == killers[1]:
+                return KILLER_SCORE
+            if move == countermove:
+                return COUNTERMOVE_SCORE
+            return history[base + (move & 4095)]
+
+        return sorted(moves, key=score, reverse=True)
+
+    def update(
+        self,
+        move: int,
+        color: int,
+        depth: int,
+        ply: int,
+        move_number: int,
+        previous_move: int = 0,
+    ) -> None:
+        # move made a cut (beta cutoff) after move_number other moves
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        if move >> 12 & (CAPTURE | PROMOTION):
+            # captures are already ordered by MVV-LVA
+            return
+
+        killers = self.killers[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        index = color * 4096 + (move & 4095)
+        self.history[index] = min(self.history[index] + depth * depth, MAX_HISTORY)
+        if previous_move:
+            self.countermoves[previous_move & 4095] = move
+
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
@@ -0,0 +1,246 @@
+"""
+
+parallel minmax ai; root moves are split between worker processes
+
+threads share the GIL, so the search itself runs in a pool of processes kept by the AI for
+the whole game (then handed to the AI of the next one), sharing its transposition table in
+shared memory. At each iteration of the iterative deepening, the root moves are dealt to the
+workers, each one returns the best of its moves, and the best of those is kept.
+
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from random import shuffle
+
+from loguru import logger
+
+from ai.ai import DEFAULT_TIME_LIMIT
+from ai.minmax_ai import (
+    DEFAULT_DEPTH,
+    INFINITY,
+    MATE_SCORE,
+    Minmax_Ai,
+    SearchTimeout,
+)
+from ai.move_ordering import MAX_PLY
+from ai.shared_transposition import SharedTranspositionTable, shared_memory_table
+from bitboard import COLORS
+from move import Move
+from position import Position
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+# seconds between two checks of a stop request while waiting for the workers
+STOP_POLL_INTERVAL = 0.05
+
+# pools of the AIs that quit, by number of workers: the next AIs (e.g. of the next game of a
+# batch) take them instead of starting new processes
+_idle_pools: dict[int, list[ProcessPoolExecutor]] = {}
+
+
+def worker_pool(workers: int) -> ProcessPoolExecutor:
+    # pool of an AI for the whole game: starting processes costs more than a shallow search
+    idle = _idle_pools.get(workers)
+    if idle:
+        return idle.pop()
+    # spawn: forking the game process (pygame, AI threads) is not safe
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def release_pool(pool: ProcessPoolExecutor, workers: int) -> None:
+    # pool of an AI that quits, its searches already given up (see Worker_Ai)
+    _idle_pools.setdefault(workers, []).append(pool)
+
+
+def shutdown_pool(pool: ProcessPoolExecutor) -> None:
+    # the searches still running are not waited for: the worker processes are ended
+    processes = list(pool._processes.values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+        process.join()
+
+
+def shutdown_idle_pools() -> None:
+    # idle workers also end by themselves at exit
+    for pools in _idle_pools.values():
+        for pool in pools:
+            shutdown_pool(pool)
+    _idle_pools.clear()
+
+
+class Worker_Ai(Minmax_Ai):
+    # search of a worker, given up as soon as its parallel AI starts another search or stops
+    shared_table: SharedTranspositionTable | None = None
+    search_number = 0
+
+    def time_is_up(self) -> bool:
+        if self.shared_table is not None and self.shared_table.search != self.search_number:
+            return True
+        return super().time_is_up()
+
+
+def search_root_moves(
+    position: Position,
+    codes: list[int],
+    depth: int,
+    time_limit: float,
+    alpha: int = -INFINITY,
+    table: SharedTranspositionTable | None = None,
+    search: int = 0,
+) -> tuple[int, int, int] | None:
+    # run in a worker: (best move, score, nodes) of the root moves codes, None on timeout
+    # table: shared by all the workers, else the worker uses its own one
+    # search: number of the search in the table, the worker gives up when it changes
+    ai = Worker_Ai(position, COLORS[position.color], depth, time_limit, table, start=False)
+    ai.shared_table = table
+    ai.search_number = search
+    ai.deadline = time.perf_counter() + time_limit
+    if table is None:
+        ai.transposition_table.new_search()
+    try:
+        move, score = ai.search_root(codes, depth, alpha)
+    except SearchTimeout:
+        return None
+    return move, score, ai.nodes
+
+
+class Parallel_Ai(Minmax_Ai):
+    # workers search with the time budget they are given
+    can_ponder = False
+
+    def __init__(
+        self,
+        position: Position,
+        color: str,
+        max_depth: int = DEFAULT_DEPTH,
+        time_limit: float = DEFAULT_TIME_LIMIT,
+        workers: int = DEFAULT_WORKERS,
+        transposition_table: SharedTranspositionTable | None = None,
+        start: bool = True,
+    ):
+        # set before the search thread is started by Ai
+        self.workers = max(1, workers)
+        # all the workers probe and store in the same table; a table given to the AI is its
+        # own (freed when it quits), the table of the process is only for standalone use
+        self.owns_table = transposition_table is not None
+        self.shared_table = transposition_table or shared_memory_table()
+        # own pool, taken at the first search: the quit of another AI does not end it
+        self.pool: ProcessPoolExecutor | None = None
+        super().__init__(position, color, max_depth, time_limit, self.shared_table, start)
+
+    def stop(self) -> None:
+        # the workers would go on searching until their own deadline
+        super().stop()
+        self.shared_table.search += 1
+
+    def quit(self) -> None:
+        # the stopped workers are kept for another AI
+        super().quit()
+        if self.pool is not None:
+            release_pool(self.pool, self.workers)
+            self.pool = None
+        if self.owns_table:
+            self.shared_table.close()
+
+    def get_get_best_move(self) -> Move:
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.depth_reached = 0
+        self.shared_table.new_search()
+        self.shared_table.search += 1
+        if self.pool is None:
+            self.pool = worker_pool(self.workers)
+
+        root_moves = {move.code: move for move in self.position.valid_moves}
+        codes = list(root_moves)
+        shuffle(codes)
+        best_move = codes[0]
+
+        for depth in range(1, self.max_depth + 1):
+            result = self.search_iteration(self.pool, codes, depth)
+            if result is None:
+                # unfinished iteration: keep previous best move
+                break
+            best_move, score = result
+            self.depth_reached = depth
+            codes.remove(best_move)
+            codes.insert(0, best_move)
+            if abs(score) >= MATE_SCORE - MAX_PLY:
+                break
+
+        elapsed = time.perf_counter() - start
+        stats = self.shared_table.stats()
+        logger.debug(
+            f"parallel minmax: {self.workers} workers depth {self.depth_reached} "
+            f"nodes {self.nodes} time {elapsed:.2f}s move {root_moves[best_move]} "
+            f"tt hit rate {stats['hit_rate']:.0%} usage {stats['usage']:.0%}"
+        )
+        return root_moves[best_move]
+
+    def search_iteration(
+        self, pool: ProcessPoolExecutor, codes: list[int], depth: int
+    ) -> tuple[int, int] | None:
+        # best move and score at depth, None if the time is over
+        remaining = self.deadline - time.perf_counter()
+        if remaining <= 0:
+            return None
+        # the first move (best of the last iteration) is searched alone: its score is the
+        # alpha of the other ones, which are dealt to the workers
+        first = pool.submit(
+            search_root_moves,
+            self.position,
+            codes[:1],
+            depth,
+            remaining,
+            -INFINITY,
+            self.shared_table,
+            self.shared_table.search,
+        )
+        result = self.wait(first)
+        if result is None:
+            return None
+        best_move, best_score, nodes = result
+        self.nodes += nodes
+
+        remaining = self.deadline - time.perf_counter()
+        others = codes[1:]
+        futures = [
+            pool.submit(
+                search_root_moves,
+                self.position,
+                others[index :: self.workers],
+                depth,
+                remaining,
+                best_score,
+                self.shared_table,
+                self.shared_table.search,
+            )
+            for index in range(min(self.workers, len(others)))
+        ]
+        for future in futures:
+            result = self.wait(future)
+            if result is None:
+                # the moves not dealt yet are not searched
+                for other in futures:
+                    other.cancel()
+                return None
+            move, score, nodes = result
+            self.nodes += nodes
+            # moves not better than the first one come back with score = alpha
+            if score > best_score:
+                best_move, best_score = move, score
+        return best_move, best_score
+
+    def wait(self, future: "Future[tuple[int, int, int] | None]") -> tuple[int, int, int] | None:
+        # result of a worker, None on timeout or if the search is stopped
+        while not self.stop_requested:
+            try:
+                return future.result(timeout=STOP_POLL_INTERVAL)
+            except FutureTimeoutError:
+                pass
+        return None
@@ -0,0 +1,133 @@
+"""
+
+Pawn structure hash table: pawn terms of the evaluation by pawn zobrist key
+
+pawns move seldom, so a search meets the same few pawn structures again and again whatever
+the other pieces do. Doubled, isolated, protected and passed pawns are computed once per
+structure (Position.pawn_key, the key of the pawns alone) and kept in a direct-mapped
+table with the masks of passed pawns and open files the other terms need.
+
+"""
+
+from bitboard import BLACK, FILE_A, WHITE, pawn_attacks, squares_of
+
+DEFAULT_SIZE = 1 << 14
+
+# (middlegame, endgame) per pawn, from the side of the pawn owner
+DOUBLED = (-10, -20)
+ISOLATED = (-10, -10)
+PROTECTED = (7, 5)
+# passed pawn by rank from the side of the owner (second rank = 1)
+PASSED_MG = [0, 0, 5, 10, 20, 35, 60, 0]
+PASSED_EG = [0, 10, 15, 25, 45, 75, 120, 0]
+
+FILES = [FILE_A << col for col in range(8)]
+ADJACENT_FILES = [
+    (FILES[col - 1] if col > 0 else 0) | (FILES[col + 1] if col < 7 else 0) for col in range(8)
+]
+# squares in front of a pawn on its file and the adjacent files: no enemy pawn there = passed
+PASSED_MASKS = [[0] * 64, [0] * 64]
+for _square in range(64):
+    _line, _col = divmod(_square, 8)
+    _files = FILES[_col] | ADJACENT_FILES[_col]
+    PASSED_MASKS[WHITE][_square] = _files & ((1 << (_line * 8)) - 1)
+    PASSED_MASKS[BLACK][_square] = _files & ~((1 << ((_line + 1) * 8)) - 1)
+
+# table entry: pawn key, middlegame, endgame, passed pawns, open files (no pawn on them)
+PawnEntryT = tuple[int, int, int, int, int]
+
+
+def pawn_terms(white_pawns: int, black_pawns: int) -> tuple[int, int, int, int]:
+    # middlegame and endgame score (white - black), passed pawns and open files
+    mg_score = eg_score = passed = 0
+    for color, pawns, enemies, sign in (
+        (WHITE, white_pawns, black_pawns, 1),
+        (BLACK, black_pawns, white_pawns, -1),
+    ):
+        protected = pawns & pawn_attacks(pawns, color)
+        for square in squares_of(pawns):
+            line, col = divmod(square, 8)
+            bit = 1 << square
+            mg = eg = 0
+            if not pawns & ADJACENT_FILES[col]:
+                mg += ISOLATED[0]
+                eg += ISOLATED[1]
+            if protected & bit:
+                mg += PROTECTED[0]
+                eg += PROTECTED[1]
+            ahead = PASSED_MASKS[color][square]
+            if pawns & ahead & FILES[col]:
+                # pawns behind another one on the file are doubled and never passed
+                mg += DOUBLED[0]
+                eg += DOUBLED[1]
+            elif not enemies & ahead:
+                rank = 7 - line if color == WHITE else line
+                mg += PASSED_MG[rank]
+                eg += PASSED_EG[rank]
+                passed |= bit
+            mg_score += sign * mg
+            eg_score += sign * eg
+
+    open_files = 0
+    for file in FILES:
+        if not (white_pawns | black_pawns) & file:
+            open_files |= file
+    return mg_score, eg_score, passed, open_files
+
+
+class PawnHashTable:
+    def __init__(self, size: int = DEFAULT_SIZE) -> None:
+        # number of entries, rounded down to a power of 2 to index by the low bits of the key
+        self.size = 1 << max(0, size.bit_length() - 1)
+        self.mask = self.size - 1
+        self.entries: list[PawnEntryT | None] = [None] * self.size
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self.entries = [None] * self.size
+        self.hits = self.misses = 0
+
+    def probe(self, key: int, white_pawns: int, black_pawns: int) -> PawnEntryT:
+        # entry of the pawn structure, computed and stored when not in the table
+        entry = self.get(key)
+        if entry is None:
+            entry = self.put(key, white_pawns, black_pawns)
+        return entry
+
+    def get(self, key: int) -> PawnEntryT | None:
+        # entry of the pawn structure, None if not in the table
+        # the whole entry is read at once: it can be replaced by another AI thread meanwhile
+        entry = self.entries[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key: int, white_pawns: int, black_pawns: int) -> PawnEntryT:
+        entry = (key, *pawn_terms(white_pawns, black_pawns))
+        self.entries[key & self.mask] = entry
+        return entry
+
+    def stats(self) -> dict[str, float]:
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": sum(entry is not None for entry in self.entries),
+            "hit_rate": self.hits / probes if probes else 0.0,
+        }
+
+
+_shared_table: PawnHashTable | None = None
+
+
+def shared_pawn_table() -> PawnHashTable:
+    # table kept between moves and shared by the AIs of the process
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = PawnHashTable()
+    return _shared_table
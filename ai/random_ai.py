@@ -11,8 +11,8 @@ from position import Position
 
 
 class Random_Ai(Ai):
-    def __init__(self, position: Position, color: str):
-        super().__init__(position, color)
+    def __init__(self, position: Position, color: str, start: bool = True):
+        super().__init__(position, color, start)
 
     def get_next_move(self) -> None:
         # to be implemented by each AI
@@ -25,10 +25,7 @@ class Random_Ai(Ai):
 
         self.move = valid_move[randint(0, len(valid_move) - 1)]
         # promotion special case => always choose queen
-        if self.move.chess_move[0].islower():
-            if (self.color == "w" and self.move.square_to[0] == 0) or (
-                self.color == "b" and self.move.square_to[0] == 7
-            ):
-                self.move.chess_move += "Q"
+        if self.move.is_promotion:
+            self.move.promotion = "Q"
 
         self.get_next_move_finished = True
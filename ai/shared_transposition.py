@@ -0,0 +1,201 @@
+"""
+
+Transposition table in shared memory, probed and stored by all the search processes
+
+same buckets and replacement scheme as TranspositionTable, but the entries live in a
+multiprocessing.shared_memory block and are written without lock: each entry is the pair
+(key ^ data, data), so an entry half written by another process does not match its key
+and is seen as a miss. Age and statistics are kept in a header of the block (statistics
+are approximate: increments of several processes can be lost).
+
+the table is pickled as the name of its block, a worker process attaches to it once
+
+"""
+
+import atexit
+from multiprocessing import shared_memory
+
+from ai.transposition import (
+    BUCKET_SIZE,
+    DEFAULT_SIZE_MB,
+    ENTRY_SIZE,
+    MAX_AGE,
+    SCORE_OFFSET,
+    TranspositionTable,
+)
+
+# header words: number of entries, age, hits, misses, collisions, stores, search number
+SIZE, AGE, HITS, MISSES, COLLISIONS, STORES, SEARCH = range(7)
+HEADER_SIZE = 8  # words
+
+# tables attached by this process, by shared memory name
+_attached: dict[str, "SharedTranspositionTable"] = {}
+_shared_table: "SharedTranspositionTable | None" = None
+
+
+def attach(name: str) -> "SharedTranspositionTable":
+    # table of this name in this process (used to unpickle), attached once
+    table = _attached.get(name)
+    if table is None:
+        # a worker process runs one search at a time: the tables it attached before (e.g. of
+        # the AIs of the previous games) are not used any more
+        for other in list(_attached.values()):
+            if not other.owner:
+                other.close()
+        table = SharedTranspositionTable(name=name)
+        atexit.register(table.close)
+    return table
+
+
+class SharedTranspositionTable(TranspositionTable):
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB, name: str | None = None) -> None:
+        if name is None:
+            # new table: same number of entries as a TranspositionTable of the same size
+            nb_entries = max(BUCKET_SIZE, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+            nb_buckets = 1 << ((nb_entries // BUCKET_SIZE).bit_length() - 1)
+            size = nb_buckets * BUCKET_SIZE
+            self.shm = shared_memory.SharedMemory(create=True, size=(HEADER_SIZE + 2 * size) * 8)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.name = self.shm.name
+        assert self.shm.buf is not None
+        self.buf = self.shm.buf
+        self.words = self.buf.cast("Q")
+        if self.owner:
+            self.words[SIZE] = size
+        self.size = self.words[SIZE]
+        self.mask = self.size // BUCKET_SIZE - 1
+        _attached[self.name] = self
+
+    def __reduce__(self) -> tuple[object, tuple[str]]:
+        return attach, (self.name,)
+
+    # age and statistics are shared by all the processes
+    @property
+    def age(self) -> int:
+        return self.words[AGE]
+
+    @age.setter
+    def age(self, value: int) -> None:
+        self.words[AGE] = value
+
+    @property
+    def hits(self) -> int:
+        return self.words[HITS]
+
+    @hits.setter
+    def hits(self, value: int) -> None:
+        self.words[HITS] = value
+
+    @property
+    def misses(self) -> int:
+        return self.words[MISSES]
+
+    @misses.setter
+    def misses(self, value: int) -> None:
+        self.words[MISSES] = value
+
+    @property
+    def collisions(self) -> int:
+        return self.words[COLLISIONS]
+
+    @collisions.setter
+    def collisions(self, value: int) -> None:
+        self.words[COLLISIONS] = value
+
+    @property
+    def stores(self) -> int:
+        return self.words[STORES]
+
+    @stores.setter
+    def stores(self, value: int) -> None:
+        self.words[STORES] = value
+
+    @property
+    def search(self) -> int:
+        # number of the search of the owner: the workers of an older one give up
+        return self.words[SEARCH]
+
+    @search.setter
+    def search(self, value: int) -> None:
+        self.words[SEARCH] = value
+
+    def clear(self) -> None:
+        self.buf[HEADER_SIZE * 8 :] = bytes(self.size * 16)
+        self.age = 0
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        # (move, depth, bound, score) stored for the position, None if not found
+        words = self.words
+        index = HEADER_SIZE + (key & self.mask) * BUCKET_SIZE * 2
+        for slot in (index, index + 2):
+            data = words[slot + 1]
+            if data and words[slot] ^ data == key:
+                words[HITS] += 1
+                return (
+                    data & 0xFFFF,
+                    (data >> 16) & 0xFF,
+                    (data >> 24) & 3,
+                    (data >> 32) - SCORE_OFFSET,
+                )
+        if words[index + 1] or words[index + 3]:
+            words[COLLISIONS] += 1
+        words[MISSES] += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int) -> None:
+        words = self.words
+        index = HEADER_SIZE + (key & self.mask) * BUCKET_SIZE * 2
+        age = words[AGE]
+        stored = words[index + 1]
+        # depth-preferred slot: same position, empty, old search or not deeper than new one
+        if (
+            words[index] ^ stored == key
+            or not stored
+            or (stored >> 26) & MAX_AGE != age
+            or (stored >> 16) & 0xFF <= depth
+        ):
+            slot = index
+        else:
+            slot = index + 2
+        stored = words[slot + 1]
+        if not move and words[slot] ^ stored == key:
+            # keep the best move known for the position
+            move = stored & 0xFFFF
+
+        data = (
+            move | min(depth, 0xFF) << 16 | bound << 24 | age << 26 | (score + SCORE_OFFSET) << 32
+        )
+        words[slot] = key ^ data
+        words[slot + 1] = data
+        words[STORES] += 1
+
+    def usage(self) -> float:
+        # part of the entries used by the current search (sampled on the first 1000 entries)
+        sample = min(self.size, 1000)
+        age = self.age
+        data = self.words[HEADER_SIZE + 1 : HEADER_SIZE + 2 * sample : 2]
+        used = sum(1 for value in data if value and (value >> 26) & MAX_AGE == age)
+        return used / sample
+
+    def close(self) -> None:
+        # detach this process from the table, the owner also frees the memory
+        if _attached.pop(self.name, None) is None:
+            return
+        self.words.release()
+        self.buf.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def shared_memory_table() -> SharedTranspositionTable:
+    # table kept between moves and shared with the worker processes, freed at exit
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = SharedTranspositionTable()
+        atexit.register(_shared_table.close)
+    return _shared_table
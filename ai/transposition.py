@@ -0,0 +1,130 @@
+"""
+
+Transposition table: search results stored by zobrist key of the position
+
+entries live in two flat arrays of 64 bits integers (key and packed data), so the table
+has a fixed memory size. Buckets hold 2 entries: the first one keeps the deepest search
+of the current age, the second one is always replaced.
+
+packed data: move (16 bits) | depth (8 bits) << 16 | bound (2 bits) << 24 | age (6 bits) << 26
+             | score + 2^31 (32 bits) << 32
+
+"""
+
+from array import array
+
+# bound of the score stored, 0 is an empty entry
+EXACT = 1
+LOWER_BOUND = 2  # score >= stored score (beta cut)
+UPPER_BOUND = 3  # score <= stored score (no move raised alpha)
+
+DEFAULT_SIZE_MB = 16
+ENTRY_SIZE = 16  # bytes: key + data
+BUCKET_SIZE = 2
+MAX_AGE = 63
+
+SCORE_OFFSET = 1 << 31
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = DEFAULT_SIZE_MB) -> None:
+        # number of buckets: biggest power of 2 fitting in the memory cap
+        nb_entries = max(BUCKET_SIZE, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        nb_buckets = 1 << ((nb_entries // BUCKET_SIZE).bit_length() - 1)
+        self.size = nb_buckets * BUCKET_SIZE
+        self.mask = nb_buckets - 1
+        self.keys = array("Q", bytes(8 * self.size))
+        self.data = array("Q", bytes(8 * self.size))
+        self.age = 0
+
+        # statistics
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0  # bucket filled by other positions
+        self.stores = 0
+
+    def new_search(self) -> None:
+        # entries of previous searches can be replaced by any new one
+        self.age = (self.age + 1) & MAX_AGE
+
+    def clear(self) -> None:
+        self.keys = array("Q", bytes(8 * self.size))
+        self.data = array("Q", bytes(8 * self.size))
+        self.age = 0
+        self.hits = self.misses = self.collisions = self.stores = 0
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        # (move, depth, bound, score) stored for the position, None if not found
+        index = (key & self.mask) * BUCKET_SIZE
+        keys = self.keys
+        for slot in (index, index + 1):
+            if keys[slot] == key:
+                data = self.data[slot]
+                if data:
+                    self.hits += 1
+                    return (
+                        data & 0xFFFF,
+                        (data >> 16) & 0xFF,
+                        (data >> 24) & 3,
+                        (data >> 32) - SCORE_OFFSET,
+                    )
+        if self.data[index] or self.data[index + 1]:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, bound: int, score: int, move: int) -> None:
+        index = (key & self.mask) * BUCKET_SIZE
+        data = self.data
+        stored = data[index]
+        # depth-preferred slot: same position, empty, old search or not deeper than new one
+        if (
+            self.keys[index] == key
+            or not stored
+            or (stored >> 26) & MAX_AGE != self.age
+            or (stored >> 16) & 0xFF <= depth
+        ):
+            slot = index
+        else:
+            slot = index + 1
+        if self.keys[slot] == key and not move:
+            # keep the best move known for the position
+            move = data[slot] & 0xFFFF
+
+        self.keys[slot] = key
+        data[slot] = (
+            move
+            | min(depth, 0xFF) << 16
+            | bound << 24
+            | self.age << 26
+            | (score + SCORE_OFFSET) << 32
+        )
+        self.stores += 1
+
+    def usage(self) -> float:
+        # part of the entries used by the current search (sampled on the first 1000 entries)
+        sample = min(self.size, 1000)
+        used = sum(1 for data in self.data[:sample] if data and (data >> 26) & MAX_AGE == self.age)
+        return used / sample
+
+    def stats(self) -> dict[str, float]:
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "usage": self.usage(),
+        }
+
+
+_shared_table: TranspositionTable | None = None
+
+
+def shared_table() -> TranspositionTable:
+    # table kept between moves (a new AI object is created at each move)
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = TranspositionTable()
+    return _shared_table
@@ -4,12 +4,23 @@
 
 from loguru import logger
 
-from game import COLOR_TO_TEXT, Game
+from bitboard import uci
+from game import COLOR_TO_TEXT, TABLEBASE_WIN, Game
+
+# game result in records, by status
+RECORD_RESULTS = {"White wins": "1-0", "Black wins": "0-1"}
 
 
 class BatchChess:
-    def __init__(self, nb_game: int = 1, ai: tuple[str, str] = ("random", "random")) -> None:
+    def __init__(
+        self,
+        nb_game: int = 1,
+        ai: tuple[str, str] = ("random", "random"),
+        record_file: str | None = None,
+    ) -> None:
         self.exit_requested = False
+        # games are appended to record_file ("1-0 e2e4 e7e5 ..." per line, see book.py)
+        self.record_file = record_file
 
         self.game_status = "started"
         self.game: Game
@@ -22,6 +33,7 @@ class BatchChess:
             "Null: Draw by Threefold Repetition": 0,
             "Null: Draw by 50-Move Rule": 0,
             "Null: Draw by Dead Position": 0,
+            "Null: Draw by Tablebase": 0,
         }
 
     def game_loop(self) -> None:
@@ -38,6 +50,7 @@ class BatchChess:
             if self.game.game_status == "Started":
                 self.game.update()
             else:
+                self.game.quit_engines()
                 self.update_results()
                 self.nb_game_left -= 1
                 if self.nb_game_left > 0:
@@ -46,7 +59,10 @@ class BatchChess:
                     self.exit_requested = True
 
     def update_results(self) -> None:
-        if self.game.game_status != "Checkmate !":
+        if self.game.game_status.endswith(TABLEBASE_WIN):
+            # won ending adjudicated by the endgame tables: "White wins"
+            status = self.game.game_status.removesuffix(TABLEBASE_WIN) + "wins"
+        elif self.game.game_status != "Checkmate !":
             status = f"Null: {self.game.game_status}"
         else:
             winner = "w"
@@ -56,6 +72,13 @@ class BatchChess:
 
         logger.warning(status)
         self.results[status] += 1
+        if self.record_file:
+            self.record_game(self.record_file, RECORD_RESULTS.get(status, "1/2-1/2"))
+
+    def record_game(self, path: str, result: str) -> None:
+        moves = [uci(move.code & 0xFFF) + move.promotion.lower() for move in self.game.move_list]
+        with open(path, "a", encoding="utf-8") as records:
+            records.write(" ".join([result, *moves]) + "\n")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,559 @@
+"""
+
+Bitboard representation of a chess board used as the core of Position
+
+twelve 64-bit integers (one per piece type and color) plus occupancy masks.
+Squares are numbered line * 8 + col, so square 0 is a8 and square 63 is h1,
+matching the (line, col) coordinates used by the Board grid.
+
+"""
+
+from piece import Piece
+from tables import (
+    BETWEEN,
+    BISHOP_RAYS,
+    EAST,
+    KING_ATTACKS,
+    KNIGHT_ATTACKS,
+    LINE,
+    NORTH,
+    NORTH_EAST,
+    NORTH_WEST,
+    PAWN_ATTACKS,
+    RAYS,
+    ROOK_RAYS,
+    SOUTH,
+    SOUTH_EAST,
+    SOUTH_WEST,
+    WEST,
+)
+
+WHITE = 0
+BLACK = 1
+COLORS = "wb"
+COLOR_INDEX = {"w": WHITE, "b": BLACK}
+
+PAWN = 0
+KNIGHT = 1
+BISHOP = 2
+ROOK = 3
+QUEEN = 4
+KING = 5
+PIECE_LETTERS = "PNBRQK"
+
+EMPTY = -1
+
+# castling rights, stored as a 4 bits mask
+WHITE_KING_SIDE = 1
+WHITE_QUEEN_SIDE = 2
+BLACK_KING_SIDE = 4
+BLACK_QUEEN_SIDE = 8
+ALL_CASTLING = 15
+
+# castling rights kept when a move starts from or arrives on a square
+CASTLING_MASKS = [ALL_CASTLING] * 64
+CASTLING_MASKS[60] = ALL_CASTLING ^ (WHITE_KING_SIDE | WHITE_QUEEN_SIDE)  # e1
+CASTLING_MASKS[63] = ALL_CASTLING ^ WHITE_KING_SIDE  # h1
+CASTLING_MASKS[56] = ALL_CASTLING ^ WHITE_QUEEN_SIDE  # a1
+CASTLING_MASKS[4] = ALL_CASTLING ^ (BLACK_KING_SIDE | BLACK_QUEEN_SIDE)  # e8
+CASTLING_MASKS[7] = ALL_CASTLING ^ BLACK_KING_SIDE  # h8
+CASTLING_MASKS[0] = ALL_CASTLING ^ BLACK_QUEEN_SIDE  # a8
+
+# move encoding: square from (6 bits) | square to (6 bits) << 6 | flag (4 bits) << 12
+QUIET = 0
+DOUBLE_PUSH = 1
+KING_CASTLE = 2
+QUEEN_CASTLE = 3
+CAPTURE = 4
+EP_CAPTURE = 5
+PROMOTION = 8  # promotion piece is KNIGHT + (flag & 3)
+PROMOTION_CAPTURE = 12
+
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+NOT_FILE_A = FULL ^ FILE_A
+NOT_FILE_H = FULL ^ FILE_H
+NOT_FILE_AB = FULL ^ (FILE_A | FILE_B)
+NOT_FILE_GH = FULL ^ (FILE_G | FILE_H)
+RANK_8 = 0xFF  # line 0
+RANK_6 = RANK_8 << 16  # line 2
+RANK_3 = RANK_8 << 40  # line 5
+RANK_1 = RANK_8 << 56  # line 7
+
+# (shift, mask to avoid wrapping from one side of the board to the other)
+# a negative shift goes toward line 0 (rank 8)
+ROOK_DIRECTIONS = [(-8, FULL), (8, FULL), (1, NOT_FILE_A), (-1, NOT_FILE_H)]
+BISHOP_DIRECTIONS = [(-7, NOT_FILE_A), (-9, NOT_FILE_H), (9, NOT_FILE_A), (7, NOT_FILE_H)]
+
+SQUARE_NAMES = [f"{chr(col + 97)}{8 - line}" for line in range(8) for col in range(8)]
+
+
+def encode_move(square_from: int, square_to: int, flag: int = QUIET) -> int:
+    return square_from | (square_to << 6) | (flag << 12)
+
+
+def move_from(move: int) -> int:
+    return move & 63
+
+
+def move_to(move: int) -> int:
+    return (move >> 6) & 63
+
+
+def move_flag(move: int) -> int:
+    return move >> 12
+
+
+def square_from_coords(coords: str) -> int:
+    # "e2" => 52
+    return (8 - int(coords[1])) * 8 + ord(coords[0]) - 97
+
+
+def uci(move: int) -> str:
+    # "e2e4", "e7e8q"
+    name = SQUARE_NAMES[move & 63] + SQUARE_NAMES[(move >> 6) & 63]
+    if move >> 12 & PROMOTION:
+        name += "nbrq"[(move >> 12) & 3]
+    return name
+
+
+def _shift(bb: int, shift: int) -> int:
+    if shift > 0:
+        return (bb << shift) & FULL
+    return bb >> -shift
+
+
+def _sliding_attacks(bb: int, empty: int, directions: list[tuple[int, int]]) -> int:
+    # Kogge-Stone occluded fill: works for a single slider or a whole set of them
+    attacks = 0
+    for shift, mask in directions:
+        gen = bb
+        pro = empty & mask
+        gen |= pro & _shift(gen, shift)
+        pro &= _shift(pro, shift)
+        gen |= pro & _shift(gen, shift * 2)
+        pro &= _shift(pro, shift * 2)
+        gen |= pro & _shift(gen, shift * 4)
+        attacks |= _shift(gen, shift) & mask
+    return attacks
+
+
+def rook_attacks(bb: int, occupied: int) -> int:
+    return _sliding_attacks(bb, FULL ^ occupied, ROOK_DIRECTIONS)
+
+
+def bishop_attacks(bb: int, occupied: int) -> int:
+    return _sliding_attacks(bb, FULL ^ occupied, BISHOP_DIRECTIONS)
+
+
+def _slider_attacks_from(
+    square: int, occupied: int, negative_rays: list[list[int]], positive_rays: list[list[int]]
+) -> int:
+    # each ray is cut after its first blocker: the highest square of a ray going toward
+    # square 0, the lowest one of a ray going toward square 63
+    attacks = 0
+    for rays in negative_rays:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    for rays in positive_rays:
+        ray = rays[square]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+_ROOK_NEGATIVE_RAYS = [RAYS[NORTH], RAYS[WEST]]
+_ROOK_POSITIVE_RAYS = [RAYS[SOUTH], RAYS[EAST]]
+_BISHOP_NEGATIVE_RAYS = [RAYS[NORTH_EAST], RAYS[NORTH_WEST]]
+_BISHOP_POSITIVE_RAYS = [RAYS[SOUTH_WEST], RAYS[SOUTH_EAST]]
+
+
+def rook_attacks_from(square: int, occupied: int) -> int:
+    # attacks of a single rook, read from the ray tables
+    return _slider_attacks_from(square, occupied, _ROOK_NEGATIVE_RAYS, _ROOK_POSITIVE_RAYS)
+
+
+def bishop_attacks_from(square: int, occupied: int) -> int:
+    return _slider_attacks_from(square, occupied, _BISHOP_NEGATIVE_RAYS, _BISHOP_POSITIVE_RAYS)
+
+
+def knight_attacks(bb: int) -> int:
+    return (
+        ((bb >> 17) & NOT_FILE_H)
+        | ((bb >> 15) & NOT_FILE_A)
+        | ((bb >> 10) & NOT_FILE_GH)
+        | ((bb >> 6) & NOT_FILE_AB)
+        | ((bb << 17) & NOT_FILE_A)
+        | ((bb << 15) & NOT_FILE_H)
+        | ((bb << 10) & NOT_FILE_AB)
+        | ((bb << 6) & NOT_FILE_GH)
+    )
+
+
+def king_attacks(bb: int) -> int:
+    row = bb | ((bb << 1) & NOT_FILE_A) | ((bb >> 1) & NOT_FILE_H)
+    return (row | (row >> 8) | ((row << 8) & FULL)) ^ bb
+
+
+def pawn_attacks(bb: int, color: int) -> int:
+    if color == WHITE:
+        return ((bb >> 7) & NOT_FILE_A) | ((bb >> 9) & NOT_FILE_H)
+    return ((bb << 9) & NOT_FILE_A) | ((bb << 7) & NOT_FILE_H)
+
+
+def squares_of(bb: int) -> list[int]:
+    squares = []
+    while bb:
+        lsb = bb & -bb
+        squares.append(lsb.bit_length() - 1)
+        bb ^= lsb
+    return squares
+
+
+class BitBoard:
+    def __init__(self) -> None:
+        # one bitboard per piece: index is color * 6 + piece type
+        self.pieces: list[int] = [0] * 12
+        self.colors: list[int] = [0, 0]
+        self.occupied = 0
+        # mailbox of piece indexes, to know what stands on a given square
+        self.squares: list[int] = [EMPTY] * 64
+
+    @classmethod
+    def from_board(cls, board: list[list[Piece]]) -> "BitBoard":
+        bitboard = cls()
+        for line in range(8):
+            for col in range(8):
+                code = board[line][col].code
+                if code >= 0:
+                    bitboard.put(code, line * 8 + col)
+        return bitboard
+
+    def copy(self) -> "BitBoard":
+        bitboard = BitBoard()
+        bitboard.pieces = self.pieces[:]
+        bitboard.colors = self.colors[:]
+        bitboard.occupied = self.occupied
+        bitboard.squares = self.squares[:]
+        return bitboard
+
+    def put(self, piece: int, square: int) -> None:
+        bit = 1 << square
+        self.pieces[piece] |= bit
+        self.colors[piece // 6] |= bit
+        self.occupied |= bit
+        self.squares[square] = piece
+
+    def remove(self, square: int) -> int:
+        piece = self.squares[square]
+        if piece != EMPTY:
+            bit = 1 << square
+            self.pieces[piece] ^= bit
+            self.colors[piece // 6] ^= bit
+            self.occupied ^= bit
+            self.squares[square] = EMPTY
+        return piece
+
+    def apply(self, move: int) -> None:
+        # play a move on the bitboards, without any game state (castle rights, ...)
+        square_from, square_to, flag = move & 63, (move >> 6) & 63, move >> 12
+        piece = self.remove(square_from)
+        if flag == EP_CAPTURE:
+            self.remove(square_to + (8 if piece < 6 else -8))
+        else:
+            self.remove(square_to)
+        if flag & PROMOTION:
+            piece = (piece // 6) * 6 + KNIGHT + (flag & 3)
+        self.put(piece, square_to)
+        if flag == KING_CASTLE:
+            self.put(self.remove(square_to + 1), square_to - 1)
+        elif flag == QUEEN_CASTLE:
+            self.put(self.remove(square_to - 2), square_to + 1)
+
+    def king_square(self, color: int) -> int:
+        king = self.pieces[color * 6 + KING]
+        if not king:
+            return -1
+        return (king & -king).bit_length() - 1
+
+    def is_attacked(self, square: int, by_color: int) -> bool:
+        # look from the square with each piece type ("super piece") for an attacker
+        enemy = by_color * 6
+        if KNIGHT_ATTACKS[square] & self.pieces[enemy + KNIGHT]:
+            return True
+        if KING_ATTACKS[square] & self.pieces[enemy + KING]:
+            return True
+        if PAWN_ATTACKS[by_color ^ 1][square] & self.pieces[enemy + PAWN]:
+            return True
+        queens = self.pieces[enemy + QUEEN]
+        rooks = (self.pieces[enemy + ROOK] | queens) & ROOK_RAYS[square]
+        if rooks and rook_attacks_from(square, self.occupied) & rooks:
+            return True
+        bishops = (self.pieces[enemy + BISHOP] | queens) & BISHOP_RAYS[square]
+        return bool(bishops and bishop_attacks_from(square, self.occupied) & bishops)
+
+    def attacks(self, color: int, occupied: int = -1) -> int:
+        # set-wise map of all the squares attacked by color
+        if occupied < 0:
+            occupied = self.occupied
+        own = color * 6
+        queens = self.pieces[own + QUEEN]
+        return (
+            pawn_attacks(self.pieces[own + PAWN], color)
+            | knight_attacks(self.pieces[own + KNIGHT])
+            | king_attacks(self.pieces[own + KING])
+            | rook_attacks(self.pieces[own + ROOK] | queens, occupied)
+            | bishop_attacks(self.pieces[own + BISHOP] | queens, occupied)
+        )
+
+    def checks_and_pins(self, king: int, color: int) -> tuple[int, int, dict[int, int]]:
+        # pieces giving check to the king of color, squares stopping the check
+        # (checker included) and pinned pieces with the line they can still move on
+        them = (color ^ 1) * 6
+        own_pieces = self.colors[color]
+        occupied = self.occupied
+
+        checkers = KNIGHT_ATTACKS[king] & self.pieces[them + KNIGHT]
+        checkers |= PAWN_ATTACKS[color][king] & self.pieces[them + PAWN]
+        check_ray = checkers
+        pins: dict[int, int] = {}
+
+        # enemy sliders on a line with the king: nothing between => check, one own piece => pin
+        queens = self.pieces[them + QUEEN]
+        snipers = (self.pieces[them + ROOK] | queens) & ROOK_RAYS[king]
+        snipers |= (self.pieces[them + BISHOP] | queens) & BISHOP_RAYS[king]
+        between_king = BETWEEN[king]
+        while snipers:
+            sniper = snipers & -snipers
+            snipers ^= sniper
+            square = sniper.bit_length() - 1
+            between = between_king[square] & occupied
+            if not between:
+                checkers |= sniper
+                check_ray |= between_king[square] | sniper
+            elif not between & (between - 1) and between & own_pieces:
+                pins[between.bit_length() - 1] = LINE[king][square]
+
+        return checkers, check_ray, pins
+
+    def generate_moves(
+        self, color: int, ep_square: int = -1, castling: int = 0, attacked: int = -1
+    ) -> list[int]:
+        # pseudo-legal moves for color (castles are always legal)
+        # attacked: squares attacked by the opponent if already known
+        moves: list[int] = []
+        not_own = FULL ^ self.colors[color]
+
+        self._generate_pieces_moves(moves, color, FULL, not_own)
+        for square in squares_of(self.pieces[color * 6 + KING]):
+            self._add_moves(moves, square, KING_ATTACKS[square] & not_own, self.colors[color ^ 1])
+
+        if ep_square >= 0:
+            pawns = self.pieces[color * 6 + PAWN]
+            for square_from in squares_of(PAWN_ATTACKS[color ^ 1][ep_square] & pawns):
+                moves.append(square_from | (ep_square << 6) | (EP_CAPTURE << 12))
+
+        if castling:
+            if attacked < 0:
+                attacked = self.attacks(color ^ 1)
+            self._generate_castles(moves, color, castling, attacked)
+
+        return moves
+
+    def generate_legal_moves(
+        self,
+        color: int,
+        ep_square: int = -1,
+        castling: int = 0,
+        attacked: int = -1,
+        captures_only: bool = False,
+    ) -> list[int]:
+        # legal moves for color: checkers and pinned pieces are computed once, so
+        # no move has to be played to know if it leaves the king in check
+        # attacked: squares attacked by the opponent if already known
+        # captures_only: only captures and promotions (quiescence search)
+        king = self.king_square(color)
+        if king < 0:
+            pseudo_legal = self.generate_moves(color, ep_square, castling, attacked)
+            if captures_only:
+                return [x for x in pseudo_legal if x >> 12 & (CAPTURE | PROMOTION)]
+            return pseudo_legal
+
+        moves: list[int] = []
+        them = color ^ 1
+        own_pieces = self.colors[color]
+        occupied = self.occupied
+        checkers, check_ray, pins = self.checks_and_pins(king, color)
+
+        # the king can not step back on a line attacked through its own square,
+        # out of check the squares attacked with or without the king are the same
+        if checkers or attacked < 0:
+            danger = self.attacks(them, occupied ^ (1 << king))
+        else:
+            danger = attacked
+        # pieces only take, pawns can also push to the last rank
+        capture_mask = pawn_mask = FULL
+        if captures_only:
+            capture_mask = self.colors[them]
+            pawn_mask = capture_mask | RANK_8 | RANK_1
+        king_targets = KING_ATTACKS[king] & ~own_pieces & ~danger & capture_mask
+        self._add_moves(moves, king, king_targets, self.colors[them])
+        if checkers & (checkers - 1):
+            # double check: only the king can move
+            return moves
+
+        targets = (FULL ^ own_pieces) & (check_ray if checkers else FULL)
+        pinned = 0
+        for square in pins:
+            pinned |= 1 << square
+        self._generate_pieces_moves(
+            moves, color, FULL ^ pinned, targets & capture_mask, targets & pawn_mask
+        )
+        for square, ray in pins.items():
+            self._generate_pieces_moves(
+                moves, color, 1 << square, targets & ray & capture_mask, targets & ray & pawn_mask
+            )
+
+        if ep_square >= 0:
+            self._generate_legal_ep(moves, color, king, ep_square, checkers, check_ray)
+
+        if castling and not checkers and not captures_only:
+            self._generate_castles(moves, color, castling, danger)
+
+        return moves
+
+    def _generate_legal_ep(
+        self, moves: list[int], color: int, king: int, ep_square: int, checkers: int, check_ray: int
+    ) -> None:
+        them = (color ^ 1) * 6
+        captured = ep_square + (8 if color == WHITE else -8)
+        stop_check = (1 << ep_square) | (1 << captured)
+        rooks = self.pieces[them + ROOK] | self.pieces[them + QUEEN]
+        bishops = self.pieces[them + BISHOP] | self.pieces[them + QUEEN]
+        pawns = self.pieces[color * 6 + PAWN]
+
+        for square_from in squares_of(PAWN_ATTACKS[color ^ 1][ep_square] & pawns):
+            if checkers and not check_ray & stop_check:
+                continue
+            # both pawns leave their squares: look for a discovered slider attack on the king
+            occupied = (self.occupied ^ (1 << square_from) ^ (1 << captured)) | (1 << ep_square)
+            if rook_attacks_from(king, occupied) & rooks:
+                continue
+            if bishop_attacks_from(king, occupied) & bishops:
+                continue
+            moves.append(square_from | (ep_square << 6) | (EP_CAPTURE << 12))
+
+    def _generate_pieces_moves(
+        self,
+        moves: list[int],
+        color: int,
+        from_squares: int,
+        targets: int,
+        pawn_targets: int = -1,
+    ) -> None:
+        # moves of all pieces but the king, starting from from_squares and arriving on targets
+        # (pawn_targets for pawns if they differ)
+        own = color * 6
+        enemy = self.colors[color ^ 1]
+        occupied = self.occupied
+
+        if pawn_targets < 0:
+            pawn_targets = targets
+        self._generate_pawn_moves(
+            moves, color, self.pieces[own + PAWN] & from_squares, pawn_targets
+        )
+        for square in squares_of(self.pieces[own + KNIGHT] & from_squares):
+            self._add_moves(moves, square, KNIGHT_ATTACKS[square] & targets, enemy)
+        for square in squares_of(self.pieces[own + BISHOP] & from_squares):
+            self._add_moves(moves, square, bishop_attacks_from(square, occupied) & targets, enemy)
+        for square in squares_of(self.pieces[own + ROOK] & from_squares):
+            self._add_moves(moves, square, rook_attacks_from(square, occupied) & targets, enemy)
+        for square in squares_of(self.pieces[own + QUEEN] & from_squares):
+            attacks = rook_attacks_from(square, occupied) | bishop_attacks_from(square, occupied)
+            self._add_moves(moves, square, attacks & targets, enemy)
+
+    @staticmethod
+    def _add_moves(moves: list[int], square_from: int, targets: int, enemy: int) -> None:
+        for square_to in squares_of(targets & enemy):
+            moves.append(square_from | (square_to << 6) | (CAPTURE << 12))
+        for square_to in squares_of(targets & ~enemy):
+            moves.append(square_from | (square_to << 6))
+
+    def _generate_pawn_moves(self, moves: list[int], color: int, pawns: int, targets: int) -> None:
+        if not pawns:
+            return
+        empty = FULL ^ self.occupied
+        enemy = self.colors[color ^ 1] & targets
+
+        if color == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & RANK_3) >> 8) & empty & targets
+            push = 8
+            captures = [
+                ((pawns >> 7) & NOT_FILE_A & enemy, 7),
+                ((pawns >> 9) & NOT_FILE_H & enemy, 9),
+            ]
+            last_rank = RANK_8
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & RANK_6) << 8) & empty & targets
+            push = -8
+            captures = [
+                ((pawns << 9) & NOT_FILE_A & enemy, -9),
+                ((pawns << 7) & NOT_FILE_H & enemy, -7),
+            ]
+            last_rank = RANK_1
+        single &= targets
+
+        for square_to in squares_of(single & ~last_rank):
+            moves.append((square_to + push) | (square_to << 6))
+        for square_to in squares_of(single & last_rank):
+            for promotion in (3, 2, 1, 0):
+                moves.append(
+                    (square_to + push) | (square_to << 6) | ((PROMOTION | promotion) << 12)
+                )
+        for square_to in squares_of(double):
+            moves.append((square_to + push * 2) | (square_to << 6) | (DOUBLE_PUSH << 12))
+        for capture_targets, offset in captures:
+            for square_to in squares_of(capture_targets & ~last_rank):
+                moves.append((square_to + offset) | (square_to << 6) | (CAPTURE << 12))
+            for square_to in squares_of(capture_targets & last_rank):
+                for promotion in (3, 2, 1, 0):
+                    moves.append(
+                        (square_to + offset)
+                        | (square_to << 6)
+                        | ((PROMOTION_CAPTURE | promotion) << 12)
+                    )
+
+    def _generate_castles(self, moves: list[int], color: int, castling: int, danger: int) -> None:
+        # danger: squares attacked by the opponent, the king can not castle out of,
+        # through or into check
+        king = 60 if color == WHITE else 4
+        if self.squares[king] != color * 6 + KING or danger & (1 << king):
+            return
+        rook = self.pieces[color * 6 + ROOK]
+        king_side = WHITE_KING_SIDE if color == WHITE else BLACK_KING_SIDE
+        queen_side = WHITE_QUEEN_SIDE if color == WHITE else BLACK_QUEEN_SIDE
+
+        if (
+            castling & king_side
+            and rook & (1 << (king + 3))
+            and not self.occupied & (0b11 << (king + 1))
+            and not danger & (0b11 << (king + 1))
+        ):
+            moves.append(king | ((king + 2) << 6) | (KING_CASTLE << 12))
+        if (
+            castling & queen_side
+            and rook & (1 << (king - 4))
+            and not self.occupied & (0b111 << (king - 3))
+            and not danger & (0b11 << (king - 2))
+        ):
+            moves.append(king | ((king - 2) << 6) | (QUEEN_CASTLE << 12))
@@ -10,10 +10,12 @@ import os
 import pygame
 from loguru import logger
 
+from bitboard import KING_CASTLE, QUEEN_CASTLE
 from config import FONT_DIR, IMG_DIR
 from move import Move
-from piece import Piece
+from piece import NO_PIECE, Piece
 from position import Position
+from zobrist import PIECE_KEYS, pieces_key
 
 COLOR_SCHEME_LIST = {
     "BLACK": ["#D6D7D4", "#211E24", "#000000"],
@@ -22,6 +24,7 @@ COLOR_SCHEME_LIST = {
 }
 
 COLOR_VALID_MOVE = "#26852A"
+COLOR_CHECK = "#C0392B"
 
 SQUARE_SIZE = 100
 BORDER_SIZE = 25
@@ -38,6 +41,8 @@ class Board:
     ) -> None:
         self.color_scheme = color_scheme
         self.board_content: list[list[Piece]] = [[] for _ in range(8)]
+        # zobrist key of the pieces on the board, see zobrist.py
+        self.key = 0
         self.asset_loaded = False
 
         # Mouse
@@ -51,7 +56,8 @@ class Board:
         self.player_plays = False
         self.move_done: bool
         self.move_played: Move
-        self.move_map: dict[tuple[int, int], list[Move]]
+        # position of the move being played, asked for the valid moves of a square
+        self.position: Position | None = None
         self.board_is_active = True  # set to false when checkmate / stalemate /draw
 
         self.new_move()
@@ -59,9 +65,14 @@ class Board:
     def new_move(self) -> None:
         self.drag = False
         self.drag_from = NULL_COORDS  # forbidden value to keep mypy happy
-        self.drag_piece = Piece()
+        self.drag_piece = NO_PIECE
         self.move_done = False
-        self.move_map = {}
+        self.position = None
+
+    def moves_from(self, coords: tuple[int, int]) -> list[Move]:
+        if self.position is None:
+            return []
+        return self.position.moves_from(coords)
 
     def _load_assets(self) -> None:
         # load assets used by the object
@@ -91,7 +102,7 @@ class Board:
         # Shall we drag ?
         if self.mouse_clicked["BUTTONDOWN"] and not self.drag:
             coords = self.mouse_to_grid()
-            if coords and coords in self.move_map:
+            if coords and self.moves_from(coords):
                 self.drag_piece = self.board_content[coords[0]][coords[1]]
                 if self.drag_piece:
                     self.drag = True
@@ -103,7 +114,7 @@ class Board:
         if not self.mouse_clicked["BUTTONDOWN"] and self.drag:
             coords = self.mouse_to_grid()
             if coords:
-                for move in self.move_map[self.drag_from]:
+                for move in self.moves_from(self.drag_from):
                     if coords == move.square_to:
                         # valid move => drop
                         self.move_played = move
@@ -111,7 +122,7 @@ class Board:
                         logger.info(f"Move played : {self.move_played}")
 
             # undrag
-            self.drag_piece = Piece()
+            self.drag_piece = NO_PIECE
             self.drag = False
             self.drag_from = NULL_COORDS
 
@@ -125,6 +136,7 @@ class Board:
         self.square_colors = COLOR_SCHEME_LIST[self.color_scheme]
         self._render_back(game_canvas)
         self._render_board(game_canvas)
+        self._render_check(game_canvas)
         self._render_marks(game_canvas)
         self._render_pieces(game_canvas)
         self._render_mouse_over(game_canvas)
@@ -176,6 +188,20 @@ class Board:
 
                 pygame.draw.rect(game_canvas, self.square_colors[(x + y) % 2], square)
 
+    def _render_check(self, game_canvas: pygame.Surface) -> None:
+        # king in check: color its square
+        if self.position is None or not self.position.in_check():
+            return
+        king = self.position.bitboard.king_square(self.position.color)
+        square = pygame.Rect(
+            (
+                BORDER_SIZE + (king % 8) * SQUARE_SIZE,
+                BORDER_SIZE + (king // 8) * SQUARE_SIZE,
+            ),
+            (SQUARE_SIZE, SQUARE_SIZE),
+        )
+        pygame.draw.rect(game_canvas, pygame.Color(COLOR_CHECK), square)
+
     def _render_back(self, game_canvas: pygame.Surface) -> None:
         # render back of board
         back_length = (BORDER_SIZE * 2) + (SQUARE_SIZE * 8)
@@ -228,8 +254,9 @@ class Board:
         if coords:
             line, col = coords
             # lines and targets except dragged piece
-            if (line, col) in self.move_map and not self.drag:
-                for move in self.move_map[(line, col)]:
+            moves = self.moves_from((line, col))
+            if moves and not self.drag:
+                for move in moves:
                     target_line, target_col = move.square_to
                     center_start = (
                         BORDER_SIZE
@@ -247,7 +274,7 @@ class Board:
                     )
                     self._render_line(game_canvas, center_start, center_end)
 
-                for move in self.move_map[(line, col)]:
+                for move in moves:
                     target_line, target_col = move.square_to
                     center_end = (
                         BORDER_SIZE + SQUARE_SIZE / 2 + target_col * SQUARE_SIZE,
@@ -258,7 +285,8 @@ class Board:
             # lines and targets for dragged piece
             if self.drag:
                 line, col = self.drag_from
-                for move in self.move_map[line, col]:
+                moves = self.moves_from(self.drag_from)
+                for move in moves:
                     target_line, target_col = move.square_to
                     center_start = (
                         BORDER_SIZE
@@ -276,7 +304,7 @@ class Board:
                     )
                     self._render_line(game_canvas, center_start, center_end)
 
-                for move in self.move_map[(line, col)]:
+                for move in moves:
                     target_line, target_col = move.square_to
                     center_end = (
                         BORDER_SIZE + SQUARE_SIZE / 2 + target_col * SQUARE_SIZE,
@@ -289,7 +317,7 @@ class Board:
             highlight_color = pygame.Color("White")
             if (
                 self.drag
-                and coords not in [x.square_to for x in self.move_map[self.drag_from]]
+                and coords not in [x.square_to for x in self.moves_from(self.drag_from)]
                 and coords != self.drag_from
             ):
                 highlight_color = pygame.Color("Red")
@@ -350,12 +378,13 @@ class Board:
             for x in line:
                 if x.isdigit():
                     for _ in range(int(x)):
-                        self.board_content[cur_board_line].append(Piece())
+                        self.board_content[cur_board_line].append(NO_PIECE)
                 else:
                     self.board_content[cur_board_line].append(
                         Piece(x.upper(), "b" if x.islower() else "w")
                     )
             cur_board_line += 1
+        self.key = pieces_key([piece.code for line in self.board_content for piece in line])
 
     def get_FEN_from_board(self) -> str:
         # save board content as a FEN string
@@ -394,25 +423,38 @@ class Board:
         ) // SQUARE_SIZE
 
     def do_move(self, move: Move) -> None:
-        color = self.board_content[move.square_from[0]][move.square_from[1]].color
+        line_from, col_from = move.square_from
+        line_to, col_to = move.square_to
+        piece = self.board_content[line_from][col_from]
+        color = piece.color
 
-        self.board_content[move.square_to[0]][move.square_to[1]] = self.board_content[
-            move.square_from[0]
-        ][move.square_from[1]]
-        self.board_content[move.square_from[0]][move.square_from[1]] = Piece()
+        self._remove_piece(line_to, col_to)
+        self._remove_piece(line_from, col_from)
+        if move.is_promotion:
+            piece = Piece(move.promotion or "Q", color)
+        self._put_piece(piece, line_to, col_to)
 
         # castle => Move rook also
-        if move.chess_move == "0-0":
-            self.board_content[move.square_to[0]][5] = self.board_content[move.square_from[0]][7]
-            self.board_content[move.square_from[0]][7] = Piece()
-        if move.chess_move == "0-0-0":
-            self.board_content[move.square_to[0]][3] = self.board_content[move.square_from[0]][0]
-            self.board_content[move.square_from[0]][0] = Piece()
+        if move.flag == KING_CASTLE:
+            self._put_piece(self._remove_piece(line_from, 7), line_to, 5)
+        if move.flag == QUEEN_CASTLE:
+            self._put_piece(self._remove_piece(line_from, 0), line_to, 3)
 
         # en passant => capture piece behind pawn moved
         PAWN_MOVE_DIRECTION = -1 if color == "w" else 1
-        if move.chess_move.endswith(" e.p"):
-            self.board_content[move.square_to[0] - PAWN_MOVE_DIRECTION][move.square_to[1]] = Piece()
+        if move.is_en_passant:
+            self._remove_piece(line_to - PAWN_MOVE_DIRECTION, col_to)
+
+    def _put_piece(self, piece: Piece, line: int, col: int) -> None:
+        self.board_content[line][col] = piece
+        self.key ^= PIECE_KEYS[piece.code * 64 + line * 8 + col]
+
+    def _remove_piece(self, line: int, col: int) -> Piece:
+        piece = self.board_content[line][col]
+        if piece:
+            self.key ^= PIECE_KEYS[piece.code * 64 + line * 8 + col]
+            self.board_content[line][col] = NO_PIECE
+        return piece
 
     @staticmethod
     def center_text(
@@ -0,0 +1,242 @@
+"""
+Opening book: moves known for the first positions of a game, read from a binary file
+and built from PGN files or batch game records (see batch.py)
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from random import randint
+
+from loguru import logger
+
+from bitboard import (
+    CAPTURE,
+    KING_CASTLE,
+    PAWN,
+    PIECE_LETTERS,
+    PROMOTION,
+    QUEEN_CASTLE,
+    SQUARE_NAMES,
+    uci,
+)
+from config import BOOK_FILE
+from position import START_FEN, Position, position_from_FEN
+
+# entries as in Polyglot books: key, move, weight, learn (unused), big endian, sorted by key.
+# Keys are the zobrist keys of zobrist.py and moves the move ints of bitboard.py, so the
+# files can not be shared with Polyglot tools.
+ENTRY = struct.Struct(">QHHI")
+KEY = struct.Struct(">Q")
+MAX_WEIGHT = 0xFFFF
+
+DEFAULT_MAX_PLY = 16
+# weight of a move for the side playing it, by game result
+RESULT_WEIGHTS = {"1-0": (2, 0), "0-1": (0, 2), "1/2-1/2": (1, 1), "*": (1, 1)}
+
+
+class OpeningBook:
+    # the file is memory mapped: a probe binary searches the entries in place
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.nb_entries = size // ENTRY.size
+        # an empty file can not be mapped
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _lower_bound(self, key: int) -> int:
+        # index of the first entry with a key >= key
+        low, high = 0, self.nb_entries
+        data = self.data
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def probe(self, key: int) -> list[tuple[int, int]]:
+        # (move, weight) of the position with zobrist key key
+        moves = []
+        index = self._lower_bound(key)
+        while index < self.nb_entries:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, index * ENTRY.size)
+            if entry_key != key:
+                break
+            moves.append((move, weight))
+            index += 1
+        return moves
+
+    def choose(self, position: Position) -> int:
+        # legal book move picked at random by weight, 0 if the position is not in the book
+        legal_moves = position.legal_codes()
+        moves = [(move, weight) for move, weight in self.probe(position.key) if move in legal_moves]
+        total = sum(weight for _, weight in moves)
+        if not total:
+            return 0
+        pick = randint(1, total)
+        for move, weight in moves:
+            pick -= weight
+            if pick <= 0:
+                return move
+        return 0
+
+
+_opening_book: OpeningBook | None = None
+
+
+def opening_book() -> OpeningBook | None:
+    # book of config.BOOK_FILE, None if there is no book file
+    global _opening_book
+    if _opening_book is None and os.path.exists(BOOK_FILE):
+        _opening_book = OpeningBook(BOOK_FILE)
+    return _opening_book
+
+
+def san(position: Position, move: int) -> str:
+    # standard algebraic notation of a legal move, without check sign: "Nbd7", "exd5", "e8=Q"
+    flag = move >> 12
+    if flag == KING_CASTLE:
+        return "O-O"
+    if flag == QUEEN_CASTLE:
+        return "O-O-O"
+    square_from, square_to = move & 63, (move >> 6) & 63
+    piece = position.bitboard.squares[square_from] % 6
+    name = ""
+    if piece == PAWN:
+        if flag & CAPTURE:
+            name = SQUARE_NAMES[square_from][0]
+    else:
+        name = PIECE_LETTERS[piece]
+        # other pieces of the same type going to the same square
+        others = [
+            other & 63
+            for other in position.legal_codes()
+            if (other >> 6) & 63 == square_to
+            and other & 63 != square_from
+            and position.bitboard.squares[other & 63] % 6 == piece
+        ]
+        if others:
+            if all(SQUARE_NAMES[x][0] != SQUARE_NAMES[square_from][0] for x in others):
+                name += SQUARE_NAMES[square_from][0]
+            elif all(SQUARE_NAMES[x][1] != SQUARE_NAMES[square_from][1] for x in others):
+                name += SQUARE_NAMES[square_from][1]
+            else:
+                name += SQUARE_NAMES[square_from]
+    if flag & CAPTURE:
+        name += "x"
+    name += SQUARE_NAMES[square_to]
+    if flag & PROMOTION:
+        name += "=" + "NBRQ"[flag & 3]
+    return name
+
+
+def read_pgn(path: str) -> Iterator[tuple[str, list[str]]]:
+    # (result, SAN moves) of each game of a PGN file, read line by line
+    result = "*"
+    movetext: list[str] = []
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        for line in pgn:
+            # ; comments run to the end of the line
+            line = line.split(";")[0].strip()
+            if line.startswith("["):
+                if movetext:
+                    yield result, _pgn_moves(" ".join(movetext))
+                    movetext = []
+                    result = "*"
+                tag = re.match(r'\[Result "(.*)"\]', line)
+                if tag:
+                    result = tag.group(1)
+            elif line:
+                movetext.append(line)
+    if movetext:
+        yield result, _pgn_moves(" ".join(movetext))
+
+
+def _pgn_moves(movetext: str) -> list[str]:
+    # comments, variations, annotations and move numbers removed
+    movetext = re.sub(r"\{[^}]*\}|\$\d+", " ", movetext)
+    while "(" in movetext:
+        stripped = re.sub(r"\([^()]*\)", " ", movetext)
+        if stripped == movetext:
+            break
+        movetext = stripped
+    moves = []
+    for token in movetext.split():
+        token = re.sub(r"^\d+\.+", "", token).rstrip("+#!?")
+        if token and token not in RESULT_WEIGHTS:
+            moves.append(token.replace("0", "O") if token.startswith("0-0") else token)
+    return moves
+
+
+def read_records(path: str) -> Iterator[tuple[str, list[str]]]:
+    # (result, uci moves) of each game of a batch record file: "1-0 e2e4 e7e5 ..." per line
+    with open(path, encoding="utf-8") as records:
+        for line in records:
+            tokens = line.split()
+            if tokens:
+                yield tokens[0], tokens[1:]
+
+
+class BookBuilder:
+    def __init__(self, max_ply: int = DEFAULT_MAX_PLY) -> None:
+        self.max_ply = max_ply
+        self.weights: Counter[tuple[int, int]] = Counter()
+        self.nb_games = 0
+
+    def add_games(self, games: Iterable[tuple[str, list[str]]], notation: str = "san") -> None:
+        # games: (result, moves) with moves in "san" or "uci" notation
+        for result, moves in games:
+            self.add_game(result, moves, notation)
+
+    def add_game(self, result: str, moves: list[str], notation: str = "san") -> None:
+        weights = RESULT_WEIGHTS.get(result, RESULT_WEIGHTS["*"])
+        position = position_from_FEN(START_FEN)
+        name = uci if notation == "uci" else lambda move: san(position, move)
+        for ply, played in enumerate(moves[: self.max_ply]):
+            legal_moves = {name(move): move for move in position.legal_codes()}
+            move = legal_moves.get(played)
+            if move is None:
+                logger.warning(f"game {self.nb_games + 1}: illegal move {played} at ply {ply}")
+                break
+            weight = weights[position.color]
+            if weight:
+                self.weights[(position.key, move)] += weight
+            position.push(move)
+        self.nb_games += 1
+
+    def write(self, path: str) -> int:
+        # number of entries written
+        entries = sorted(self.weights.items(), key=lambda entry: (entry[0][0], -entry[1]))
+        with open(path, "wb") as book:
+            for (key, move), weight in entries:
+                book.write(ENTRY.pack(key, move, min(weight, MAX_WEIGHT), 0))
+        return len(entries)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build an opening book")
+    parser.add_argument("--pgn", nargs="*", default=[], help="PGN files")
+    parser.add_argument("--records", nargs="*", default=[], help="batch game record files")
+    parser.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY)
+    parser.add_argument("--out", default=BOOK_FILE, help=f"book file (default: {BOOK_FILE})")
+    args = parser.parse_args()
+
+    builder = BookBuilder(args.max_ply)
+    for path in args.pgn:
+        builder.add_games(read_pgn(path), "san")
+    for path in args.records:
+        builder.add_games(read_records(path), "uci")
+    nb_entries = builder.write(args.out)
+    logger.info(f"{builder.nb_games} games, {nb_entries} entries written to {args.out}")
@@ -10,6 +10,10 @@ ASSET_DIR = os.path.join("assets")
 FONT_DIR = os.path.join(ASSET_DIR, "fonts")
 IMG_DIR = os.path.join(ASSET_DIR, "imgs")
 SOUND_DIR = os.path.join(ASSET_DIR, "sounds")
+# opening book used by the AIs if present (built by book.py)
+BOOK_FILE = os.path.join(ASSET_DIR, "book.bin")
+# endgame tables used by the AIs and to adjudicate AI games (built by tablebase.py)
+TABLEBASE_DIR = os.path.join(ASSET_DIR, "tablebases")
 
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 960
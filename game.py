@@ -6,19 +6,25 @@ Chess game
 
 import os
 import sys
+from collections import Counter
 
 import pygame
 from loguru import logger
 
 from ai.ai import Ai
+from ai.engine import Engine
 from board import BORDER_SIZE, COLOR_SCHEME_LIST, SQUARE_SIZE, Board
 from common import FlagsT, center_text
 from config import FONT_DIR, SCREEN_HEIGHT, SCREEN_WIDTH, SOUND_DIR
+from move import Move
 from piece import Piece
 from position import Position
+from tablebase import DRAW, WIN, tablebase
 
 FEN_INITIAL_BOARD = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
 COLOR_TO_TEXT = {"w": "White", "b": "Black"}
+# end of an AI game adjudicated by the endgame tables: "White wins by Tablebase"
+TABLEBASE_WIN = "wins by Tablebase"
 
 BOARD_SIZE = (SQUARE_SIZE * 8) + (BORDER_SIZE * 2)
 
@@ -31,8 +37,10 @@ class Game:
         ai_types: tuple[str, str] = ("random", "random"),
         batched: bool = False,
     ) -> None:
-        self.move_list: list[str]
+        self.move_list: list[Move]
         self.FEN_list: list[str]
+        # number of times each position (zobrist key) was reached
+        self.key_counts: Counter[int]
 
         # dict containing information on the game such as
         # who is to play / is a king in check / have king moved (for castle)
@@ -41,7 +49,8 @@ class Game:
         self.waiting_for_promotion: bool
         self.promote_choice: str
         self.board: Board
-        self.ai: Ai
+        # one engine per AI color, kept for the whole game
+        self.engines: dict[str, Engine] = {}
         self.batched = batched
         self.ai_type: dict[str, str] = {"w": ai_types[0], "b": ai_types[1]}
 
@@ -66,6 +75,7 @@ class Game:
         logger.info(f"Starting Game {white_text} vs {black_text}")
         self.move_list = []
         self.FEN_list = []
+        self.key_counts = Counter()
         self.game_status = "Started"
         self.waiting_for_promotion = False
         self.promote_choice = ""
@@ -79,7 +89,7 @@ class Game:
     def next_move(self) -> None:
         self.board.new_move()
         self.position = Position(self.board.board_content, self.flags)
-        self.board.move_map = self.position.move_map
+        self.board.position = self.position
 
         # check for end of game
         if self.board.board_is_active:
@@ -91,32 +101,73 @@ class Game:
         # signal to the board if a human is player next move
         if self.flags["color"] in self.flags["player_color"]:
             self.board.player_plays = True
+            # the AI searches during the player's time
+            opponent = "b" if self.flags["color"] == "w" else "w"
+            if self.game_status == "Started" and opponent in self.engines:
+                self.engines[opponent].ponder(self.position)
         else:
             self.board.player_plays = False
             if self.game_status == "Started":
-                self.ai = self.get_ai()
-                Ai(self.position, self.flags["color"])
+                engine = self.get_engine()
+                # the engine may already be searching this position (player move expected)
+                if not self.move_list or not engine.ponder_hit(self.move_list[-1]):
+                    engine.search(self.position)
 
         if not self.batched:
             logger.info(
                 f"Turn {self.turn} {COLOR_TO_TEXT[self.flags['color']]} ({'Player' if self.board.player_plays else 'AI'}) plays"
             )
 
+    def get_engine(self) -> Engine:
+        color = self.flags["color"]
+        if color not in self.engines:
+            self.engines[color] = Engine(self.get_ai())
+        return self.engines[color]
+
+    def quit_engines(self) -> None:
+        # stop the searches and end the engine threads
+        for engine in self.engines.values():
+            engine.quit()
+        self.engines = {}
+
     def get_ai(self) -> Ai:
+        # the AI searches in its engine thread
         color = self.flags["color"]
         match self.ai_type[color]:
             case "random":
                 from ai.random_ai import Random_Ai
 
-                return Random_Ai(self.position, color)
+                return Random_Ai(self.position, color, start=False)
             case "basic":
                 from ai.basic_ai import Basic_Ai
 
-                return Basic_Ai(self.position, color)
+                return Basic_Ai(self.position, color, start=False)
+            # each minmax AI has its own table, kept by its engine for the whole game: no
+            # cuts from the entries of the other player (e.g. of the other search features)
             case "minmax":
                 from ai.minmax_ai import Minmax_Ai
+                from ai.transposition import TranspositionTable
 
-                return Minmax_Ai(self.position, color)
+                return Minmax_Ai(
+                    self.position, color, transposition_table=TranspositionTable(), start=False
+                )
+            case "minmax_plain":
+                from ai.minmax_ai import Plain_Minmax_Ai
+                from ai.transposition import TranspositionTable
+
+                return Plain_Minmax_Ai(
+                    self.position, color, transposition_table=TranspositionTable(), start=False
+                )
+            case "parallel":
+                from ai.parallel import Parallel_Ai
+                from ai.shared_transposition import SharedTranspositionTable
+
+                return Parallel_Ai(
+                    self.position,
+                    color,
+                    transposition_table=SharedTranspositionTable(),
+                    start=False,
+                )
             case _:
                 logger.error(f"Unknwon AI type {self.ai_type[color]}")
                 sys.exit(1)
@@ -128,13 +179,15 @@ class Game:
             return
         if self.is_fifty_move_rule():
             return
-        _ = self.is_dead_position()
+        if self.is_dead_position():
+            return
+        _ = self.is_tablebase_result()
 
     def is_checkmate_stalemate(self) -> bool:
         # Detect checkmate and stalemate
-        if not self.board.move_map:
-            if self.move_list[len(self.move_list) - 1].endswith("+"):
-                self.move_list[len(self.move_list) - 1] += "+"
+        if not self.position.has_legal_moves():
+            if self.move_list[-1].check:
+                self.move_list[-1].mate = True
                 self.game_status = "Checkmate !"
             else:
                 self.game_status = "Stalemate"
@@ -148,16 +201,14 @@ class Game:
     def is_treefold_repetition(self) -> bool:
         # Detect draws : https://www.chess.com/terms/draw-chess
         # Detect Threefold Repetition
-        fen_string = self.board.get_FEN_from_board()
-        cnt = 0
-        for board_fen in reversed(self.FEN_list):
-            if board_fen == fen_string:
-                cnt += 1
-            if cnt >= 2:
-                self.game_status = "Draw by Threefold Repetition"
-                self.board.board_is_active = False
-                self.FEN_list.append(fen_string)
-                return True
+        # same pieces, side to move, castling rights and en passant => same zobrist key
+        key = self.board.key ^ self.position.state_key()
+        self.key_counts[key] += 1
+        if self.key_counts[key] >= 3:
+            self.game_status = "Draw by Threefold Repetition"
+            self.board.board_is_active = False
+            self.FEN_list.append(self.board.get_FEN_from_board())
+            return True
 
         return False
 
@@ -167,11 +218,8 @@ class Game:
             # at least 50 move
             return False
         for move in self.move_list[-50:]:
-            # no captures
-            if "x" in move:
-                return False
-            # no move by pawn
-            if move[0].islower():
+            # no captures and no move by pawn
+            if move.is_capture or move.is_pawn_move:
                 return False
 
         self.game_status = "Draw by 50-Move Rule"
@@ -227,6 +275,26 @@ class Game:
 
         return False
 
+    def is_tablebase_result(self) -> bool:
+        # AI games end as soon as the endgame tables know the result,
+        # a human player plays the ending
+        if self.flags["game_type"] != "AIVAI":
+            return False
+        tables = tablebase()
+        probe = tables.probe(self.position) if tables is not None else None
+        if probe is None:
+            return False
+        result, _ = probe
+        if result == DRAW:
+            self.game_status = "Draw by Tablebase"
+        else:
+            color = self.flags["color"]
+            winner = color if result == WIN else ("b" if color == "w" else "w")
+            self.game_status = f"{COLOR_TO_TEXT[winner]} {TABLEBASE_WIN}"
+        self.board.board_is_active = False
+        self.FEN_list.append(self.board.get_FEN_from_board())
+        return True
+
     def _load_assets(self) -> None:
         # load assets used by the object
 
@@ -255,34 +323,26 @@ class Game:
         if self.board.player_plays and not self.board.move_done:
             return
 
-        if not self.board.player_plays and not self.ai.get_next_move_finished:
-            return
-
-        if not self.board.player_plays and self.ai.get_next_move_finished:
-            self.board.move_played = self.ai.move
-            self.ai.get_next_move_finished = True
+        if not self.board.player_plays:
+            engine = self.engines[self.flags["color"]]
+            if not engine.finished or engine.move is None:
+                return
+            self.board.move_played = engine.move
 
         # move done by either player or AI => update board and game objects
 
         # check for promotion loop until the piece type is chosen
-        if self.board.move_played.chess_move[0].islower():
-            if (self.flags["color"] == "w" and self.board.move_played.square_to[0] == 0) or (
-                self.flags["color"] == "b" and self.board.move_played.square_to[0] == 7
-            ):
-                self.waiting_for_promotion = True
-                if not self.board.player_plays:
-                    self.promote_choice = self.board.move_played.chess_move[-1]
+        if self.board.move_played.is_promotion:
+            self.waiting_for_promotion = True
+            if not self.board.player_plays:
+                self.promote_choice = self.board.move_played.promotion
 
         if self.waiting_for_promotion:
             if not self.promote_choice:
                 return
             else:
-                # add piece to chess move and transform pawn in promoted piece
-                if self.board.player_plays:
-                    self.board.move_played.chess_move += self.promote_choice
-                self.board.board_content[self.board.move_played.square_from[0]][
-                    self.board.move_played.square_from[1]
-                ].piece = self.promote_choice
+                # add piece to chess move, the board puts the promoted piece when moving
+                self.board.move_played.promotion = self.promote_choice
                 self.waiting_for_promotion = False
                 self.promote_choice = ""
 
@@ -290,14 +350,15 @@ class Game:
         self.FEN_list.append(self.board.get_FEN_from_board())
 
         # Update flags
-        if self.board.move_played.chess_move.startswith("K"):
+        if self.board.move_played.is_king_move:
             if self.flags["color"] == "w":
                 self.flags["wKing_can_castle"] = False
             else:
                 self.flags["bKing_can_castle"] = False
 
-        # Update Board
+        # Update Board and position
         self.board.do_move(self.board.move_played)
+        self.position.make_move(self.board.move_played)
 
         # switch Player
         if self.flags["color"] == "w":
@@ -306,10 +367,10 @@ class Game:
             self.flags["color"] = "w"
 
         # check if opposite king is in check
-        if self.position.king_is_in_check(self.board.board_content):
+        if self.position.in_check():
             if not self.batched:
                 logger.info(f"{COLOR_TO_TEXT[self.flags['color']]} King is in check")
-            self.board.move_played.chess_move += "+"
+            self.board.move_played.check = True
             if self.flags["game_type"] != "AIVAI":
                 pygame.mixer.Sound.play(self.snd_check)
 
@@ -317,7 +378,7 @@ class Game:
         if not self.batched:
             logger.info(f"- {self.board.move_played.chess_move}")
         self.flags["previous_move"] = self.board.move_played.chess_move
-        self.move_list.append(self.board.move_played.chess_move)
+        self.move_list.append(self.board.move_played)
         if self.flags["game_type"] != "AIVAI":
             pygame.mixer.Sound.play(self.snd_move_piece)
 
@@ -365,12 +426,12 @@ class Game:
             if (cnt - offset) >= 0:
                 col = (cnt - offset) // 72
                 if cnt % 2 == 0:
-                    move = f"{(cnt + 2) // 2:0>2} {move} "
+                    text = f"{(cnt + 2) // 2:0>2} {move} "
                 else:
-                    move = f"          - {move}"
+                    text = f"          - {move}"
                 game_canvas.blit(
                     self.font_move.render(
-                        move,
+                        text,
                         True,
                         pygame.Color("White"),
                     ),
@@ -79,6 +79,7 @@ class Chess:
                 self.game.board.mouse_clicked = self.mouse_clicked
                 self.game.update()
             else:
+                self.game.quit_engines()
                 self.game_status = "start menu"
                 self.start_menu = StartMenu()
 
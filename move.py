@@ -2,16 +2,136 @@
 
 class containing a chess move (square from / square to / chess move name
 
+the move is packed in a 16 bits code (square from | square to << 6 | flag << 12, see bitboard.py)
+plus the moving and captured pieces; the chess move name is only built when displayed
+
 """
 
+from bitboard import (
+    CAPTURE,
+    DOUBLE_PUSH,
+    EMPTY,
+    EP_CAPTURE,
+    KING,
+    KING_CASTLE,
+    PAWN,
+    PIECE_LETTERS,
+    PROMOTION,
+    QUEEN_CASTLE,
+    SQUARE_NAMES,
+    encode_move,
+)
+
 
 class Move:
+    __slots__ = ("code", "piece", "captured", "promotion", "check", "mate", "_chess_move")
+
+    code: int
+    # piece codes (color * 6 + piece type, EMPTY if none)
+    piece: int
+    captured: int
+    # letter of the promoted piece ("Q", "N"...), empty until chosen
+    promotion: str
+    check: bool
+    mate: bool
+    _chess_move: str
+
     def __init__(
-        self, square_from: tuple[int, int], square_to: tuple[int, int], chess_move: str
+        self,
+        square_from: tuple[int, int],
+        square_to: tuple[int, int],
+        chess_move: str = "",
+        flag: int = 0,
     ) -> None:
-        self.square_from = square_from
-        self.square_to = square_to
-        self.chess_move = chess_move
+        self.code = encode_move(
+            square_from[0] * 8 + square_from[1], square_to[0] * 8 + square_to[1], flag
+        )
+        self.piece = EMPTY
+        self.captured = EMPTY
+        self.promotion = ""
+        self.check = False
+        self.mate = False
+        # explicit name given by the caller, the name is built from the code otherwise
+        self._chess_move = chess_move
+
+    @classmethod
+    def from_code(cls, code: int, piece: int, captured: int = EMPTY) -> "Move":
+        move = cls.__new__(cls)
+        move.code = code
+        move.piece = piece
+        move.captured = captured
+        move.promotion = ""
+        move.check = False
+        move.mate = False
+        move._chess_move = ""
+        return move
+
+    @property
+    def square_from(self) -> tuple[int, int]:
+        return divmod(self.code & 63, 8)
+
+    @property
+    def square_to(self) -> tuple[int, int]:
+        return divmod((self.code >> 6) & 63, 8)
+
+    @property
+    def flag(self) -> int:
+        return self.code >> 12
+
+    @property
+    def is_capture(self) -> bool:
+        return bool(self.code >> 12 & CAPTURE)
+
+    @property
+    def is_en_passant(self) -> bool:
+        return self.code >> 12 == EP_CAPTURE
+
+    @property
+    def is_castle(self) -> bool:
+        return self.code >> 12 in (KING_CASTLE, QUEEN_CASTLE)
+
+    @property
+    def is_double_push(self) -> bool:
+        return self.code >> 12 == DOUBLE_PUSH
+
+    @property
+    def is_promotion(self) -> bool:
+        return bool(self.code >> 12 & PROMOTION)
+
+    @property
+    def is_pawn_move(self) -> bool:
+        return self.piece != EMPTY and self.piece % 6 == PAWN
+
+    @property
+    def is_king_move(self) -> bool:
+        return self.piece != EMPTY and self.piece % 6 == KING
+
+    @property
+    def chess_move(self) -> str:
+        # "e2e4", "Nb1xc3", "e5xd6 e.p", "0-0", "e7e8Q+"...
+        if self._chess_move:
+            return self._chess_move
+        flag = self.code >> 12
+        if flag == KING_CASTLE:
+            name = "0-0"
+        elif flag == QUEEN_CASTLE:
+            name = "0-0-0"
+        else:
+            kind = self.piece % 6 if self.piece != EMPTY else PAWN
+            letter = "" if kind == PAWN else PIECE_LETTERS[kind]
+            capture = "x" if flag & CAPTURE else ""
+            square_from = SQUARE_NAMES[self.code & 63]
+            name = f"{letter}{square_from}{capture}{SQUARE_NAMES[(self.code >> 6) & 63]}"
+            if flag == EP_CAPTURE:
+                name += " e.p"
+            name += self.promotion
+        if self.check:
+            name += "++" if self.mate else "+"
+        return name
+
+    @chess_move.setter
+    def chess_move(self, chess_move: str) -> None:
+        self._chess_move = chess_move
 
     def __str__(self) -> str:
         return self.chess_move
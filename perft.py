@@ -0,0 +1,122 @@
+"""
+Perft: count the leaf nodes of the move tree of reference positions
+to check move generation and measure its speed (nodes per second)
+"""
+
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from loguru import logger
+
+from bitboard import uci
+from position import START_FEN, position_from_FEN
+
+# https://www.chessprogramming.org/Perft_Results
+# name: (FEN, expected node count for depth 1, 2, 3...)
+REFERENCE_POSITIONS: dict[str, tuple[str, list[int]]] = {
+    "start": (
+        START_FEN,
+        [20, 400, 8902, 197281, 4865609, 119060324],
+    ),
+    "kiwipete": (
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        [48, 2039, 97862, 4085603, 193690690],
+    ),
+    "position3": (
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        [14, 191, 2812, 43238, 674624, 11030083],
+    ),
+    "position4": (
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+        [6, 264, 9467, 422333, 15833292],
+    ),
+    "position5": (
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        [44, 1486, 62379, 2103487, 89941194],
+    ),
+    "position6": (
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        [46, 2079, 89890, 3894594, 164075551],
+    ),
+}
+
+
+def _perft_root_move(fen: str, root_move: str, depth: int) -> tuple[str, int]:
+    # run in a worker process: perft of the position after one root move
+    position = position_from_FEN(fen)
+    for move in position.legal_codes():
+        if uci(move) == root_move:
+            position.push(move)
+            return root_move, position.perft(depth - 1)
+    return root_move, 0
+
+
+def perft_divide(fen: str, depth: int, processes: int = 1) -> dict[str, int]:
+    # nodes per root move, root moves are split across a process pool if processes > 1
+    position = position_from_FEN(fen)
+    if processes <= 1 or depth <= 1:
+        return position.perft_divide(depth)
+
+    root_moves = [uci(x) for x in position.legal_codes()]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        results = executor.map(
+            _perft_root_move,
+            [fen] * len(root_moves),
+            root_moves,
+            [depth] * len(root_moves),
+        )
+        return dict(results)
+
+
+def perft(fen: str, depth: int, processes: int = 1) -> int:
+    if processes <= 1:
+        return position_from_FEN(fen).perft(depth)
+    return sum(perft_divide(fen, depth, processes).values())
+
+
+def run(fen: str, depth: int, processes: int, divide: bool, expected: int = -1) -> bool:
+    start = time.perf_counter()
+    if divide:
+        nodes_per_move = perft_divide(fen, depth, processes)
+        for move in sorted(nodes_per_move):
+            logger.info(f"{move: <6}: {nodes_per_move[move]}")
+        nodes = sum(nodes_per_move.values())
+    else:
+        nodes = perft(fen, depth, processes)
+    elapsed = time.perf_counter() - start
+
+    result = ""
+    if expected >= 0:
+        result = "OK" if nodes == expected else f"FAILED (expected {expected})"
+    logger.info(
+        f"depth {depth} nodes {nodes} time {elapsed:.2f}s nps {nodes / max(elapsed, 1e-9):.0f} {result}"
+    )
+    return expected < 0 or nodes == expected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft node count and move generation benchmark")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument(
+        "--position",
+        choices=["all", *REFERENCE_POSITIONS],
+        default="all",
+        help="reference position to use (default: all of them)",
+    )
+    parser.add_argument("--fen", help="FEN string of a position to use instead of references")
+    parser.add_argument("--divide", action="store_true", help="show node count per root move")
+    parser.add_argument(
+        "--processes", type=int, default=1, help="split root moves across a process pool"
+    )
+    args = parser.parse_args()
+
+    if args.fen:
+        run(args.fen, args.depth, args.processes, args.divide)
+    else:
+        names = list(REFERENCE_POSITIONS) if args.position == "all" else [args.position]
+        for name in names:
+            fen, expected_nodes = REFERENCE_POSITIONS[name]
+            logger.info(f"{name}: {fen}")
+            expected = expected_nodes[args.depth - 1] if args.depth <= len(expected_nodes) else -1
+            run(fen, args.depth, args.processes, args.divide, expected)
@@ -2,21 +2,65 @@
 
 class containing a chess piece
 
+pieces are immutable and interned: Piece("K", "w") always returns the same object,
+so pieces are compared by identity and the board never allocates new ones
+
 """
 
+from typing import ClassVar
+
 
 class Piece:
-    def __init__(self, piece: str = "", color: str = "") -> None:
-        self.piece = piece
-        self.color = color
+    __slots__ = ("piece", "color", "code", "_is_piece")
+
+    piece: str
+    color: str
+    # small int code used by the bitboards: color * 6 + piece type, -1 for an empty square
+    code: int
+    _is_piece: bool
+
+    _instances: ClassVar[dict[tuple[str, str], "Piece"]] = {}
+
+    def __new__(cls, piece: str = "", color: str = "") -> "Piece":
+        instance = cls._instances.get((piece, color))
+        if instance is None:
+            instance = super().__new__(cls)
+            object.__setattr__(instance, "piece", piece)
+            object.__setattr__(instance, "color", color)
+            code = "wb".index(color) * 6 + "PNBRQK".index(piece) if piece else -1
+            object.__setattr__(instance, "code", code)
+            object.__setattr__(instance, "_is_piece", bool(piece or color))
+            cls._instances[(piece, color)] = instance
+        return instance
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Piece objects are immutable")
 
     def __str__(self) -> str:
         return f"{self.piece}{self.color}"
 
     def __bool__(self) -> bool:
-        return bool(self.__str__())
+        return self._is_piece
 
     def __eq__(self, other: object) -> bool:
-        if not isinstance(other, Piece):
-            return False
-        return (self.piece == other.piece) and (self.color == other.color)
+        # pieces are interned: equal pieces are the same object
+        return self is other
+
+    def __hash__(self) -> int:
+        return id(self)
+
+    def __copy__(self) -> "Piece":
+        return self
+
+    def __deepcopy__(self, memo: dict[int, object]) -> "Piece":
+        return self
+
+    def __reduce__(self) -> tuple[type["Piece"], tuple[str, str]]:
+        # unpickling goes through __new__ and gets the interned piece back
+        return Piece, (self.piece, self.color)
+
+
+NO_PIECE = Piece()
+
+# all pieces indexed by code
+PIECES = [Piece(piece, color) for color in "wb" for piece in "PNBRQK"]
@@ -4,11 +4,53 @@ Object used to analyse a position during a game
 
 """
 
-import copy
-
+from bitboard import (
+    BLACK,
+    BLACK_KING_SIDE,
+    BLACK_QUEEN_SIDE,
+    CAPTURE,
+    CASTLING_MASKS,
+    COLOR_INDEX,
+    DOUBLE_PUSH,
+    EMPTY,
+    EP_CAPTURE,
+    KING,
+    KING_CASTLE,
+    KNIGHT,
+    PAWN,
+    PROMOTION,
+    QUEEN_CASTLE,
+    QUIET,
+    WHITE,
+    WHITE_KING_SIDE,
+    WHITE_QUEEN_SIDE,
+    BitBoard,
+    encode_move,
+    move_flag,
+    square_from_coords,
+    uci,
+)
 from common import FlagsT
 from move import Move
-from piece import Piece
+from piece import NO_PIECE, Piece
+from pst import EG_TABLE, MG_TABLE, PHASE_WEIGHT, scores
+from zobrist import PIECE_KEYS, pawns_key, pieces_key, state_key
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+CASTLING_LETTERS = {
+    "K": WHITE_KING_SIDE,
+    "Q": WHITE_QUEEN_SIDE,
+    "k": BLACK_KING_SIDE,
+    "q": BLACK_QUEEN_SIDE,
+}
+
+# promoted piece letter => low bits of the promotion flag
+PROMOTION_PIECES = {"N": 0, "B": 1, "R": 2, "Q": 3}
+
+# move, captured piece, captured square, castling rights, en passant square, rook from, rook to,
+# zobrist key, pawns zobrist key, middlegame score, endgame score, phase
+UndoT = tuple[int, int, int, int, int, int, int, int, int, int, int, int]
 
 CASTLE_MOVES = {
     "0-0": {
@@ -24,11 +66,41 @@ CASTLE_MOVES = {
 
 class Position:
     def __init__(self, board: list[list[Piece]], flags: FlagsT) -> None:
+        # the board grid is only read: make_move / unmake_move work on the bitboards
         self.board = board
         self.flags = flags
-        self.valid_moves = self.get_valid_moves()
-        self.move_map: dict[tuple[int, int], list[Move]] = {}
-        self.fill_move_map()
+        self.bitboard = BitBoard.from_board(board)
+
+        # state of the position, updated by make_move / unmake_move
+        self.color = COLOR_INDEX[flags["color"]]
+        self.castling = self._get_castling_rights()
+        self.ep_square = self._get_ep_square()
+        self.history: list[UndoT] = []
+        self.key = pieces_key(self.bitboard.squares) ^ self.state_key()
+        # key of the pawns alone, for the pawn structure hash table (ai/pawn_hash.py)
+        self.pawn_key = pawns_key(self.bitboard.squares)
+        # piece-square scores (white - black) and game phase, see pst.py
+        self.mg_score, self.eg_score, self.phase = scores(self.bitboard.squares)
+
+        # legal moves of the current state, only generated when asked for
+        self._valid_moves: list[Move] | None = None
+        self._move_map: dict[tuple[int, int], list[Move]] | None = None
+        # squares attacked by each color, cached for the state with zobrist key _attack_maps_key
+        self._attack_maps = [-1, -1]
+        self._attack_maps_key = self.key
+
+    @property
+    def valid_moves(self) -> list[Move]:
+        if self._valid_moves is None:
+            self._valid_moves = self.get_valid_moves()
+        return self._valid_moves
+
+    @property
+    def move_map(self) -> dict[tuple[int, int], list[Move]]:
+        if self._move_map is None:
+            self._move_map = {}
+            self.fill_move_map()
+        return self._move_map
 
     def fill_move_map(self) -> None:
         for move in self.valid_moves:
@@ -37,369 +109,333 @@ class Position:
             else:
                 self.move_map[move.square_from] = [move]
 
+    def moves_from(self, square: tuple[int, int]) -> list[Move]:
+        # valid moves of the piece on square (line, col)
+        return self.move_map.get(square, [])
+
+    def has_legal_moves(self) -> bool:
+        if self._valid_moves is not None:
+            return bool(self._valid_moves)
+        return bool(self.legal_codes())
+
+    def copy(self) -> "Position":
+        # independent position (bitboards and state) to search on, e.g. in an AI thread
+        position = Position.__new__(Position)
+        position.board = self.board
+        position.flags = self.flags
+        position.bitboard = self.bitboard.copy()
+        position.color = self.color
+        position.castling = self.castling
+        position.ep_square = self.ep_square
+        position.history = self.history[:]
+        position.key = self.key
+        position.pawn_key = self.pawn_key
+        position.mg_score = self.mg_score
+        position.eg_score = self.eg_score
+        position.phase = self.phase
+        position._valid_moves = self._valid_moves
+        position._move_map = self._move_map
+        position._attack_maps = self._attack_maps[:]
+        position._attack_maps_key = self._attack_maps_key
+        return position
+
+    def attack_map(self, color: int) -> int:
+        # bitboard of the squares attacked by color, computed once per state
+        if self._attack_maps_key != self.key:
+            self._attack_maps = [-1, -1]
+            self._attack_maps_key = self.key
+        if self._attack_maps[color] < 0:
+            self._attack_maps[color] = self.bitboard.attacks(color)
+        return self._attack_maps[color]
+
     def get_valid_moves(self) -> list[Move]:
         # public method used by Game object
         return self._get_valid_moves()
 
     def king_is_in_check(self, board: list[list[Piece]]) -> bool:
-        coords = Position._get_king_coords(board, self.flags["color"])
-        if coords == "ERROR":
+        bitboard = BitBoard.from_board(board)
+        color = COLOR_INDEX[self.flags["color"]]
+        king = bitboard.king_square(color)
+        if king < 0:
             return False
-        return self.square_is_attacked(board, coords, self.flags["color"])
+        return bitboard.is_attacked(king, color ^ 1)
 
     def square_is_attacked(self, board: list[list[Piece]], coords: str, color: str) -> bool:
         # square can be target of attack of color opposite of "color"
-        possible_targets = [
-            x.chess_move[-2:]
-            for x in self._get_possible_captures(board, Position._invert_color(color))
-        ]
-        return coords in possible_targets
+        bitboard = BitBoard.from_board(board)
+        return bitboard.is_attacked(square_from_coords(coords), COLOR_INDEX[color] ^ 1)
+
+    def in_check(self) -> bool:
+        # is the king of the side to move in check (in the current state of the position)
+        king = self.bitboard.pieces[self.color * 6 + KING]
+        return bool(king & self.attack_map(self.color ^ 1))
+
+    def make_move(self, move: Move) -> None:
+        self.push(self.code_from_move(move))
+        self._valid_moves = self._move_map = None
+
+    def unmake_move(self) -> None:
+        self.pop()
+        self._valid_moves = self._move_map = None
+
+    def perft(self, depth: int) -> int:
+        # number of leaf nodes of the legal move tree, to check move generation
+        moves = self.legal_codes()
+        if depth <= 1:
+            return len(moves) if depth == 1 else 1
+        nodes = 0
+        for move in moves:
+            self.push(move)
+            nodes += self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def perft_divide(self, depth: int) -> dict[str, int]:
+        # perft split by root move (uci notation)
+        nodes = {}
+        for move in self.legal_codes():
+            self.push(move)
+            nodes[uci(move)] = self.perft(depth - 1)
+            self.pop()
+        return nodes
+
+    def state_key(self) -> int:
+        # part of the zobrist key given by side to move, castling rights and en passant
+        return state_key(self.bitboard.pieces, self.color, self.castling, self.ep_square)
+
+    def push(self, move: int) -> None:
+        # play a legal int move (bitboard.encode_move), taken back by pop: the moves of the
+        # search, the book and the tables, with no Move objects made
+        bitboard = self.bitboard
+        square_from, square_to, flag = move & 63, (move >> 6) & 63, move >> 12
+        key = self.key ^ self.state_key()
+        pawn_key = self.pawn_key
+        mg_score, eg_score, phase = self.mg_score, self.eg_score, self.phase
+
+        captured_square = square_to
+        if flag == EP_CAPTURE:
+            captured_square = square_to + (8 if self.color == WHITE else -8)
+        captured = bitboard.remove(captured_square)
+        if captured != EMPTY:
+            key ^= PIECE_KEYS[captured * 64 + captured_square]
+            if captured % 6 == PAWN:
+                pawn_key ^= PIECE_KEYS[captured * 64 + captured_square]
+            mg_score -= MG_TABLE[captured][captured_square]
+            eg_score -= EG_TABLE[captured][captured_square]
+            phase -= PHASE_WEIGHT[captured]
+
+        piece = bitboard.remove(square_from)
+        key ^= PIECE_KEYS[piece * 64 + square_from]
+        mg_score -= MG_TABLE[piece][square_from]
+        eg_score -= EG_TABLE[piece][square_from]
+        if piece % 6 == PAWN:
+            pawn_key ^= PIECE_KEYS[piece * 64 + square_from]
+            if flag & PROMOTION:
+                piece = self.color * 6 + KNIGHT + (flag & 3)
+                phase += PHASE_WEIGHT[piece]
+            else:
+                pawn_key ^= PIECE_KEYS[piece * 64 + square_to]
+        bitboard.put(piece, square_to)
+        key ^= PIECE_KEYS[piece * 64 + square_to]
+        mg_score += MG_TABLE[piece][square_to]
+        eg_score += EG_TABLE[piece][square_to]
+
+        # castle => move rook also
+        rook_from = rook_to = -1
+        if flag == KING_CASTLE:
+            rook_from, rook_to = square_to + 1, square_to - 1
+        elif flag == QUEEN_CASTLE:
+            rook_from, rook_to = square_to - 2, square_to + 1
+        if rook_from >= 0:
+            rook = bitboard.remove(rook_from)
+            bitboard.put(rook, rook_to)
+            key ^= PIECE_KEYS[rook * 64 + rook_from] ^ PIECE_KEYS[rook * 64 + rook_to]
+            mg_score += MG_TABLE[rook][rook_to] - MG_TABLE[rook][rook_from]
+            eg_score += EG_TABLE[rook][rook_to] - EG_TABLE[rook][rook_from]
+
+        self.history.append(
+            (
+                move,
+                captured,
+                captured_square,
+                self.castling,
+                self.ep_square,
+                rook_from,
+                rook_to,
+                self.key,
+                self.pawn_key,
+                self.mg_score,
+                self.eg_score,
+                self.phase,
+            )
+        )
+        self.castling &= CASTLING_MASKS[square_from] & CASTLING_MASKS[square_to]
+        self.ep_square = (square_from + square_to) // 2 if flag == DOUBLE_PUSH else -1
+        self.color ^= 1
+        self.key = key ^ self.state_key()
+        self.pawn_key = pawn_key
+        self.mg_score, self.eg_score, self.phase = mg_score, eg_score, phase
+
+    def push_null(self) -> None:
+        # pass: the other side plays again (null move pruning of the search), undone by pop
+        # like the other moves
+        self.history.append(
+            (
+                0,
+                EMPTY,
+                -1,
+                self.castling,
+                self.ep_square,
+                -1,
+                -1,
+                self.key,
+                self.pawn_key,
+                self.mg_score,
+                self.eg_score,
+                self.phase,
+            )
+        )
+        key = self.key ^ self.state_key()
+        self.ep_square = -1
+        self.color ^= 1
+        self.key = key ^ self.state_key()
+
+    def pop(self) -> None:
+        bitboard = self.bitboard
+        (
+            move,
+            captured,
+            captured_square,
+            castling,
+            ep_square,
+            rook_from,
+            rook_to,
+            self.key,
+            self.pawn_key,
+            self.mg_score,
+            self.eg_score,
+            self.phase,
+        ) = self.history.pop()
+        self.color ^= 1
+        self.castling = castling
+        self.ep_square = ep_square
+        if not move:
+            # null move: no piece moved
+            return
+
+        square_from, square_to = move & 63, (move >> 6) & 63
+        piece = bitboard.remove(square_to)
+        if move >> 12 & PROMOTION:
+            piece = self.color * 6 + PAWN
+        bitboard.put(piece, square_from)
+        if captured != EMPTY:
+            bitboard.put(captured, captured_square)
+        if rook_from >= 0:
+            bitboard.put(bitboard.remove(rook_to), rook_from)
+
+    def code_from_move(self, move: Move) -> int:
+        # int move of a Move of the game
+        if move.piece == EMPTY:
+            # move built from squares only: find back the move type from the position
+            return self._deduce_move(move)
+        code = move.code
+        if code >> 12 & PROMOTION:
+            # promoted piece chosen by the player / AI, queen by default
+            code = code & ~(3 << 12) | (PROMOTION_PIECES.get(move.promotion, 3) << 12)
+        return code
+
+    def _deduce_move(self, move: Move) -> int:
+        # find back the move type (castle, en passant, promotion...) from the squares
+        square_from = move.code & 63
+        square_to = (move.code >> 6) & 63
+        piece = self.bitboard.squares[square_from] % 6
+
+        flag = QUIET
+        if self.bitboard.squares[square_to] != EMPTY:
+            flag = CAPTURE
+        if piece == KING and square_to - square_from == 2:
+            flag = KING_CASTLE
+        elif piece == KING and square_from - square_to == 2:
+            flag = QUEEN_CASTLE
+        elif piece == PAWN and square_to == self.ep_square:
+            flag = EP_CAPTURE
+        elif piece == PAWN and abs(square_to - square_from) == 16:
+            flag = DOUBLE_PUSH
+        elif piece == PAWN and square_to // 8 in (0, 7):
+            flag |= PROMOTION | PROMOTION_PIECES.get(move.promotion, 3)
+
+        return encode_move(square_from, square_to, flag)
 
     def _get_valid_moves(self) -> list[Move]:
-        possible_moves = self._get_possible_moves(self.board, self.flags["color"])
-        valid_moves = [x for x in possible_moves if not self.in_check_after_move(x)]
+        valid_moves = []
+        for move in self.legal_codes():
+            flag = move_flag(move)
+            if flag & PROMOTION and flag & 3 != 3:
+                # the promoted piece is chosen after the move, only keep one move per square
+                continue
+            valid_moves.append(self.move_from_code(move))
         # logger.info(f"Valid moves: {[x.chess_move for x in valid_moves]}")
         return valid_moves
 
-    def _get_possible_moves(
-        self, board: list[list[Piece]], color: str, capture_only: bool = False
-    ) -> list[Move]:
-        # private method used internally by Board
-        pieces = []
-
-        # get all pieces of the current color
-        for line in range(8):
-            for col in range(8):
-                if board[line][col].color == color:
-                    pieces.append((board[line][col], line, col))
-
-        moves = []
-        for piece, line, col in pieces:
-            moves += self._get_moves_for_piece(board, piece, line, col, color, capture_only)
-
-        return moves
-
-    def in_check_after_move(self, move: Move) -> bool:
-        board_after_move = self.get_board_after_move(move, self.board, self.flags["color"])
-        return self.king_is_in_check(board_after_move)
-
-    def _get_possible_captures(self, board: list[list[Piece]], color: str) -> list[Move]:
-        return self._get_possible_moves(board, color, capture_only=True)
-
-    def _get_moves_for_piece(
-        self,
-        board: list[list[Piece]],
-        piece: Piece,
-        line: int,
-        col: int,
-        color: str,
-        capture_only: bool = False,
-    ) -> list[Move]:
-        moves: list[Move] = []
-        match piece.piece:
-            case "P":  # Pawn
-                moves += self._get_moves_for_pawn(board, line, col, color, capture_only)
-            case "R":  # Rook
-                moves += self._get_moves_for_rook(board, line, col, color)
-            case "N":  # Knight
-                moves += self._get_moves_for_knight(board, line, col, color)
-            case "B":  # Bishop
-                moves += self._get_moves_for_bishop(board, line, col, color)
-            case "Q":  # Bishop
-                moves += self._get_moves_for_queen(board, line, col, color)
-            case "K":  # King
-                moves += self._get_moves_for_king(board, line, col, color, capture_only)
-
-        return moves
-
-    def _get_moves_for_pawn(
-        self, board: list[list[Piece]], line: int, col: int, color: str, capture_only: bool = False
-    ) -> list[Move]:
-        PAWN_MOVE_DIRECTION = -1 if color == "w" else 1
-        moves: list[Move] = []
-        # move
-        if not capture_only:
-            if not board[line + PAWN_MOVE_DIRECTION][col]:  # Pawn move 1 square
-                moves.append(
-                    Move(
-                        (line, col),
-                        (line + PAWN_MOVE_DIRECTION, col),
-                        f"{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(line + PAWN_MOVE_DIRECTION, col)}",
-                    )
-                )
-                if (line == 6 and color == "w") or (line == 1 and color == "b"):
-                    # if first move can move 2 squares
-                    if not board[line + PAWN_MOVE_DIRECTION * 2][col]:
-                        moves.append(
-                            Move(
-                                (line, col),
-                                (line + PAWN_MOVE_DIRECTION * 2, col),
-                                f"{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(line + PAWN_MOVE_DIRECTION * 2, col)}",
-                            )
-                        )
-        # capture
-        for i in [-1, 1]:
-            if 0 <= col + i <= 7:
-                if board[line + PAWN_MOVE_DIRECTION][col + i] and board[line + PAWN_MOVE_DIRECTION][
-                    col + i
-                ].color == Position._invert_color(color):
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + PAWN_MOVE_DIRECTION, col + i),
-                            f"{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(line + PAWN_MOVE_DIRECTION, col + i)}",
-                        )
-                    )
-                if capture_only and not board[line + PAWN_MOVE_DIRECTION][col + i]:
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + PAWN_MOVE_DIRECTION, col + i),
-                            f"{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(line + PAWN_MOVE_DIRECTION, col + i)}",
-                        )
-                    )
-
-        # en passant
-        if (line == 3 and color == "w") or (line == 4 and color == "b"):
-            # only line where pawn can capture "en passant"
-            for i in [-1, 1]:
-                if 0 <= col + i <= 7:
-                    # previous move was a pawn moving 2 squares on left or right of pawn
-                    if (
-                        self.flags["previous_move"][-2:]
-                        == f"{Position._xy_to_chess_coords(line, col + i)}"  # end square is beside pawn
-                        and len(self.flags["previous_move"]) == 4  # pawn move is 4 length string
-                        and abs(
-                            int(self.flags["previous_move"][-1])
-                            - int(self.flags["previous_move"][-3])
-                        )
-                        == 2  # 2 square move
-                    ):
-                        moves.append(
-                            Move(
-                                (line, col),
-                                (line + PAWN_MOVE_DIRECTION, col + i),
-                                f"{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(line + PAWN_MOVE_DIRECTION, col + i)} e.p",
-                            )
-                        )
-
-        # promotion TBD
-
-        return moves
-
-    def _get_moves_for_rook(
-        self, board: list[list[Piece]], line: int, col: int, color: str
-    ) -> list[Move]:
-        moves: list[Move] = []
-        # moves
-        for move_type in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-            cur_line, cur_col = line, col
-            # traverse all 4 directions
-            while (0 <= cur_line + move_type[0] <= 7) and (0 <= cur_col + move_type[1] <= 7):
-                if not board[cur_line + move_type[0]][cur_col + move_type[1]]:
-                    # empty square
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (cur_line + move_type[0], cur_col + move_type[1]),
-                            f"R{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                        )
-                    )
-                else:
-                    if board[cur_line + move_type[0]][
-                        cur_col + move_type[1]
-                    ].color == Position._invert_color(color):
-                        # square contains black piece => capture
-                        moves.append(
-                            Move(
-                                (line, col),
-                                (cur_line + move_type[0], cur_col + move_type[1]),
-                                f"R{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                            )
-                        )
-                    # square not empty, next type of move
-                    break
-                cur_line += move_type[0]
-                cur_col += move_type[1]
-
-        return moves
-
-    def _get_moves_for_knight(
-        self, board: list[list[Piece]], line: int, col: int, color: str
-    ) -> list[Move]:
-        moves: list[Move] = []
-        # move and capture
-        for move_type in [(-2, 1), (-1, 2), (1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1)]:
-            if (0 <= line + move_type[0] <= 7) and (0 <= col + move_type[1] <= 7):
-                if not board[line + move_type[0]][col + move_type[1]]:
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + move_type[0], col + move_type[1]),
-                            f"N{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(line + move_type[0], col + move_type[1])}",
-                        )
-                    )
-                elif board[line + move_type[0]][col + move_type[1]].color == Position._invert_color(
-                    color
-                ):
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + move_type[0], col + move_type[1]),
-                            f"N{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(line + move_type[0], col + move_type[1])}",
-                        )
-                    )
-
-        return moves
-
-    def _get_moves_for_bishop(
-        self, board: list[list[Piece]], line: int, col: int, color: str
-    ) -> list[Move]:
-        moves: list[Move] = []
-        # moves
-        for move_type in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-            cur_line, cur_col = line, col
-            # traverse all 4 directions
-            while (0 <= cur_line + move_type[0] <= 7) and (0 <= cur_col + move_type[1] <= 7):
-                if not board[cur_line + move_type[0]][cur_col + move_type[1]]:
-                    # empty square
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (cur_line + move_type[0], cur_col + move_type[1]),
-                            f"B{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                        )
-                    )
-                else:
-                    if board[cur_line + move_type[0]][
-                        cur_col + move_type[1]
-                    ].color == Position._invert_color(color):
-                        # square contains opposite color piece => capture
-                        moves.append(
-                            Move(
-                                (line, col),
-                                (cur_line + move_type[0], cur_col + move_type[1]),
-                                f"B{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                            )
-                        )
-                    # square not empty, next type of move
-                    break
-                cur_line += move_type[0]
-                cur_col += move_type[1]
-
-        return moves
-
-    def _get_moves_for_queen(
-        self, board: list[list[Piece]], line: int, col: int, color: str
-    ) -> list[Move]:
-        moves: list[Move] = []
-        # moves
-        for move_type in [(1, 1), (1, -1), (-1, 1), (-1, -1), (1, 0), (-1, 0), (0, 1), (0, -1)]:
-            cur_line, cur_col = line, col
-            # traverse all 8 directions
-            while (0 <= cur_line + move_type[0] <= 7) and (0 <= cur_col + move_type[1] <= 7):
-                if not board[cur_line + move_type[0]][cur_col + move_type[1]]:
-                    # empty square
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (cur_line + move_type[0], cur_col + move_type[1]),
-                            f"Q{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                        )
-                    )
-                else:
-                    if board[cur_line + move_type[0]][
-                        cur_col + move_type[1]
-                    ].color == Position._invert_color(color):
-                        # square contains black piece => capture
-                        moves.append(
-                            Move(
-                                (line, col),
-                                (cur_line + move_type[0], cur_col + move_type[1]),
-                                f"Q{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(cur_line + move_type[0], cur_col + move_type[1])}",
-                            )
-                        )
-                    # square not empty, next type of move
-                    break
-                cur_line += move_type[0]
-                cur_col += move_type[1]
-
-        return moves
-
-    def _get_moves_for_king(
-        self, board: list[list[Piece]], line: int, col: int, color: str, capture_only: bool = False
-    ) -> list[Move]:
-        moves: list[Move] = []
-        # move and capture
-        for move_type in [(-1, -1), (-1, 0), (-1, 1), (1, -1), (1, 0), (1, 1), (0, -1), (0, 1)]:
-            if (0 <= line + move_type[0] <= 7) and (0 <= col + move_type[1] <= 7):
-                if not board[line + move_type[0]][col + move_type[1]]:
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + move_type[0], col + move_type[1]),
-                            f"K{Position._xy_to_chess_coords(line, col)}{Position._xy_to_chess_coords(line + move_type[0], col + move_type[1])}",
-                        )
-                    )
-                elif board[line + move_type[0]][col + move_type[1]].color == Position._invert_color(
-                    color
-                ):
-                    moves.append(
-                        Move(
-                            (line, col),
-                            (line + move_type[0], col + move_type[1]),
-                            f"K{Position._xy_to_chess_coords(line, col)}x{Position._xy_to_chess_coords(line + move_type[0], col + move_type[1])}",
-                        )
-                    )
-        # castle
-        if capture_only or not (
-            (self.flags["color"] == "w" and self.flags["wKing_can_castle"])
-            or (self.flags["color"] == "b" and self.flags["bKing_can_castle"])
-        ):
-            return moves
-
-        if (line == 7 and col == 4 and color == "w") or (line == 0 and col == 4 and color == "b"):
-            if (
-                not board[line][col + 1]
-                and not board[line][col + 2]
-                and board[line][col + 3] == Piece("R", color)
-            ):
-                if not self.square_is_attacked(
-                    board, Position._xy_to_chess_coords(line, col + 1), color
-                ) and not self.square_is_attacked(
-                    board, Position._xy_to_chess_coords(line, col + 2), color
-                ):
-                    moves.append(Move((line, col), (line, col + 2), "0-0"))
-            if (
-                not board[line][col - 1]
-                and not board[line][col - 2]
-                and not board[line][col - 3]
-                and board[line][col - 4] == Piece("R", color)
-            ):
-                if (
-                    not self.square_is_attacked(
-                        board, Position._xy_to_chess_coords(line, col - 1), color
-                    )
-                    and not self.square_is_attacked(
-                        board, Position._xy_to_chess_coords(line, col - 2), color
-                    )
-                    and not self.square_is_attacked(
-                        board, Position._xy_to_chess_coords(line, col - 3), color
-                    )
-                ):
-                    moves.append(Move((line, col), (line, col - 2), "0-0-0"))
-
-        return moves
+    def legal_codes(self) -> list[int]:
+        return self.bitboard.generate_legal_moves(
+            self.color, self.ep_square, self.castling, self.attack_map(self.color ^ 1)
+        )
+
+    def legal_captures(self) -> list[int]:
+        # legal captures and promotions only
+        return self.bitboard.generate_legal_moves(
+            self.color, self.ep_square, self.castling, self.attack_map(self.color ^ 1), True
+        )
+
+    def _get_possible_moves(self) -> list[int]:
+        return self.bitboard.generate_moves(
+            self.color, self.ep_square, self.castling, self.attack_map(self.color ^ 1)
+        )
+
+    def _get_possible_captures(self) -> list[int]:
+        return [x for x in self._get_possible_moves() if move_flag(x) & CAPTURE]
+
+    def _get_castling_rights(self) -> int:
+        castling = 0
+        if self.flags["wKing_can_castle"]:
+            castling |= WHITE_KING_SIDE | WHITE_QUEEN_SIDE
+        if self.flags["bKing_can_castle"]:
+            castling |= BLACK_KING_SIDE | BLACK_QUEEN_SIDE
+        return castling
+
+    def _get_ep_square(self) -> int:
+        # previous move was a pawn moving 2 squares: "e2e4" or "d7d5"
+        previous_move = self.flags["previous_move"]
+        if len(previous_move) != 4 or abs(int(previous_move[-1]) - int(previous_move[-3])) != 2:
+            return -1
+        square = square_from_coords(previous_move[-2:])
+        if self.color == WHITE and square // 8 == 3:
+            return square - 8
+        if self.color == BLACK and square // 8 == 4:
+            return square + 8
+        return -1
+
+    def move_from_code(self, move: int) -> Move:
+        # Move of an int move of the position
+        squares = self.bitboard.squares
+        square_to = (move >> 6) & 63
+        if move >> 12 == EP_CAPTURE:
+            captured = (self.color ^ 1) * 6 + PAWN
+        else:
+            captured = squares[square_to]
+        return Move.from_code(move, squares[move & 63], captured)
 
     def get_board_after_move(
         self, move: Move, board: list[list[Piece]], color: str
     ) -> list[list[Piece]]:
-        board_after_move = copy.deepcopy(board)
-        if not move.chess_move.startswith("0"):
+        # pieces are shared with the original board, only the lines are copied
+        board_after_move = [line[:] for line in board]
+        if not move.is_castle:
             self.move_piece(move, board_after_move)
         else:
             # castle
-            castle_moves = CASTLE_MOVES[move.chess_move][color]
+            castle_moves = CASTLE_MOVES["0-0" if move.flag == KING_CASTLE else "0-0-0"][color]
             for castle_move in castle_moves:
                 self.move_piece(castle_move, board_after_move)
 
@@ -409,33 +445,7 @@ class Position:
         line_start, col_start = move.square_from
         line_end, col_end = move.square_to
         board[line_end][col_end] = board[line_start][col_start]
-        board[line_start][col_start] = Piece()
-
-    @staticmethod
-    def _invert_color(color: str) -> str:
-        if color == "w":
-            return "b"
-        return "w"
-
-    @staticmethod
-    def _col_to_letter(col: int) -> str:
-        return f"{chr(col + 97)}"
-
-    @staticmethod
-    def _line_to_board(line: int) -> int:
-        return 8 - line
-
-    @staticmethod
-    def _xy_to_chess_coords(line: int, col: int) -> str:
-        return f"{Position._col_to_letter(col)}{Position._line_to_board(line)}"
-
-    @staticmethod
-    def _get_king_coords(board: list[list[Piece]], color: str) -> str:
-        for line in range(8):
-            for col in range(8):
-                if board[line][col] == Piece("K", color):
-                    return Position._xy_to_chess_coords(line, col)
-        return "ERROR"  # should never be reached
+        board[line_start][col_start] = NO_PIECE
 
     @staticmethod
     def pretty_print_board(board: list[list[Piece]]) -> str:
@@ -448,3 +458,42 @@ class Position:
                     ret += "   "
             ret += "\n"
         return ret
+
+
+def position_from_FEN(fen: str) -> Position:
+    # full FEN string: pieces, color, castle rights, en passant square
+    fields = fen.split()
+    board: list[list[Piece]] = [[] for _ in range(8)]
+    for line, pieces in enumerate(fields[0].split("/")):
+        for letter in pieces:
+            if letter.isdigit():
+                board[line].extend([NO_PIECE] * int(letter))
+            else:
+                board[line].append(Piece(letter.upper(), "b" if letter.islower() else "w"))
+    castling = fields[2] if len(fields) > 2 else "-"
+    ep_square = fields[3] if len(fields) > 3 else "-"
+
+    previous_move = ""
+    if ep_square != "-":
+        # rebuild the pawn move of 2 squares that allows en passant
+        if ep_square[1] == "3":
+            previous_move = f"{ep_square[0]}2{ep_square[0]}4"
+        else:
+            previous_move = f"{ep_square[0]}7{ep_square[0]}5"
+
+    flags: FlagsT = {
+        "color": fields[1] if len(fields) > 1 else "w",
+        "wKing_can_castle": "K" in castling or "Q" in castling,
+        "bKing_can_castle": "k" in castling or "q" in castling,
+        "previous_move": previous_move,
+        "game_type": "AIVAI",
+        "player_color": "",
+    }
+    position = Position(board, flags)
+    castling_mask = 0
+    for letter in castling:
+        castling_mask |= CASTLING_LETTERS.get(letter, 0)
+    position.castling &= castling_mask
+    # castling rights changed => zobrist key also
+    position.key = pieces_key(position.bitboard.squares) ^ position.state_key()
+    return position
@@ -12,7 +12,7 @@ from loguru import logger
 from common import center_text
 from config import FONT_DIR, SCREEN_WIDTH
 
-AI_TYPES = ["basic", "random", "minmax"]
+AI_TYPES = ["basic", "random", "minmax", "parallel"]
 
 
 class StartMenu:
@@ -0,0 +1,545 @@
+"""
+Endgame tablebases: win / draw / loss and distance to mate of every position of a small
+material set (the two kings and at most two other pieces), generated by retrograde analysis
+and probed from memory mapped files
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+import time
+from typing import BinaryIO
+
+from loguru import logger
+
+from bitboard import (
+    BISHOP,
+    BLACK,
+    KING,
+    KNIGHT,
+    PAWN,
+    PIECE_LETTERS,
+    QUEEN,
+    ROOK,
+    WHITE,
+    bishop_attacks_from,
+    pawn_attacks,
+    rook_attacks_from,
+    squares_of,
+)
+from config import TABLEBASE_DIR
+from position import Position
+from pst import MG_VALUE
+from tables import KING_ATTACKS, KNIGHT_ATTACKS, PAWN_ATTACKS
+
+MAX_PIECES = 4
+# file: header (magic, number of pieces, signature) then one byte per position
+HEADER = struct.Struct(">4sB11s")
+MAGIC = b"PCTB"
+
+# results for the side to move
+WIN, DRAW, LOSS = 1, 0, -1
+# value of a position (one byte): 0 for a draw, else 1 + number of plies to mate, even when
+# the side to move mates, odd when it is mated (0 plies: it is checkmated)
+MAX_VALUE = 0xFE
+# generation only: illegal position, position which can not be lost
+ILLEGAL = 0xFF
+CAN_NOT_LOSE = 0xFF
+
+# sets built when no signature is given; the sets without mating material need no table
+DEFAULT_SIGNATURES = ["KQvK", "KRvK", "KPvK"]
+DRAWN_SIGNATURES = {"KvK", "KNvK", "KBvK"}
+PIECE_ORDER = [QUEEN, ROOK, BISHOP, KNIGHT, PAWN]
+
+# pieces of a position: (piece code, square)
+PiecesT = list[tuple[int, int]]
+
+
+def decode(value: int) -> tuple[int, int]:
+    # (result, plies to mate) of a value
+    if not value:
+        return DRAW, 0
+    plies = value - 1
+    return (WIN if plies & 1 else LOSS), plies
+
+
+def _side(kinds: list[int]) -> str:
+    # "KRP": king then the other pieces, strongest first
+    return "K" + "".join(PIECE_LETTERS[kind] for kind in sorted(kinds, key=PIECE_ORDER.index))
+
+
+def signature_of(pieces: PiecesT) -> tuple[str, bool]:
+    # signature of the material ("KQvK") and True if the colors are swapped in it:
+    # the stronger side is always first (white)
+    white = [code for code, _ in pieces if code < 6 and code != KING]
+    black = [code - 6 for code, _ in pieces if code >= 6 and code != 6 + KING]
+    white_strength = (sum(MG_VALUE[kind] for kind in white), _side(white))
+    black_strength = (sum(MG_VALUE[kind] for kind in black), _side(black))
+    if black_strength > white_strength:
+        return f"{_side(black)}v{_side(white)}", True
+    return f"{_side(white)}v{_side(black)}", False
+
+
+def piece_order(signature: str) -> list[int]:
+    # piece codes in the order of their squares in the table index: "KQvK" => [5, 4, 11]
+    white, black = signature.split("v")
+    return [PIECE_LETTERS.index(letter) for letter in white] + [
+        6 + PIECE_LETTERS.index(letter) for letter in black
+    ]
+
+
+def _symmetry(symmetry: int) -> list[int]:
+    # square => square: bit 4 swaps lines and columns, bit 1 mirrors the files (a <=> h),
+    # bit 2 the ranks (1 <=> 8)
+    table = []
+    for square in range(64):
+        line, col = divmod(square, 8)
+        if symmetry & 4:
+            line, col = col, line
+        if symmetry & 1:
+            col = 7 - col
+        if symmetry & 2:
+            line = 7 - line
+        table.append(line * 8 + col)
+    return table
+
+
+SYMMETRIES = [_symmetry(symmetry) for symmetry in range(8)]
+# squares of the white king in the tables, indexed by "with pawns": a1-d1-d4 triangle
+# (board symmetries), a to d files (pawns only allow the left / right mirror)
+KING_SQUARES = [
+    [square for square in range(64) if 7 - square // 8 <= square % 8 <= 3],
+    [square for square in range(64) if square % 8 <= 3],
+]
+KING_SLOTS = [
+    [squares.index(s) if s in squares else -1 for s in range(64)] for squares in KING_SQUARES
+]
+# symmetries bringing the white king on each square into the table squares
+KING_SYMMETRIES = [
+    [
+        [symmetry for symmetry in symmetries if SYMMETRIES[symmetry][square] in KING_SQUARES[pawns]]
+        for square in range(64)
+    ]
+    for pawns, symmetries in ((0, range(8)), (1, (0, 1)))
+]
+
+
+def table_size(nb_pieces: int, pawns: bool) -> int:
+    return len(KING_SQUARES[pawns]) << (6 * nb_pieces - 5)
+
+
+def index_of(squares: list[int], color: int, pawns: bool) -> int:
+    # squares in the table order (white king first), side to move in the lowest bit;
+    # the smallest index of the symmetric positions is kept
+    best = -1
+    for symmetry in KING_SYMMETRIES[pawns][squares[0]]:
+        table = SYMMETRIES[symmetry]
+        index = KING_SLOTS[pawns][table[squares[0]]]
+        for square in squares[1:]:
+            index = index * 64 + table[square]
+        if best < 0 or index < best:
+            best = index
+    return best * 2 + color
+
+
+def _identity_index(squares: list[int], pawns: bool) -> int:
+    # index of white to move, without symmetry
+    index = KING_SLOTS[pawns][squares[0]]
+    for square in squares[1:]:
+        index = index * 64 + square
+    return index * 2
+
+
+def squares_of_index(index: int, nb_pieces: int, pawns: bool) -> tuple[list[int], int]:
+    # (squares, side to move) of a table index
+    color = index & 1
+    index >>= 1
+    squares = []
+    for _ in range(nb_pieces - 1):
+        index, square = divmod(index, 64)
+        squares.append(square)
+    squares.append(KING_SQUARES[pawns][index])
+    return squares[::-1], color
+
+
+def _flip(pieces: PiecesT) -> PiecesT:
+    # colors swapped and board mirrored (a1 <=> a8)
+    return [((code + 6) % 12, square ^ 56) for code, square in pieces]
+
+
+def _targets(code: int, square: int, occupied: int) -> int:
+    # squares attacked by the piece code on square (pawns: captures only)
+    kind = code % 6
+    if kind == KNIGHT:
+        return KNIGHT_ATTACKS[square]
+    if kind == KING:
+        return KING_ATTACKS[square]
+    if kind == ROOK:
+        return rook_attacks_from(square, occupied)
+    if kind == BISHOP:
+        return bishop_attacks_from(square, occupied)
+    if kind == QUEEN:
+        return rook_attacks_from(square, occupied) | bishop_attacks_from(square, occupied)
+    return PAWN_ATTACKS[code // 6][square]
+
+
+class Tablebase:
+    # tables of a directory, mapped when first probed
+    def __init__(self, directory: str = TABLEBASE_DIR) -> None:
+        self.directory = directory
+        self.files: dict[str, tuple[BinaryIO, mmap.mmap] | None] = {}
+        self.orders: dict[str, list[int]] = {}
+        self.hits = 0
+
+    def path(self, signature: str) -> str:
+        return os.path.join(self.directory, f"{signature}.tb")
+
+    def table(self, signature: str) -> mmap.mmap | None:
+        # mapped table of signature, None if there is no file
+        if signature not in self.files:
+            path = self.path(signature)
+            if not os.path.exists(path):
+                self.files[signature] = None
+            else:
+                file = open(path, "rb")
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, _, stored = HEADER.unpack_from(data)
+                if magic != MAGIC or stored.rstrip(b"\0").decode() != signature:
+                    raise ValueError(f"{path} is not the table of {signature}")
+                self.files[signature] = (file, data)
+                self.orders[signature] = piece_order(signature)
+        entry = self.files[signature]
+        return entry[1] if entry else None
+
+    def close(self) -> None:
+        for entry in self.files.values():
+            if entry:
+                entry[1].close()
+                entry[0].close()
+        self.files = {}
+
+    def value(self, pieces: PiecesT, color: int) -> int | None:
+        # value (see decode) of the position for color to move, None if there is no table
+        signature, flipped = signature_of(pieces)
+        if signature in DRAWN_SIGNATURES:
+            return 0
+        data = self.table(signature)
+        if data is None:
+            return None
+        if flipped:
+            pieces = _flip(pieces)
+            color ^= 1
+        # identical pieces can be indexed in any order
+        squares_by_code: dict[int, list[int]] = {}
+        for code, square in pieces:
+            squares_by_code.setdefault(code, []).append(square)
+        squares = [squares_by_code[code].pop() for code in self.orders[signature]]
+        return data[HEADER.size + index_of(squares, color, "P" in signature)]
+
+    def probe_value(self, position: Position) -> int | None:
+        # value of the position for the side to move, None if it is not in the tables
+        # (too many pieces, missing table, en passant capture possible; castling rights
+        # are not taken into account)
+        bitboard = position.bitboard
+        if bitboard.occupied.bit_count() > MAX_PIECES:
+            return None
+        color = position.color
+        ep_square = position.ep_square
+        if (
+            ep_square >= 0
+            and pawn_attacks(1 << ep_square, color ^ 1) & bitboard.pieces[color * 6 + PAWN]
+        ):
+            return None
+        squares = bitboard.squares
+        pieces = [(squares[square], square) for square in squares_of(bitboard.occupied)]
+        value = self.value(pieces, color)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def probe(self, position: Position) -> tuple[int, int] | None:
+        # (result, plies to mate) for the side to move, None if not in the tables
+        value = self.probe_value(position)
+        return None if value is None else decode(value)
+
+    def best_move(self, position: Position) -> int:
+        # fastest mate, draw, or longest resistance; 0 if the position is not in the tables
+        if self.probe_value(position) is None:
+            return 0
+        best_move, best_rank = 0, -MAX_VALUE - 1
+        for move in position.legal_codes():
+            position.push(move)
+            value = self.probe_value(position)
+            position.pop()
+            if value is None:
+                return 0
+            result, plies = decode(value)
+            # result of the opponent after the move
+            rank = 0 if result == DRAW else -result * (MAX_VALUE - plies)
+            if rank > best_rank:
+                best_move, best_rank = move, rank
+        return best_move
+
+
+_tablebase: Tablebase | None = None
+
+
+def tablebase() -> Tablebase | None:
+    # tables of config.TABLEBASE_DIR, None if there is no table directory
+    global _tablebase
+    if _tablebase is None and os.path.isdir(TABLEBASE_DIR):
+        _tablebase = Tablebase(TABLEBASE_DIR)
+    return _tablebase
+
+
+def _in_check(order: list[int], squares: list[int], color: int) -> bool:
+    occupied = 0
+    for square in squares:
+        occupied |= 1 << square
+    king = squares[order.index(color * 6 + KING)]
+    return any(
+        code // 6 != color and _targets(code, squares[i], occupied) >> king & 1
+        for i, code in enumerate(order)
+    )
+
+
+def _converted_signatures(order: list[int]) -> set[str]:
+    # sets reached from order by a capture or a promotion
+    pieces = [(code, 0) for code in order]
+    signatures = set()
+    for i, (code, _) in enumerate(pieces):
+        if code % 6 == KING:
+            continue
+        signatures.add(signature_of(pieces[:i] + pieces[i + 1 :])[0])
+        if code % 6 == PAWN:
+            for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                promoted = (code // 6 * 6 + kind, 0)
+                signatures.add(signature_of(pieces[:i] + [promoted] + pieces[i + 1 :])[0])
+    return signatures
+
+
+def _successors(
+    order: list[int], squares: list[int], color: int
+) -> tuple[list[list[int]], list[PiecesT]]:
+    # legal moves of color: positions of the same set, and positions of other sets
+    # (capture or promotion) as lists of pieces
+    occupied = 0
+    for square in squares:
+        occupied |= 1 << square
+    own = [i for i, code in enumerate(order) if code // 6 == color]
+    enemy = [i for i, code in enumerate(order) if code // 6 != color]
+    enemy_squares = {squares[i]: i for i in enemy}
+    enemy_occupied = sum(1 << square for square in enemy_squares)
+    king = squares[own[0]]
+    inside: list[list[int]] = []
+    outside: list[PiecesT] = []
+    last_line = 0 if color == WHITE else 7
+
+    for i in own:
+        code = order[i]
+        square = squares[i]
+        if code % 6 == PAWN:
+            # captures, then one or two steps forward
+            targets = PAWN_ATTACKS[color][square] & enemy_occupied
+            step = -8 if color == WHITE else 8
+            if not occupied >> (square + step) & 1:
+                targets |= 1 << (square + step)
+                start_line = 6 if color == WHITE else 1
+                if square // 8 == start_line and not occupied >> (square + 2 * step) & 1:
+                    targets |= 1 << (square + 2 * step)
+        else:
+            targets = _targets(code, square, occupied) & ~(occupied & ~enemy_occupied)
+        for target in squares_of(targets):
+            captured = enemy_squares.get(target, -1)
+            if captured >= 0 and order[captured] % 6 == KING:
+                continue
+            moved = squares[:]
+            moved[i] = target
+            target_occupied = occupied & ~(1 << square) | 1 << target
+            king_square = target if i == own[0] else king
+            if any(
+                j != captured and _targets(order[j], moved[j], target_occupied) >> king_square & 1
+                for j in enemy
+            ):
+                continue
+            if code % 6 == PAWN and target // 8 == last_line:
+                base = [(order[j], moved[j]) for j in range(len(order)) if j not in (i, captured)]
+                for kind in (QUEEN, ROOK, BISHOP, KNIGHT):
+                    outside.append(base + [(color * 6 + kind, target)])
+            elif captured >= 0:
+                outside.append([(order[j], moved[j]) for j in range(len(order)) if j != captured])
+            else:
+                inside.append(moved)
+    return inside, outside
+
+
+def _predecessors(order: list[int], squares: list[int], color: int) -> list[list[int]]:
+    # positions of the same set from which the opponent of color moved to this one
+    # (not captures nor promotions: they come from other sets)
+    occupied = 0
+    for square in squares:
+        occupied |= 1 << square
+    mover = color ^ 1
+    predecessors = []
+    for i, code in enumerate(order):
+        if code // 6 != mover:
+            continue
+        square = squares[i]
+        if code % 6 == PAWN:
+            # one step back, or two from the start line; never from the first line
+            step = 8 if mover == WHITE else -8
+            origin = square + step
+            origins = 0
+            if not occupied >> origin & 1 and origin // 8 not in (0, 7):
+                origins = 1 << origin
+                double_line = 4 if mover == WHITE else 3
+                if square // 8 == double_line and not occupied >> (origin + step) & 1:
+                    origins |= 1 << (origin + step)
+        else:
+            origins = _targets(code, square, occupied) & ~occupied
+        for origin in squares_of(origins):
+            moved = squares[:]
+            moved[i] = origin
+            predecessors.append(moved)
+    return predecessors
+
+
+def generate(signature: str, directory: str = TABLEBASE_DIR) -> str:
+    # write the table of signature in directory (and first the missing tables of the sets
+    # reached by a capture or a promotion), return its path
+    order = piece_order(signature)
+    nb_pieces = len(order)
+    if nb_pieces > MAX_PIECES or signature_of([(code, 0) for code in order]) != (
+        signature,
+        False,
+    ):
+        raise ValueError(f"{signature}: not a table signature")
+    os.makedirs(directory, exist_ok=True)
+    tables = Tablebase(directory)
+    for other in _converted_signatures(order):
+        if other not in DRAWN_SIGNATURES and not os.path.exists(tables.path(other)):
+            generate(other, directory)
+
+    start = time.perf_counter()
+    pawns = any(code % 6 == PAWN for code in order)
+    size = table_size(nb_pieces, pawns)
+    values = bytearray(size)
+    # number of positions of the set reached by a move and not known to be won by the
+    # opponent, CAN_NOT_LOSE if the side to move has a move which does not lose
+    counts = bytearray(size)
+    # smallest plies to mate of a loss, given by the moves to other sets
+    loss_plies: dict[int, int] = {}
+    # positions won or lost in the number of plies of the key
+    pending: dict[int, list[int]] = {}
+
+    # every legal position: count its moves and look up the moves to other sets
+    for king in KING_SQUARES[pawns]:
+        for others in itertools.product(range(64), repeat=nb_pieces - 1):
+            squares = [king, *others]
+            index = index_of(squares, WHITE, pawns)
+            if len(set(squares)) < nb_pieces or any(
+                code % 6 == PAWN and squares[i] // 8 in (0, 7) for i, code in enumerate(order)
+            ):
+                values[index] = values[index + 1] = ILLEGAL
+                continue
+            if len(KING_SYMMETRIES[pawns][king]) > 1 and _identity_index(squares, pawns) != index:
+                # symmetric of another position of the table
+                continue
+            for color in (WHITE, BLACK):
+                index = index_of(squares, color, pawns)
+                if _in_check(order, squares, color ^ 1):
+                    # the side which just moved can not be in check
+                    values[index] = ILLEGAL
+                    continue
+                inside, outside = _successors(order, squares, color)
+                if not inside and not outside:
+                    if _in_check(order, squares, color):
+                        pending.setdefault(0, []).append(index)
+                    # checkmate or stalemate (draw)
+                    counts[index] = CAN_NOT_LOSE
+                    continue
+                can_lose = True
+                worst = 0
+                best = MAX_VALUE
+                for pieces in outside:
+                    value = tables.value(pieces, color ^ 1)
+                    if value is None:
+                        raise ValueError(f"{signature}: no table for {signature_of(pieces)[0]}")
+                    result, plies = decode(value)
+                    if result == LOSS:
+                        best = min(best, plies + 1)
+                        can_lose = False
+                    elif result == DRAW:
+                        can_lose = False
+                    else:
+                        worst = max(worst, plies + 1)
+                if best < MAX_VALUE:
+                    pending.setdefault(best, []).append(index)
+                # symmetric moves lead to the same position of the table
+                children = {index_of(child, color ^ 1, pawns) for child in inside}
+                if not can_lose:
+                    counts[index] = CAN_NOT_LOSE
+                elif children:
+                    counts[index] = len(children)
+                    if worst:
+                        loss_plies[index] = worst
+                else:
+                    pending.setdefault(worst, []).append(index)
+    tables.close()
+
+    # retrograde analysis: the positions resolved at plies give the ones at plies + 1
+    plies = longest = 0
+    while pending:
+        resolved = []
+        for index in pending.pop(plies, []):
+            if not values[index]:
+                values[index] = plies + 1
+                resolved.append(index)
+                longest = plies
+        for index in resolved:
+            squares, color = squares_of_index(index, nb_pieces, pawns)
+            predecessors = _predecessors(order, squares, color)
+            for previous in {index_of(moved, color ^ 1, pawns) for moved in predecessors}:
+                if values[previous]:
+                    continue
+                if not plies & 1:
+                    # a move to a lost position: won
+                    pending.setdefault(plies + 1, []).append(previous)
+                elif counts[previous] != CAN_NOT_LOSE:
+                    # all the moves go to won positions: lost
+                    counts[previous] -= 1
+                    if not counts[previous]:
+                        lost = max(plies + 1, loss_plies.get(previous, 0))
+                        pending.setdefault(lost, []).append(previous)
+        plies += 1
+        if plies >= MAX_VALUE:
+            raise ValueError(f"{signature}: mates longer than {MAX_VALUE - 1} plies")
+
+    path = tables.path(signature)
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, nb_pieces, signature.encode()))
+        file.write(values.replace(bytes([ILLEGAL]), b"\0"))
+    logger.info(
+        f"{signature}: {size // 2} positions, longest mate {longest} plies, "
+        f"{time.perf_counter() - start:.1f}s"
+    )
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate endgame tablebases")
+    parser.add_argument(
+        "signatures",
+        nargs="*",
+        default=DEFAULT_SIGNATURES,
+        help=f"material sets, strongest side first (default: {' '.join(DEFAULT_SIGNATURES)})",
+    )
+    parser.add_argument(
+        "--out", default=TABLEBASE_DIR, help=f"directory (default: {TABLEBASE_DIR})"
+    )
+    args = parser.parse_args()
+
+    for signature in args.signatures:
+        generate(signature, args.out)
@@ -0,0 +1,80 @@
+"""
+
+Attack and ray tables precomputed once per square (square = line * 8 + col, see bitboard.py)
+
+knight, king and pawn targets, rays in the eight directions, and the squares between /
+on the line through two squares. Building everything takes a few milliseconds at import.
+
+"""
+
+# (line step, col step); rays going toward square 0 (a8) come first,
+# the opposite of direction d is direction (d + 4) % 8
+NORTH, WEST, NORTH_EAST, NORTH_WEST, SOUTH, EAST, SOUTH_WEST, SOUTH_EAST = range(8)
+DIRECTIONS = [(-1, 0), (0, -1), (-1, 1), (-1, -1), (1, 0), (0, 1), (1, -1), (1, 1)]
+ROOK_RAY_DIRECTIONS = [NORTH, WEST, SOUTH, EAST]
+BISHOP_RAY_DIRECTIONS = [NORTH_EAST, NORTH_WEST, SOUTH_EAST, SOUTH_WEST]
+
+KNIGHT_STEPS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_STEPS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _targets(square: int, steps: list[tuple[int, int]]) -> int:
+    line, col = divmod(square, 8)
+    bb = 0
+    for line_step, col_step in steps:
+        if 0 <= line + line_step <= 7 and 0 <= col + col_step <= 7:
+            bb |= 1 << ((line + line_step) * 8 + col + col_step)
+    return bb
+
+
+def _ray(square: int, direction: int) -> int:
+    line_step, col_step = DIRECTIONS[direction]
+    line, col = divmod(square, 8)
+    bb = 0
+    line, col = line + line_step, col + col_step
+    while 0 <= line <= 7 and 0 <= col <= 7:
+        bb |= 1 << (line * 8 + col)
+        line, col = line + line_step, col + col_step
+    return bb
+
+
+KNIGHT_ATTACKS = [_targets(square, KNIGHT_STEPS) for square in range(64)]
+KING_ATTACKS = [_targets(square, KING_STEPS) for square in range(64)]
+# index is color (white = 0): squares attacked by a pawn of this color
+PAWN_ATTACKS = [
+    [_targets(square, [(-1, -1), (-1, 1)]) for square in range(64)],
+    [_targets(square, [(1, -1), (1, 1)]) for square in range(64)],
+]
+
+# RAYS[direction][square]: squares seen from square in this direction on an empty board
+RAYS = [[_ray(square, direction) for square in range(64)] for direction in range(8)]
+ROOK_RAYS = [
+    RAYS[NORTH][square] | RAYS[SOUTH][square] | RAYS[EAST][square] | RAYS[WEST][square]
+    for square in range(64)
+]
+BISHOP_RAYS = [
+    RAYS[NORTH_EAST][square]
+    | RAYS[NORTH_WEST][square]
+    | RAYS[SOUTH_EAST][square]
+    | RAYS[SOUTH_WEST][square]
+    for square in range(64)
+]
+
+# BETWEEN[a][b]: squares strictly between a and b if they share a line, 0 otherwise
+# LINE[a][b]: the whole line (from edge to edge) through a and b, 0 if there is none
+BETWEEN = [[0] * 64 for _ in range(64)]
+LINE = [[0] * 64 for _ in range(64)]
+for _square in range(64):
+    for _direction in range(8):
+        _ray_bb = RAYS[_direction][_square]
+        _full_line = _ray_bb | RAYS[(_direction + 4) % 8][_square] | (1 << _square)
+        _between = 0
+        _bb = _ray_bb
+        while _bb:
+            # squares of a ray going toward square 0 must be walked from the highest one
+            _bit = 1 << (_bb.bit_length() - 1) if _direction < 4 else _bb & -_bb
+            _target = _bit.bit_length() - 1
+            BETWEEN[_square][_target] = _between
+            LINE[_square][_target] = _full_line
+            _between |= _bit
+            _bb ^= _bit
@@ -0,0 +1,54 @@
+"""
+
+Tests for ai/batch_evaluation.py - numpy evaluation of many positions
+
+"""
+
+import numpy as np
+import pytest
+
+from ai.batch_evaluation import encode, encode_children, evaluate_batch
+from ai.evaluation import evaluate
+from bitboard import BLACK, WHITE
+from perft import REFERENCE_POSITIONS
+from position import position_from_FEN
+
+
+@pytest.mark.parametrize("name", ["start", "kiwipete", "position3", "position4"])
+def test_children_scores(name: str) -> None:
+    # same scores as the incremental evaluation, for both colors
+    position = position_from_FEN(REFERENCE_POSITIONS[name][0])
+    moves = position.legal_codes()
+    boards = encode_children(position, moves)
+    expected: dict[int, list[int]] = {WHITE: [], BLACK: []}
+    for move in moves:
+        position.push(move)
+        for color in expected:
+            expected[color].append(evaluate(position, color))
+        position.pop()
+
+    assert boards.shape == (len(moves), 64)
+    for color in expected:
+        assert evaluate_batch(boards, color).tolist() == expected[color]
+
+
+def test_colors_per_board() -> None:
+    position = position_from_FEN(REFERENCE_POSITIONS["kiwipete"][0])
+    boards = encode([position.bitboard.squares] * 2)
+    scores = evaluate_batch(boards, np.array([WHITE, BLACK], dtype=np.int8))
+
+    assert boards.dtype == np.int8
+    assert scores.tolist() == [evaluate(position, WHITE), evaluate(position, BLACK)]
+
+
+def test_structure_terms() -> None:
+    # rooks on open files and free passed pawns of both colors
+    position = position_from_FEN("4k3/1P4r1/8/3p4/8/8/5Pp1/R3K2R w - -")
+    boards = encode_children(position, position.legal_codes())
+    expected = []
+    for move in position.legal_codes():
+        position.push(move)
+        expected.append(evaluate(position, BLACK))
+        position.pop()
+
+    assert evaluate_batch(boards, BLACK).tolist() == expected
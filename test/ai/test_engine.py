@@ -0,0 +1,152 @@
+"""
+
+Tests for ai/engine.py
+
+"""
+
+import threading
+import time
+
+from ai.ai import Ai
+from ai.engine import Engine
+from ai.minmax_ai import Minmax_Ai
+from position import position_from_FEN
+
+MATE_IN_ONE = "6k1/5ppp/8/8/8/8/8/R5K1 w - -"
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -"
+
+
+class BlockingAi(Ai):
+    # search blocked until released, records whether it was stopped when it started
+    def __init__(self) -> None:
+        super().__init__(position_from_FEN(MATE_IN_ONE), "w", start=False)
+        self.release = threading.Event()
+        self.stopped_at_start: list[bool] = []
+
+    def get_next_move(self) -> None:
+        self.stopped_at_start.append(self.stop_requested)
+        self.release.wait(5.0)
+        self.move = self.position.valid_moves[0]
+        self.get_next_move_finished = True
+
+
+def wait_for_move(engine: Engine, timeout: float = 30.0) -> float:
+    # seconds waited for the engine to finish
+    start = time.perf_counter()
+    while not engine.finished and time.perf_counter() - start < timeout:
+        time.sleep(0.01)
+    return time.perf_counter() - start
+
+
+def test_search_and_keep_ai() -> None:
+    position = position_from_FEN(MATE_IN_ONE)
+    ai = Minmax_Ai(position, "w", max_depth=3, start=False)
+    engine = Engine(ai)
+
+    engine.search(position)
+    wait_for_move(engine)
+    assert engine.move is not None
+    assert engine.move.chess_move == "Ra1a8"
+
+    # same AI object (and caches) for the next search
+    engine.search(position_from_FEN(KIWIPETE))
+    wait_for_move(engine)
+    assert engine.ai is ai
+    assert engine.move is not None
+    engine.quit()
+    assert not engine.thread.is_alive()
+
+
+def test_stop() -> None:
+    position = position_from_FEN(KIWIPETE)
+    engine = Engine(Minmax_Ai(position, "w", max_depth=20, start=False))
+
+    engine.search(position, time_limit=60.0)
+    time.sleep(0.2)
+    engine.stop()
+
+    # best move so far, long before the time limit
+    assert wait_for_move(engine) < 5.0
+    assert engine.move is not None
+    assert engine.move.code in [move.code for move in position.valid_moves]
+    engine.quit()
+
+
+def test_time_limit_and_new_search() -> None:
+    position = position_from_FEN(KIWIPETE)
+    engine = Engine(Minmax_Ai(position, "w", max_depth=20, start=False))
+
+    engine.search(position, time_limit=60.0)
+    # a new search replaces the running one
+    engine.search(position_from_FEN(MATE_IN_ONE), time_limit=0.5)
+
+    assert wait_for_move(engine) < 5.0
+    assert engine.move is not None
+    assert engine.move.chess_move == "Ra1a8"
+    engine.quit()
+
+
+def test_ponder_hit() -> None:
+    position = position_from_FEN(KIWIPETE)
+    engine = Engine(Minmax_Ai(position, "w", max_depth=20, time_limit=0.5, start=False))
+    engine.search(position)
+    wait_for_move(engine)
+    assert engine.move is not None
+    assert len(engine.ai.principal_variation) >= 2
+
+    # engine move played, the engine searches the expected reply during the player's time
+    position.make_move(engine.move)
+    engine.ponder(position)
+    time.sleep(1.0)
+    # no time limit while pondering
+    assert not engine.finished
+
+    reply = next(x for x in position.valid_moves if x.code == engine.ponder_move)
+    assert engine.ponder_hit(reply)
+    # the time budget is already spent: best move at once
+    assert wait_for_move(engine) < 1.0
+    position.make_move(reply)
+    assert engine.move is not None
+    assert engine.move.code in [move.code for move in position.valid_moves]
+    engine.quit()
+
+
+def test_ponder_miss() -> None:
+    position = position_from_FEN(KIWIPETE)
+    engine = Engine(Minmax_Ai(position, "w", max_depth=20, time_limit=0.5, start=False))
+    engine.search(position)
+    wait_for_move(engine)
+    assert engine.move is not None
+
+    position.make_move(engine.move)
+    engine.ponder(position)
+    other = next(x for x in position.valid_moves if x.code != engine.ponder_move)
+    assert not engine.ponder_hit(other)
+
+    # the new search stops the ponder search
+    position.make_move(other)
+    engine.search(position)
+    assert wait_for_move(engine) < 5.0
+    assert engine.move is not None
+    assert engine.move.code in [move.code for move in position.valid_moves]
+    engine.quit()
+
+
+def test_stop_belongs_to_job() -> None:
+    ai = BlockingAi()
+    engine = Engine(ai)
+    engine.search(position_from_FEN(MATE_IN_ONE))
+    while not ai.stopped_at_start:
+        time.sleep(0.01)
+
+    # the second job is stopped before it starts, the answer is its own move
+    position = position_from_FEN(KIWIPETE)
+    engine.search(position)
+    engine.stop()
+    ai.release.set()
+    wait_for_move(engine)
+
+    assert ai.stopped_at_start == [False, True]
+    assert engine.move is not None
+    assert engine.move.code in [move.code for move in position.valid_moves]
+    engine.quit()
@@ -0,0 +1,64 @@
+"""
+
+Tests for ai/evaluation_cache.py
+
+"""
+
+from ai.batch_evaluation import encode_children, evaluate_batch, evaluate_children
+from ai.evaluation import evaluate
+from ai.evaluation_cache import EvaluationCache
+from bitboard import BLACK, WHITE
+from perft import REFERENCE_POSITIONS
+from position import position_from_FEN
+
+
+def test_get_and_put() -> None:
+    cache = EvaluationCache(8)
+    key = 0x123456789ABCDEF0
+
+    assert cache.get(key, WHITE) is None
+    cache.put(key, WHITE, 35)
+
+    assert cache.get(key, WHITE) == 35
+    # the score of each color is a separate entry
+    assert cache.get(key, BLACK) is None
+    assert cache.hits == 1
+    assert cache.misses == 2
+
+
+def test_replacement() -> None:
+    cache = EvaluationCache(2)
+    cache.put(1, WHITE, 10)
+    cache.put(2, WHITE, 20)
+    assert cache.get(1, WHITE) == 10
+
+    # the entry read gets a second chance, the other one is replaced
+    cache.put(3, WHITE, 30)
+    assert cache.get(2, WHITE) is None
+    assert cache.get(1, WHITE) == 10
+    assert cache.get(3, WHITE) == 30
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 2
+
+
+def test_evaluate() -> None:
+    cache = EvaluationCache()
+    position = position_from_FEN(REFERENCE_POSITIONS["kiwipete"][0])
+
+    for color in (WHITE, BLACK):
+        assert cache.evaluate(position, color) == evaluate(position, color)
+        assert cache.evaluate(position, color) == evaluate(position, color)
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_evaluate_children() -> None:
+    cache = EvaluationCache()
+    position = position_from_FEN(REFERENCE_POSITIONS["position4"][0])
+    moves = position.legal_codes()
+    expected = evaluate_batch(encode_children(position, moves), BLACK).tolist()
+
+    assert evaluate_children(position, moves, BLACK, cache).tolist() == expected
+    assert cache.misses == len(moves) and cache.hits == 0
+    # second time: all the scores come from the cache
+    assert evaluate_children(position, moves, BLACK, cache).tolist() == expected
+    assert cache.hits == len(moves)
@@ -0,0 +1,101 @@
+"""
+
+Tests for ai/minmax_ai.py
+
+"""
+
+import time
+
+from ai.minmax_ai import MATE_SCORE, Minmax_Ai, Plain_Minmax_Ai
+from ai.transposition import TranspositionTable
+from position import position_from_FEN
+
+
+def wait_for_move(ai: Minmax_Ai) -> None:
+    # the search runs in the thread started by Ai
+    for _ in range(3000):
+        if ai.get_next_move_finished:
+            return
+        time.sleep(0.01)
+
+
+def test_mate_in_one() -> None:
+    position = position_from_FEN("6k1/5ppp/8/8/8/8/8/R5K1 w - -")
+
+    ai = Minmax_Ai(position, "w", max_depth=3)
+    wait_for_move(ai)
+
+    assert ai.move.chess_move == "Ra1a8"
+
+
+def test_win_material() -> None:
+    # the knight fork on c7 wins the rook
+    position = position_from_FEN("r3k3/8/8/1N6/8/8/8/4K3 w - -")
+
+    ai = Minmax_Ai(position, "w", max_depth=3)
+    wait_for_move(ai)
+
+    assert ai.move.chess_move == "Nb5c7"
+
+
+def test_time_limit() -> None:
+    position = position_from_FEN("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -")
+
+    ai = Minmax_Ai(position, "w", max_depth=20, time_limit=0.2)
+    wait_for_move(ai)
+
+    assert ai.get_next_move_finished
+    assert ai.depth_reached < 20
+    # the position searched is back to the root
+    assert not ai.position.history
+    assert ai.move.code in [x.code for x in position.valid_moves]
+
+
+def test_quiescence() -> None:
+    # the pawn on d5 is defended: taking it at depth 1 loses the queen
+    position = position_from_FEN("4k3/8/4p3/3p4/8/8/8/3QK3 w - -")
+
+    ai = Minmax_Ai(position, "w", max_depth=1)
+    wait_for_move(ai)
+
+    assert ai.move.chess_move != "Qd1xd5"
+    assert ai.quiescence_nodes > 0
+
+
+def test_selective_search() -> None:
+    # same move with fewer nodes than the plain alpha-beta search
+    fen = "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq -"
+    searches = []
+    for ai_class in (Plain_Minmax_Ai, Minmax_Ai):
+        ai = ai_class(
+            position_from_FEN(fen),
+            "w",
+            max_depth=4,
+            time_limit=60,
+            transposition_table=TranspositionTable(),
+            start=False,
+        )
+        ai.get_next_move()
+        searches.append(ai)
+    plain, selective = searches
+
+    assert selective.move.code == plain.move.code
+    assert selective.nodes < plain.nodes
+    assert selective.reductions > 0 and selective.futility_prunes > 0
+    assert plain.null_move_cutoffs == plain.reductions == plain.futility_prunes == 0
+
+
+def test_zugzwang() -> None:
+    # Ra6 only mates because black has to move: no null move cut after it, at any depth
+    ai = Minmax_Ai(
+        position_from_FEN("kbK5/pp6/1P6/8/8/8/8/R7 w - -"),
+        "w",
+        transposition_table=TranspositionTable(),
+        start=False,
+    )
+    ai.deadline = time.perf_counter() + 60
+    codes = [move.code for move in ai.position.valid_moves]
+    for depth in range(3, 6):
+        move, score = ai.search_root(codes, depth)
+        assert ai.position.move_from_code(move).chess_move == "Ra1a6"
+        assert score == MATE_SCORE - 3
@@ -0,0 +1,52 @@
+"""
+
+Tests for ai/move_ordering.py
+
+"""
+
+from ai.move_ordering import MoveOrdering
+from bitboard import WHITE, uci
+from position import position_from_FEN
+
+
+def test_mvv_lva() -> None:
+    # pawn, knight and queen can take the black queen on d5, the queen can take a pawn on d7
+    position = position_from_FEN("4k3/3p4/8/3q4/4P3/2N5/8/3QK3 w - -")
+    ordering = MoveOrdering()
+
+    moves = ordering.order(position.legal_codes(), position.bitboard.squares, WHITE, 0)
+
+    assert [uci(x) for x in moves[:3]] == ["e4d5", "c3d5", "d1d5"]
+
+
+def test_tt_move_killers_and_history() -> None:
+    position = position_from_FEN("4k3/8/8/8/8/8/4P3/4K1N1 w - -")
+    ordering = MoveOrdering()
+    legal_moves = position.legal_codes()
+    by_name = {uci(x): x for x in legal_moves}
+
+    ordering.update(by_name["g1f3"], WHITE, 3, 2, 0)
+    ordering.update(by_name["e2e4"], WHITE, 3, 2, 4)
+    ordering.update(by_name["g1h3"], WHITE, 1, 5, 1)
+
+    moves = ordering.order(legal_moves, position.bitboard.squares, WHITE, 2, by_name["e1d1"])
+
+    # table move, killers of the ply (last one first), then history
+    assert [uci(x) for x in moves[:4]] == ["e1d1", "e2e4", "g1f3", "g1h3"]
+    assert ordering.cutoffs == 3
+    assert ordering.first_move_cutoff_rate() == 1 / 3
+
+
+def test_countermove() -> None:
+    position = position_from_FEN("4k3/8/8/8/8/8/4P3/4K1N1 w - -")
+    ordering = MoveOrdering()
+    legal_moves = position.legal_codes()
+    by_name = {uci(x): x for x in legal_moves}
+
+    ordering.update(by_name["e2e3"], WHITE, 1, 10, 0, previous_move=0x1234)
+    # only the countermove is left
+    ordering.new_search()
+    ordering.history = [0] * len(ordering.history)
+
+    moves = ordering.order(legal_moves, position.bitboard.squares, WHITE, 0, 0, 0x1234)
+    assert uci(moves[0]) == "e2e3"
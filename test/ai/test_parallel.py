@@ -0,0 +1,103 @@
+"""
+
+Tests for ai/parallel.py
+
+"""
+
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from ai.engine import Engine
+from ai.parallel import Parallel_Ai, search_root_moves, shutdown_idle_pools
+from ai.shared_transposition import SharedTranspositionTable, shared_memory_table
+from position import position_from_FEN
+
+
+@pytest.fixture(autouse=True)
+def pool() -> Iterator[None]:
+    yield
+    shutdown_idle_pools()
+
+
+def wait_for_move(ai: Parallel_Ai) -> None:
+    # the search runs in the thread started by Ai
+    for _ in range(3000):
+        if ai.get_next_move_finished:
+            return
+        time.sleep(0.01)
+
+
+def test_search_root_moves() -> None:
+    # search of part of the root moves, as made by a worker
+    position = position_from_FEN("6k1/5ppp/8/8/8/8/8/R5K1 w - -")
+    codes = [move.code for move in position.valid_moves]
+    mate = next(move.code for move in position.valid_moves if move.chess_move == "Ra1a8")
+
+    result = search_root_moves(position, codes, 2, 10.0)
+
+    assert result is not None
+    assert result[0] == mate
+    # no other move reaches the score of the mate: the worker fails low
+    others = [code for code in codes if code != mate]
+    fail_low = search_root_moves(position, others, 2, 10.0, result[1])
+    assert fail_low is not None
+    assert fail_low[:2] == (others[0], result[1])
+    assert search_root_moves(position, codes, 20, 0.0) is None
+
+
+def test_mate_in_one() -> None:
+    position = position_from_FEN("6k1/5ppp/8/8/8/8/8/R5K1 w - -")
+
+    ai = Parallel_Ai(position, "w", max_depth=3, time_limit=30.0, workers=2)
+    wait_for_move(ai)
+
+    assert ai.move.chess_move == "Ra1a8"
+    assert ai.depth_reached > 0
+
+
+def test_quit_stops_workers() -> None:
+    position = position_from_FEN("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -")
+    searching = Parallel_Ai(position, "w", max_depth=20, workers=2, start=False)
+    other = Parallel_Ai(position, "b", max_depth=1, workers=2, start=False)
+    engine = Engine(searching)
+    engine.search(position, time_limit=60.0)
+    time.sleep(1.0)
+    pool = searching.pool
+    assert pool is not None
+    processes = list(pool._processes.values())
+
+    engine.quit()
+
+    # the pool is kept, its workers give up the search for the next AI (e.g. of the next game)
+    ai = Parallel_Ai(position, "w", max_depth=1, workers=2, start=False)
+    start = time.perf_counter()
+    ai.get_next_move()
+    assert ai.pool is pool
+    assert time.perf_counter() - start < 5.0
+    assert processes and all(process.is_alive() for process in processes)
+    # an AI has its own pool
+    other.get_next_move()
+    assert other.pool is not pool
+    ai.quit()
+    other.quit()
+
+
+def test_own_table() -> None:
+    # each AI of a game has its own table, freed when it quits, not the one of the process
+    position = position_from_FEN("6k1/5ppp/8/8/8/8/8/R5K1 w - -")
+    white = Parallel_Ai(position, "w", transposition_table=SharedTranspositionTable(1), start=False)
+    black = Parallel_Ai(position, "b", transposition_table=SharedTranspositionTable(1), start=False)
+    standalone = Parallel_Ai(position, "w", start=False)
+
+    assert white.shared_table is not black.shared_table
+    assert standalone.shared_table is shared_memory_table()
+
+    white.quit()
+    standalone.quit()
+
+    with pytest.raises(FileNotFoundError):
+        SharedTranspositionTable(name=white.shared_table.name)
+    assert shared_memory_table().words[0]
+    black.quit()
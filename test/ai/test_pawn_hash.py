@@ -0,0 +1,80 @@
+"""
+
+Tests for ai/pawn_hash.py - pawn structure terms and their hash table
+
+"""
+
+from ai.evaluation import evaluate
+from ai.pawn_hash import (
+    DOUBLED,
+    FILES,
+    ISOLATED,
+    PASSED_EG,
+    PASSED_MG,
+    PROTECTED,
+    PawnHashTable,
+    pawn_terms,
+)
+from bitboard import BLACK, PAWN, WHITE, square_from_coords
+from perft import REFERENCE_POSITIONS
+from position import position_from_FEN
+
+
+def pawns(*names: str) -> int:
+    bb = 0
+    for name in names:
+        bb |= 1 << square_from_coords(name)
+    return bb
+
+
+def test_terms() -> None:
+    # no pawns: nothing but open files
+    assert pawn_terms(0, 0) == (0, 0, 0, sum(FILES))
+
+    # doubled isolated pawns against a pawn on the same file: no passed pawn
+    mg_score, eg_score, passed, open_files = pawn_terms(pawns("a2", "a3"), pawns("a7"))
+    assert mg_score == 2 * ISOLATED[0] + DOUBLED[0] - ISOLATED[0]
+    assert eg_score == 2 * ISOLATED[1] + DOUBLED[1] - ISOLATED[1]
+    assert passed == 0
+    assert open_files == sum(FILES[1:])
+
+    # protected passed pawns against an isolated passed pawn
+    mg_score, eg_score, passed, _ = pawn_terms(pawns("d6", "e5"), pawns("a7"))
+    assert passed == pawns("d6", "e5", "a7")
+    assert mg_score == PROTECTED[0] + PASSED_MG[5] + PASSED_MG[4] - ISOLATED[0] - PASSED_MG[1]
+    assert eg_score == PROTECTED[1] + PASSED_EG[5] + PASSED_EG[4] - ISOLATED[1] - PASSED_EG[1]
+
+
+def test_terms_symmetry() -> None:
+    # mirrored structure: opposite scores, mirrored masks
+    white = pawn_terms(pawns("b2", "c3", "c4", "g5"), pawns("f7", "h6"))
+    black = pawn_terms(pawns("f2", "h3"), pawns("b7", "c6", "c5", "g4"))
+    assert white[:2] == (-black[0], -black[1])
+    assert white[3] == black[3]
+
+
+def test_probe() -> None:
+    table = PawnHashTable(16)
+    position = position_from_FEN(REFERENCE_POSITIONS["kiwipete"][0])
+    white, black = position.bitboard.pieces[PAWN], position.bitboard.pieces[6 + PAWN]
+
+    entry = table.probe(position.pawn_key, white, black)
+    assert entry == (position.pawn_key, *pawn_terms(white, black))
+    assert table.probe(position.pawn_key, white, black) == entry
+    assert table.hits == 1 and table.misses == 1
+
+
+def test_hit_rate() -> None:
+    # pawn moves are a small part of the tree: the structures are found again
+    table = PawnHashTable()
+    position = position_from_FEN(REFERENCE_POSITIONS["kiwipete"][0])
+    for move in position.legal_codes():
+        position.push(move)
+        for reply in position.legal_codes():
+            position.push(reply)
+            evaluate(position, WHITE, table)
+            evaluate(position, BLACK, table)
+            position.pop()
+        position.pop()
+
+    assert table.stats()["hit_rate"] > 0.95
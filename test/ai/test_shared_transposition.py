@@ -0,0 +1,67 @@
+"""
+
+Tests for ai/shared_transposition.py
+
+"""
+
+import multiprocessing
+import pickle
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from ai.shared_transposition import HEADER_SIZE, SharedTranspositionTable
+from ai.transposition import EXACT, LOWER_BOUND
+
+KEY = 0x123456789ABCDEF0
+
+
+@pytest.fixture
+def table() -> Iterator[SharedTranspositionTable]:
+    shared = SharedTranspositionTable(0.01)
+    yield shared
+    shared.close()
+
+
+def store_in_worker(table: SharedTranspositionTable, key: int) -> int:
+    table.store(key, 3, LOWER_BOUND, 42, 0x0123)
+    return table.size
+
+
+def test_store_and_probe(table: SharedTranspositionTable) -> None:
+    assert table.probe(KEY) is None
+    table.store(KEY, 5, EXACT, -1234, 0x1C34)
+
+    assert table.probe(KEY) == (0x1C34, 5, EXACT, -1234)
+    assert table.probe(KEY ^ (1 << 63)) is None
+    assert table.stats()["hits"] == 1
+    assert table.stats()["misses"] == 2
+    assert table.stats()["usage"] > 0
+
+
+def test_torn_entry(table: SharedTranspositionTable) -> None:
+    table.store(KEY, 5, EXACT, -1234, 0x1C34)
+    slot = HEADER_SIZE + (KEY & table.mask) * 4
+
+    # data written by another process, key word not yet: the entry does not match
+    table.words[slot + 1] ^= 1 << 16
+    assert table.probe(KEY) is None
+
+
+def test_attach(table: SharedTranspositionTable) -> None:
+    # a pickled table is the same shared memory (the same object in the same process)
+    attached = pickle.loads(pickle.dumps(table))
+    attached.store(KEY, 5, EXACT, 7, 0x1C34)
+
+    assert attached is table
+    assert table.probe(KEY) == (0x1C34, 5, EXACT, 7)
+
+
+def test_shared_with_worker_process(table: SharedTranspositionTable) -> None:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        assert pool.submit(store_in_worker, table, KEY).result() == table.size
+
+    assert table.probe(KEY) == (0x0123, 3, LOWER_BOUND, 42)
+    assert table.stores == 1
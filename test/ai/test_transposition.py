@@ -0,0 +1,60 @@
+"""
+
+Tests for ai/transposition.py
+
+"""
+
+from ai.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable
+
+
+def test_store_and_probe() -> None:
+    table = TranspositionTable(1)
+    key = 0x123456789ABCDEF0
+
+    assert table.probe(key) is None
+    table.store(key, 5, EXACT, -1234, 0x1C34)
+
+    assert table.probe(key) == (0x1C34, 5, EXACT, -1234)
+    assert table.probe(key ^ (1 << 63)) is None
+    assert table.hits == 1
+    assert table.misses == 2
+    # same bucket, other position
+    assert table.collisions == 1
+
+
+def test_memory_cap() -> None:
+    table = TranspositionTable(1)
+
+    # 16 bytes per entry
+    assert table.size == 65536
+    assert table.keys.itemsize * len(table.keys) + table.data.itemsize * len(table.data) == 1 << 20
+
+
+def test_depth_preferred_and_always_replace() -> None:
+    table = TranspositionTable(0.001)
+    nb_buckets = table.mask + 1
+    deep, shallow, other = 7, 7 + nb_buckets, 7 + 2 * nb_buckets
+
+    table.store(deep, 8, LOWER_BOUND, 10, 1)
+    table.store(shallow, 2, UPPER_BOUND, 20, 2)
+    table.store(other, 1, EXACT, 30, 3)
+
+    # the deep entry stays, the always-replace slot holds the last one
+    assert table.probe(deep) == (1, 8, LOWER_BOUND, 10)
+    assert table.probe(shallow) is None
+    assert table.probe(other) == (3, 1, EXACT, 30)
+
+    # entries of an older search are replaced whatever their depth
+    table.new_search()
+    table.store(shallow, 1, EXACT, 40, 4)
+    assert table.probe(shallow) == (4, 1, EXACT, 40)
+    assert table.probe(deep) is None
+
+
+def test_keep_best_move() -> None:
+    table = TranspositionTable(1)
+
+    table.store(42, 3, EXACT, 0, 0x0FFF)
+    table.store(42, 4, UPPER_BOUND, -5, 0)
+
+    assert table.probe(42) == (0x0FFF, 4, UPPER_BOUND, -5)
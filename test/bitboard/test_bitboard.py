@@ -0,0 +1,113 @@
+"""
+
+Tests for bitboard.py
+
+"""
+
+import pytest
+
+from bitboard import (
+    BLACK,
+    KING,
+    KING_CASTLE,
+    PAWN,
+    QUEEN,
+    ROOK,
+    WHITE,
+    WHITE_KING_SIDE,
+    BitBoard,
+    encode_move,
+    king_attacks,
+    knight_attacks,
+    square_from_coords,
+    squares_of,
+    uci,
+)
+from board import Board
+
+
+@pytest.fixture
+def test_board() -> Board:
+    # empty board used by tests
+    return Board("WOOD")
+
+
+def test_square_from_coords() -> None:
+    assert square_from_coords("a8") == 0
+    assert square_from_coords("h8") == 7
+    assert square_from_coords("e2") == 52
+    assert square_from_coords("h1") == 63
+
+
+def test_from_board(test_board: Board) -> None:
+    test_board.load_board_from_FEN("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR")
+
+    bitboard = BitBoard.from_board(test_board.board_content)
+
+    assert bitboard.occupied == 0xFFFF00000000FFFF
+    assert bitboard.pieces[WHITE * 6 + PAWN] == 0xFF << 48
+    assert bitboard.pieces[BLACK * 6 + PAWN] == 0xFF << 8
+    assert bitboard.king_square(WHITE) == square_from_coords("e1")
+    assert bitboard.squares[square_from_coords("d8")] == BLACK * 6 + QUEEN
+
+
+def test_leaper_attacks_do_not_wrap() -> None:
+    assert squares_of(knight_attacks(1 << square_from_coords("a1"))) == [
+        square_from_coords("b3"),
+        square_from_coords("c2"),
+    ]
+    assert len(squares_of(king_attacks(1 << square_from_coords("h4")))) == 5
+
+
+def test_attacks(test_board: Board) -> None:
+    test_board.load_board_from_FEN("8/1p4k1/8/8/8/8/8/r7")
+
+    bitboard = BitBoard.from_board(test_board.board_content)
+    attacks = bitboard.attacks(BLACK)
+
+    for coords in ["a8", "a2", "h1", "a6", "c6", "h8", "h6"]:
+        assert attacks & (1 << square_from_coords(coords)), coords
+    assert not attacks & (1 << square_from_coords("b6"))
+
+
+def test_generate_moves_start(test_board: Board) -> None:
+    test_board.load_board_from_FEN("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR")
+
+    bitboard = BitBoard.from_board(test_board.board_content)
+
+    assert len(bitboard.generate_moves(WHITE)) == 20
+    assert len(bitboard.generate_moves(BLACK)) == 20
+
+
+def test_apply_castle(test_board: Board) -> None:
+    test_board.load_board_from_FEN("8/8/8/8/8/8/8/R3K2R")
+
+    bitboard = BitBoard.from_board(test_board.board_content)
+    move = encode_move(square_from_coords("e1"), square_from_coords("g1"), KING_CASTLE)
+    assert move in bitboard.generate_moves(WHITE, castling=WHITE_KING_SIDE)
+
+    bitboard.apply(move)
+
+    assert bitboard.squares[square_from_coords("g1")] == WHITE * 6 + KING
+    assert bitboard.squares[square_from_coords("f1")] == WHITE * 6 + ROOK
+    assert not bitboard.occupied & (1 << square_from_coords("h1"))
+
+
+def test_generate_legal_captures(test_board: Board) -> None:
+    # the pinned knight can not take c3, the pawn takes or promotes, the king takes f1
+    test_board.load_board_from_FEN("1n2r1k1/P7/8/8/8/2p5/4N3/4Kb2")
+
+    bitboard = BitBoard.from_board(test_board.board_content)
+    captures = bitboard.generate_legal_moves(WHITE, captures_only=True)
+
+    assert sorted(uci(x) for x in captures) == [
+        "a7a8b",
+        "a7a8n",
+        "a7a8q",
+        "a7a8r",
+        "a7b8b",
+        "a7b8n",
+        "a7b8q",
+        "a7b8r",
+        "e1f1",
+    ]
@@ -0,0 +1,104 @@
+"""
+
+Tests for book.py - opening book file and builder
+
+"""
+
+from pathlib import Path
+
+import pytest
+
+import book
+from ai.minmax_ai import Minmax_Ai
+from bitboard import uci
+from book import ENTRY, BookBuilder, OpeningBook, read_pgn, read_records, san
+from perft import REFERENCE_POSITIONS
+from position import position_from_FEN
+
+PGN = """[Event "test"]
+[Result "1-0"]
+
+1. e4 {best by test} e5 2. Nf3 (2. f4 exf4) Nc6 3. Bb5 $1 a6 ; Morphy
+4. Ba4 Nf6 5. 0-0 1-0
+
+[Event "test"]
+[Result "1/2-1/2"]
+
+1. d4 d5 2. c4 1/2-1/2
+"""
+
+
+def start_position_moves(opening_book: OpeningBook) -> list[str]:
+    position = position_from_FEN(REFERENCE_POSITIONS["start"][0])
+    return [uci(move) for move, _ in opening_book.probe(position.key)]
+
+
+def test_san() -> None:
+    position = position_from_FEN(REFERENCE_POSITIONS["kiwipete"][0])
+    names = {san(position, move) for move in position.legal_codes()}
+
+    assert {"O-O", "O-O-O", "Nxf7", "dxe6", "Qxf6", "Bxa6", "a3", "Rb1"} <= names
+    # both knights can go to d2: file added, both rooks to a3: rank added
+    position = position_from_FEN("4k3/8/8/R7/8/5N2/8/RN2K3 w - -")
+    names = {san(position, move) for move in position.legal_codes()}
+    assert {"Nbd2", "Nfd2", "Ne5", "R1a3", "R5a3", "Rb5"} <= names
+
+
+def test_read_pgn(tmp_path: Path) -> None:
+    path = tmp_path / "games.pgn"
+    path.write_text(PGN)
+
+    games = list(read_pgn(str(path)))
+
+    assert games == [
+        ("1-0", ["e4", "e5", "Nf3", "Nc6", "Bb5", "a6", "Ba4", "Nf6", "O-O"]),
+        ("1/2-1/2", ["d4", "d5", "c4"]),
+    ]
+
+
+def test_build_and_probe(tmp_path: Path) -> None:
+    pgn, book_file = tmp_path / "games.pgn", tmp_path / "book.bin"
+    pgn.write_text(PGN)
+    builder = BookBuilder()
+    # the draw counts for both sides, the won game only for white
+    builder.add_games(read_pgn(str(pgn)))
+
+    assert builder.write(str(book_file)) == 5 + 3
+    assert book_file.stat().st_size == 8 * ENTRY.size
+    opening_book = OpeningBook(str(book_file))
+    # entries are sorted by key, best weight first
+    keys = [ENTRY.unpack_from(opening_book.data, i * ENTRY.size)[0] for i in range(8)]
+    assert keys == sorted(keys)
+    assert start_position_moves(opening_book) == ["e2e4", "d2d4"]
+    assert opening_book.probe(12345) == []
+    opening_book.close()
+
+
+def test_records(tmp_path: Path) -> None:
+    records, book_file = tmp_path / "records.txt", tmp_path / "book.bin"
+    records.write_text("0-1 g1f3 d7d5\n1-0 e2e4 e7e5 g1f3\n")
+    builder = BookBuilder(max_ply=2)
+    builder.add_games(read_records(str(records)), "uci")
+    builder.write(str(book_file))
+
+    opening_book = OpeningBook(str(book_file))
+    # the lost game only counts for black
+    assert start_position_moves(opening_book) == ["e2e4"]
+    opening_book.close()
+
+
+def test_ai_plays_book_move(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    records, book_file = tmp_path / "records.txt", tmp_path / "book.bin"
+    records.write_text("1-0 b1a3\n")
+    builder = BookBuilder()
+    builder.add_games(read_records(str(records)), "uci")
+    builder.write(str(book_file))
+    opening_book = OpeningBook(str(book_file))
+    monkeypatch.setattr(book, "_opening_book", opening_book)
+
+    ai = Minmax_Ai(position_from_FEN(REFERENCE_POSITIONS["start"][0]), "w", start=False)
+    ai.get_next_move()
+
+    assert ai.move.chess_move == "Nb1a3"
+    assert ai.nodes == 0
+    opening_book.close()
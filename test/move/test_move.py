@@ -4,9 +4,44 @@ Tests for move.py
 
 """
 
+from bitboard import (
+    BLACK,
+    EP_CAPTURE,
+    KING,
+    KING_CASTLE,
+    PAWN,
+    PROMOTION_CAPTURE,
+    QUEEN_CASTLE,
+    ROOK,
+    encode_move,
+)
 from move import Move
 
 
 def test_move_str() -> None:
     test_move = Move((1, 0), (2, 0), "a2a3")
     assert f"{test_move}" == "a2a3"
+
+
+def test_move_from_code() -> None:
+    # white pawn e7 takes d8 and promotes
+    test_move = Move.from_code(encode_move(12, 3, PROMOTION_CAPTURE), PAWN, BLACK * 6 + ROOK)
+
+    assert test_move.square_from == (1, 4)
+    assert test_move.square_to == (0, 3)
+    assert test_move.is_capture and test_move.is_promotion and test_move.is_pawn_move
+    assert not test_move.is_castle and not test_move.is_en_passant
+
+    assert test_move.chess_move == "e7xd8"
+    test_move.promotion = "N"
+    test_move.check = True
+    assert f"{test_move}" == "e7xd8N+"
+
+
+def test_move_castle_and_en_passant() -> None:
+    assert Move.from_code(encode_move(60, 62, KING_CASTLE), KING).chess_move == "0-0"
+    assert Move.from_code(encode_move(4, 2, QUEEN_CASTLE), BLACK * 6 + KING).chess_move == "0-0-0"
+
+    ep_move = Move.from_code(encode_move(28, 19, EP_CAPTURE), PAWN, BLACK * 6 + PAWN)
+    assert ep_move.is_en_passant and ep_move.is_capture
+    assert ep_move.chess_move == "e5xd6 e.p"
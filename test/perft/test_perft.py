@@ -0,0 +1,45 @@
+"""
+
+Tests for perft.py and position.py - perft / perft_divide
+
+"""
+
+import pytest
+
+from perft import REFERENCE_POSITIONS, perft, perft_divide
+from position import position_from_FEN
+
+
+@pytest.mark.parametrize("name", list(REFERENCE_POSITIONS))
+def test_reference_positions(name: str) -> None:
+    fen, expected_nodes = REFERENCE_POSITIONS[name]
+
+    # keep the test fast: stop before 10000 nodes
+    for depth, expected in enumerate(expected_nodes, 1):
+        if expected > 10000:
+            break
+        assert perft(fen, depth) == expected, f"{name} depth {depth}"
+
+
+def test_perft_divide() -> None:
+    fen, expected_nodes = REFERENCE_POSITIONS["kiwipete"]
+
+    nodes = perft_divide(fen, 2)
+
+    assert len(nodes) == expected_nodes[0]
+    assert sum(nodes.values()) == expected_nodes[1]
+    assert nodes["e1g1"] == 43
+
+
+def test_perft_divide_processes() -> None:
+    fen, expected_nodes = REFERENCE_POSITIONS["position4"]
+
+    assert perft(fen, 2, processes=2) == expected_nodes[1]
+
+
+def test_position_from_fen() -> None:
+    position = position_from_FEN("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w Kq f6 0 3")
+
+    assert position.castling == 1 | 8
+    assert "e5xf6 e.p" in [x.chess_move for x in position.valid_moves]
+    assert position.perft(1) == 31
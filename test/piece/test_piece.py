@@ -4,7 +4,12 @@ Tests for piece.py
 
 """
 
-from piece import Piece
+import copy
+import pickle
+
+import pytest
+
+from piece import NO_PIECE, PIECES, Piece
 
 
 def test_piece_str() -> None:
@@ -26,3 +31,22 @@ def test_piece_eq() -> None:
     assert Piece("N", "w") == Piece("N", "w")
     assert not (Piece("N", "w") == Piece("N", "b"))
     assert not (Piece("N", "w") == "Nw")
+
+
+def test_piece_interned() -> None:
+    assert Piece("Q", "b") is Piece("Q", "b")
+    assert Piece() is NO_PIECE
+    assert copy.deepcopy([[Piece("R", "w")]])[0][0] is Piece("R", "w")
+    assert pickle.loads(pickle.dumps(Piece("K", "b"))) is Piece("K", "b")
+
+
+def test_piece_immutable() -> None:
+    with pytest.raises(AttributeError):
+        Piece("P", "w").piece = "Q"
+
+
+def test_piece_code() -> None:
+    assert NO_PIECE.code == -1
+    assert Piece("P", "w").code == 0
+    assert Piece("K", "b").code == 11
+    assert [x.code for x in PIECES] == list(range(12))
@@ -6,6 +6,7 @@ Tests for position.py - is_in_check
 
 import pytest
 
+from bitboard import WHITE
 from board import Board
 from common import FlagsT
 from position import Position
@@ -86,3 +87,21 @@ def test_no_chess_if_no_king(test_board: Board, test_flags: FlagsT) -> None:
 
     test_position = Position(test_board.board_content, test_flags)
     assert not test_position.king_is_in_check(test_board.board_content)
+
+
+def test_attack_map_cached(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("4k3/8/8/8/8/8/8/R3K3")
+
+    test_position = Position(test_board.board_content, test_flags)
+    attacks = test_position.attack_map(WHITE)
+    assert attacks == test_position.bitboard.attacks(WHITE)
+    assert test_position._attack_maps[WHITE] == attacks
+    assert not test_position.in_check()
+
+    # Ra1a8+ : maps are computed again for the new state, and back after unmake
+    test_position.make_move(next(x for x in test_position.valid_moves if x.chess_move == "Ra1a8"))
+    assert test_position.in_check()
+    assert test_position.attack_map(WHITE) != attacks
+    test_position.unmake_move()
+    assert test_position.attack_map(WHITE) == attacks
+    assert not test_position.in_check()
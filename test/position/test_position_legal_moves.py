@@ -0,0 +1,85 @@
+"""
+
+Tests for position.py - legal moves (checks, pins, en passant discovered check)
+
+"""
+
+import pytest
+
+from board import Board
+from common import FlagsT
+from position import Position
+
+
+@pytest.fixture
+def test_board() -> Board:
+    # empty board used by tests
+    return Board("WOOD")
+
+
+@pytest.fixture
+def test_flags() -> FlagsT:
+    return {
+        "color": "w",
+        "wKing_can_castle": False,
+        "bKing_can_castle": False,
+        "previous_move": "",
+        "game_type": "PVP",
+        "player_color": "w",
+    }
+
+
+def get_chess_moves(test_board: Board, test_flags: FlagsT) -> list[str]:
+    test_position = Position(test_board.board_content, test_flags)
+    chess_moves = [x.chess_move for x in test_position.get_valid_moves()]
+    chess_moves.sort()
+    return chess_moves
+
+
+def test_pinned_piece_moves_on_pin_line(test_board: Board, test_flags: FlagsT) -> None:
+    # bishop pinned on the diagonal, knight pinned on the file
+    test_board.load_board_from_FEN("4r2k/8/8/b7/8/2B5/4N3/4K3")
+
+    chess_moves = get_chess_moves(test_board, test_flags)
+
+    assert not [x for x in chess_moves if x.startswith("Ne2")]
+    assert [x for x in chess_moves if x.startswith("Bc3")] == ["Bc3b4", "Bc3d2", "Bc3xa5"]
+
+
+def test_check_evasions(test_board: Board, test_flags: FlagsT) -> None:
+    # rook check: capture the checker, block it or move the king out of the line
+    test_board.load_board_from_FEN("4r2k/8/6B1/8/8/8/3P4/R3K3")
+
+    chess_moves = get_chess_moves(test_board, test_flags)
+
+    assert chess_moves == ["Bg6e4", "Bg6xe8", "Ke1d1", "Ke1f1", "Ke1f2"]
+
+
+def test_double_check_only_king_moves(test_board: Board, test_flags: FlagsT) -> None:
+    # rook on the file and knight
+    test_board.load_board_from_FEN("4r2k/8/8/8/8/3n4/8/R3K3")
+
+    chess_moves = get_chess_moves(test_board, test_flags)
+
+    assert chess_moves == ["Ke1d1", "Ke1d2", "Ke1f1"]
+
+
+def test_no_castle_out_of_check(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("4r2k/8/8/8/8/8/8/R3K2R")
+    test_flags["wKing_can_castle"] = True
+
+    chess_moves = get_chess_moves(test_board, test_flags)
+
+    assert "0-0" not in chess_moves
+    assert "0-0-0" not in chess_moves
+
+
+def test_en_passant_discovered_check(test_board: Board, test_flags: FlagsT) -> None:
+    # both pawns leave the 5th rank: the rook would give check to the king
+    test_board.load_board_from_FEN("8/8/8/KPp4r/8/8/8/7k")
+    test_flags["previous_move"] = "c7c5"
+
+    chess_moves = get_chess_moves(test_board, test_flags)
+
+    assert "b5xc6 e.p" not in chess_moves
+    assert "b5b6" in chess_moves
@@ -0,0 +1,113 @@
+"""
+
+Tests for position.py - make_move / unmake_move
+
+"""
+
+import pytest
+
+from bitboard import (
+    BLACK,
+    BLACK_KING_SIDE,
+    BLACK_QUEEN_SIDE,
+    KING,
+    PAWN,
+    QUEEN,
+    ROOK,
+    WHITE,
+    WHITE_QUEEN_SIDE,
+    square_from_coords,
+)
+from board import Board
+from common import FlagsT
+from move import Move
+from position import Position
+
+
+@pytest.fixture
+def test_board() -> Board:
+    # empty board used by tests
+    return Board("WOOD")
+
+
+@pytest.fixture
+def test_flags() -> FlagsT:
+    return {
+        "color": "w",
+        "wKing_can_castle": True,
+        "bKing_can_castle": True,
+        "previous_move": "",
+        "game_type": "PVP",
+        "player_color": "w",
+    }
+
+
+def get_move(position: Position, chess_move: str) -> Move:
+    return [x for x in position.valid_moves if x.chess_move == chess_move][0]
+
+
+def test_make_unmake_restores_position(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R")
+    test_position = Position(test_board.board_content, test_flags)
+    pieces = test_position.bitboard.pieces[:]
+    squares = test_position.bitboard.squares[:]
+
+    for move in test_position.valid_moves:
+        test_position.make_move(move)
+        assert test_position.color == BLACK
+        test_position.unmake_move()
+        assert test_position.bitboard.pieces == pieces, move.chess_move
+        assert test_position.bitboard.squares == squares, move.chess_move
+        assert test_position.color == WHITE
+        assert test_position.castling == 15
+
+    assert not test_position.history
+
+
+def test_make_castle(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("r3k2r/8/8/8/8/8/8/R3K2R")
+    test_position = Position(test_board.board_content, test_flags)
+
+    test_position.make_move(get_move(test_position, "0-0"))
+
+    squares = test_position.bitboard.squares
+    assert squares[square_from_coords("g1")] == WHITE * 6 + KING
+    assert squares[square_from_coords("f1")] == WHITE * 6 + ROOK
+    assert test_position.castling == BLACK_KING_SIDE | BLACK_QUEEN_SIDE
+
+
+def test_make_rook_capture_removes_castling(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("r3k2r/8/8/8/8/8/8/R3K2R")
+    test_position = Position(test_board.board_content, test_flags)
+
+    test_position.make_move(get_move(test_position, "Rh1xh8"))
+
+    assert test_position.castling == WHITE_QUEEN_SIDE | BLACK_QUEEN_SIDE
+
+
+def test_make_en_passant(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("4k3/3p4/8/4P3/8/8/8/4K3")
+    test_flags["color"] = "b"
+    test_position = Position(test_board.board_content, test_flags)
+
+    test_position.make_move(get_move(test_position, "d7d5"))
+    assert test_position.ep_square == square_from_coords("d6")
+
+    test_position.make_move(Move((3, 4), (2, 3), "e5xd6 e.p"))
+    assert test_position.bitboard.squares[square_from_coords("d6")] == WHITE * 6 + PAWN
+    assert test_position.bitboard.squares[square_from_coords("d5")] == -1
+
+    test_position.unmake_move()
+    assert test_position.bitboard.squares[square_from_coords("d5")] == BLACK * 6 + PAWN
+
+
+def test_make_promotion(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("7k/4P3/8/8/8/8/8/4K3")
+    test_position = Position(test_board.board_content, test_flags)
+
+    test_position.make_move(get_move(test_position, "e7e8"))
+    assert test_position.bitboard.squares[square_from_coords("e8")] == WHITE * 6 + QUEEN
+    assert test_position.in_check()
+
+    test_position.unmake_move()
+    assert test_position.bitboard.squares[square_from_coords("e7")] == WHITE * 6 + PAWN
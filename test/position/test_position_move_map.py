@@ -67,3 +67,34 @@ def test_move_map_castle(test_board: Board, test_flags: FlagsT) -> None:
 
     assert "Ke1f1" in chess_moves
     assert "0-0" in chess_moves
+
+
+def test_move_map_lazy(test_board: Board, test_flags: FlagsT) -> None:
+    test_board.load_board_from_FEN("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR")
+
+    test_position = Position(test_board.board_content, test_flags)
+    assert test_position._valid_moves is None
+    assert test_position.has_legal_moves()
+    assert test_position._valid_moves is None
+
+    assert [x.chess_move for x in test_position.moves_from((7, 6))] == ["Ng1f3", "Ng1h3"]
+    assert test_position.moves_from((7, 4)) == []
+    assert len(test_position.valid_moves) == 20
+
+    # moves played on a copy do not change the original position
+    test_copy = test_position.copy()
+    test_copy.make_move(test_copy.moves_from((6, 4))[0])
+    assert test_copy.color != test_position.color
+    assert len(test_position.valid_moves) == 20
+    assert test_copy.bitboard.squares != test_position.bitboard.squares
+
+
+def test_move_map_no_moves(test_board: Board, test_flags: FlagsT) -> None:
+    # stalemate
+    test_board.load_board_from_FEN("k7/8/1Q6/8/8/8/8/7K")
+    test_flags["color"] = "b"
+
+    test_position = Position(test_board.board_content, test_flags)
+
+    assert not test_position.has_legal_moves()
+    assert test_position.move_map == {}
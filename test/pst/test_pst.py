@@ -0,0 +1,57 @@
+"""
+
+Tests for pst.py - piece-square scores kept by Position and the shared evaluation
+
+"""
+
+import pytest
+
+from ai.evaluation import evaluate
+from bitboard import BLACK, WHITE
+from perft import REFERENCE_POSITIONS
+from position import Position, position_from_FEN
+from pst import MAX_PHASE, scores, tapered
+
+
+def check_scores(position: Position, depth: int) -> None:
+    # incremental scores are the scores computed from scratch, and are restored by unmake
+    state = (position.mg_score, position.eg_score, position.phase)
+    assert state == scores(position.bitboard.squares)
+    if depth == 0:
+        return
+    for move in position.legal_codes():
+        position.push(move)
+        check_scores(position, depth - 1)
+        position.pop()
+        assert (position.mg_score, position.eg_score, position.phase) == state
+
+
+@pytest.mark.parametrize("name", ["kiwipete", "position3", "position4"])
+def test_incremental_scores(name: str) -> None:
+    check_scores(position_from_FEN(REFERENCE_POSITIONS[name][0]), 2)
+
+
+def test_start_position() -> None:
+    position = position_from_FEN(REFERENCE_POSITIONS["start"][0])
+
+    assert position.phase == MAX_PHASE
+    assert position.mg_score == position.eg_score == 0
+    assert evaluate(position, WHITE) == evaluate(position, BLACK) == 0
+
+
+def test_mirrored_positions() -> None:
+    # same position with colors swapped and board flipped: same score for the other side
+    white = position_from_FEN("4k3/8/8/8/8/2N5/1P2Q3/4K3 w - -")
+    black = position_from_FEN("4k3/1p2q3/2n5/8/8/8/8/4K3 b - -")
+
+    assert evaluate(white, WHITE) > 0
+    assert evaluate(black, WHITE) < 0
+    assert evaluate(white, WHITE) == evaluate(black, BLACK)
+
+
+def test_tapered() -> None:
+    assert tapered(100, 50, MAX_PHASE) == 100
+    assert tapered(100, 50, 0) == 50
+    assert tapered(100, 50, MAX_PHASE // 2) == 75
+    # extra queens from promotions do not go over the middlegame score
+    assert tapered(100, 50, MAX_PHASE + 8) == 100
@@ -0,0 +1,142 @@
+"""
+
+Tests for tablebase.py - endgame tables generation and probing
+
+"""
+
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+import tablebase
+from ai.basic_ai import Basic_Ai
+from ai.minmax_ai import Minmax_Ai
+from bitboard import uci
+from position import position_from_FEN
+from tablebase import (
+    DRAW,
+    HEADER,
+    LOSS,
+    SYMMETRIES,
+    WIN,
+    Tablebase,
+    generate,
+    index_of,
+    piece_order,
+    signature_of,
+    squares_of_index,
+    table_size,
+)
+
+MATE_IN_ONE = "7k/8/6K1/8/8/8/8/1Q6 w - - 0 1"
+
+
+@pytest.fixture(scope="module")
+def kqk(tmp_path_factory: pytest.TempPathFactory) -> Iterator[Tablebase]:
+    directory = tmp_path_factory.mktemp("tablebases")
+    generate("KQvK", str(directory))
+    tables = Tablebase(str(directory))
+    yield tables
+    tables.close()
+
+
+def test_signature() -> None:
+    assert signature_of([(5, 60), (11, 4), (10, 3)]) == ("KQvK", True)
+    assert signature_of([(5, 60), (0, 52), (11, 4), (9, 3)]) == ("KRvKP", True)
+    assert signature_of([(5, 60), (2, 52), (1, 50), (11, 4)]) == ("KBNvK", False)
+    assert piece_order("KRvKP") == [5, 3, 11, 6]
+
+
+def test_index_symmetries() -> None:
+    squares = [45, 12, 30]
+    index = index_of(squares, 1, False)
+    # the 8 symmetric positions share one entry
+    for table in SYMMETRIES:
+        assert index_of([table[square] for square in squares], 1, False) == index
+    table_squares, color = squares_of_index(index, 3, False)
+    assert color == 1 and index_of(table_squares, 1, False) == index
+    assert index < table_size(3, False)
+    # with pawns, only the left / right mirror
+    assert index_of([45, 12, 30], 0, True) == index_of([42, 11, 25], 0, True)
+    assert index_of([45, 12, 30], 0, True) != index_of([21, 52, 38], 0, True)
+
+
+def test_generate(kqk: Tablebase) -> None:
+    data = kqk.table("KQvK")
+
+    assert data is not None
+    assert len(data) == HEADER.size + table_size(3, False)
+    # longest loss: mated in 10 moves
+    assert max(data[HEADER.size :]) == 21
+
+
+def test_probe(kqk: Tablebase) -> None:
+    assert kqk.probe(position_from_FEN(MATE_IN_ONE)) == (WIN, 1)
+    # checkmated, stalemate
+    assert kqk.probe(position_from_FEN("k7/1Q6/1K6/8/8/8/8/8 b - - 0 1")) == (LOSS, 0)
+    assert kqk.probe(position_from_FEN("k7/2Q5/1K6/8/8/8/8/8 b - - 0 1")) == (DRAW, 0)
+    # colors swapped
+    assert kqk.probe(position_from_FEN("1q6/8/8/8/8/6k1/8/7K b - - 0 1")) == (WIN, 1)
+    # no table, too many pieces
+    assert kqk.probe(position_from_FEN("7k/8/6K1/8/8/8/8/1R6 w - - 0 1")) is None
+    assert kqk.probe(position_from_FEN("7k/8/6K1/8/8/8/P7/1Q6 w - - 0 1")) is None
+    # no mating material
+    assert kqk.probe(position_from_FEN("7k/8/6K1/8/8/8/8/1B6 w - - 0 1")) == (DRAW, 0)
+
+
+def test_best_moves_mate(kqk: Tablebase) -> None:
+    position = position_from_FEN("8/8/8/3k4/8/8/8/K6Q b - - 0 1")
+    probe = kqk.probe(position)
+    assert probe is not None
+    result, plies = probe
+    assert result == LOSS
+
+    # both sides play the moves of the table: mate in the announced number of plies
+    for _ in range(plies):
+        position.push(kqk.best_move(position))
+    assert not position.legal_codes() and position.in_check()
+
+
+def test_ai_plays_table_move(kqk: Tablebase, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(tablebase, "_tablebase", kqk)
+    ai = Minmax_Ai(position_from_FEN(MATE_IN_ONE), "w", start=False)
+    ai.get_next_move()
+
+    assert uci(ai.move.code) == "b1b8"
+    assert ai.nodes == 0
+
+
+def test_basic_ai_plays_table_move(kqk: Tablebase, monkeypatch: pytest.MonkeyPatch) -> None:
+    # the one ply evaluation sees no difference between the queen moves, the table does
+    monkeypatch.setattr(tablebase, "_tablebase", kqk)
+    ai = Basic_Ai(position_from_FEN("8/8/8/2k5/8/8/8/K6Q w - - 0 1"), "w", start=False)
+    ai.use_book = False
+    ai.get_next_move()
+
+    assert ai.move.code == kqk.best_move(ai.position)
+
+
+def test_generate_signature(tmp_path: Path) -> None:
+    # weakest side first
+    with pytest.raises(ValueError):
+        generate("KvKQ", str(tmp_path))
+
+
+def test_ai_plays_table_underpromotion(monkeypatch: pytest.MonkeyPatch) -> None:
+    # c8=Q stalemates, the table move is c8=R
+    position = position_from_FEN("8/k1P5/2K5/8/8/8/8/8 w - - 0 1")
+    rook_promotion = next(move for move in position.legal_codes() if uci(move) == "c7c8r")
+
+    class Tables:
+        def best_move(self, position: object) -> int:
+            return rook_promotion
+
+    monkeypatch.setattr(tablebase, "_tablebase", Tables())
+    ai = Minmax_Ai(position, "w", start=False)
+    ai.use_book = False
+    ai.get_next_move()
+
+    assert ai.move.code == rook_promotion
+    assert ai.move.promotion == "R"
+    assert ai.nodes == 0
@@ -0,0 +1,51 @@
+"""
+
+Tests for tables.py
+
+"""
+
+from bitboard import (
+    BLACK,
+    WHITE,
+    bishop_attacks,
+    bishop_attacks_from,
+    king_attacks,
+    knight_attacks,
+    pawn_attacks,
+    rook_attacks,
+    rook_attacks_from,
+    square_from_coords,
+    squares_of,
+)
+from tables import BETWEEN, KING_ATTACKS, KNIGHT_ATTACKS, LINE, PAWN_ATTACKS
+
+
+def names(bb: int) -> list[str]:
+    return sorted(f"{chr(x % 8 + 97)}{8 - x // 8}" for x in squares_of(bb))
+
+
+def test_leaper_tables() -> None:
+    # same targets as the set-wise shifts
+    for square in range(64):
+        assert KNIGHT_ATTACKS[square] == knight_attacks(1 << square)
+        assert KING_ATTACKS[square] == king_attacks(1 << square)
+        assert PAWN_ATTACKS[WHITE][square] == pawn_attacks(1 << square, WHITE)
+        assert PAWN_ATTACKS[BLACK][square] == pawn_attacks(1 << square, BLACK)
+
+
+def test_slider_lookups() -> None:
+    occupied = 0x0042_1800_2400_8100  # a few blockers
+    for square in range(64):
+        assert rook_attacks_from(square, occupied) == rook_attacks(1 << square, occupied)
+        assert bishop_attacks_from(square, occupied) == bishop_attacks(1 << square, occupied)
+
+
+def test_between_and_line() -> None:
+    a1, c3, h8 = square_from_coords("a1"), square_from_coords("c3"), square_from_coords("h8")
+
+    assert names(BETWEEN[a1][h8]) == ["b2", "c3", "d4", "e5", "f6", "g7"]
+    assert BETWEEN[c3][a1] == BETWEEN[a1][c3] == 1 << square_from_coords("b2")
+    assert names(LINE[c3][h8]) == ["a1", "b2", "c3", "d4", "e5", "f6", "g7", "h8"]
+    assert names(LINE[a1][square_from_coords("a5")]) == [f"a{x}" for x in range(1, 9)]
+    # not on a common line
+    assert BETWEEN[a1][square_from_coords("b3")] == LINE[a1][square_from_coords("b3")] == 0
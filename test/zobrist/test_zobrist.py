@@ -0,0 +1,118 @@
+"""
+
+Tests for zobrist.py - incremental keys of Position and Board
+
+"""
+
+from collections import Counter
+
+import pytest
+
+from bitboard import uci
+from board import Board
+from common import FlagsT
+from move import Move
+from perft import REFERENCE_POSITIONS
+from position import Position, position_from_FEN
+from zobrist import pawns_key, pieces_key
+
+FEN_INITIAL_BOARD = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR"
+
+
+@pytest.fixture
+def test_board() -> Board:
+    board = Board("WOOD")
+    board.load_board_from_FEN(FEN_INITIAL_BOARD)
+    return board
+
+
+@pytest.fixture
+def test_flags() -> FlagsT:
+    return {
+        "color": "w",
+        "wKing_can_castle": True,
+        "bKing_can_castle": True,
+        "previous_move": "",
+        "game_type": "PVP",
+        "player_color": "w",
+    }
+
+
+def get_move(position: Position, chess_move: str) -> Move:
+    return next(x for x in position.valid_moves if x.chess_move == chess_move)
+
+
+def check_keys(position: Position, depth: int) -> None:
+    # incremental key is the key computed from scratch, and is restored by unmake
+    assert position.key == pieces_key(position.bitboard.squares) ^ position.state_key()
+    assert position.pawn_key == pawns_key(position.bitboard.squares)
+    if depth == 0:
+        return
+    key, pawn_key = position.key, position.pawn_key
+    for move in position.legal_codes():
+        position.push(move)
+        check_keys(position, depth - 1)
+        position.pop()
+        assert position.key == key
+        assert position.pawn_key == pawn_key
+
+
+@pytest.mark.parametrize("name", ["kiwipete", "position3", "position4"])
+def test_incremental_key(name: str) -> None:
+    check_keys(position_from_FEN(REFERENCE_POSITIONS[name][0]), 2)
+
+
+def test_null_move() -> None:
+    position = position_from_FEN(f"{FEN_INITIAL_BOARD} w KQkq -")
+    position.push(next(x for x in position.legal_codes() if uci(x) == "e2e4"))
+    key, pawn_key = position.key, position.pawn_key
+
+    # pass: the other side to move, no en passant any more
+    position.push_null()
+    assert position.color == 0 and position.ep_square == -1
+    assert position.key == pieces_key(position.bitboard.squares) ^ position.state_key()
+    assert position.pawn_key == pawn_key
+    position.pop()
+    assert position.key == key and position.color == 1
+
+
+def test_key_features() -> None:
+    start = position_from_FEN(f"{FEN_INITIAL_BOARD} w KQkq -").key
+
+    assert position_from_FEN(f"{FEN_INITIAL_BOARD} b KQkq -").key != start
+    assert position_from_FEN(f"{FEN_INITIAL_BOARD} w Kkq -").key != start
+    # en passant only counts when a pawn can take
+    fen = "rnbqkbnr/ppp1pppp/8/8/3pP3/8/PPPP1PPP/RNBQKBNR b KQkq"
+    assert position_from_FEN(f"{fen} e3").key != position_from_FEN(f"{fen} -").key
+    fen = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq"
+    assert position_from_FEN(f"{fen} e3").key == position_from_FEN(f"{fen} -").key
+
+
+def test_repetition(test_board: Board, test_flags: FlagsT) -> None:
+    position = Position(test_board.board_content, test_flags)
+    keys = [position.key]
+
+    for _ in range(2):
+        for uci_move in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+            position.push(next(x for x in position.legal_codes() if uci(x) == uci_move))
+            keys.append(position.key)
+
+    # start position reached 3 times, other positions twice
+    assert Counter(keys)[keys[0]] == 3
+    assert len(set(keys)) == 4
+
+
+def test_board_key(test_board: Board, test_flags: FlagsT) -> None:
+    start = test_board.key
+
+    for chess_move in ["e2e4", "Ng8f6", "Ng1f3", "Nf6g8", "Nf3g1"]:
+        position = Position(test_board.board_content, test_flags)
+        test_board.do_move(get_move(position, chess_move))
+        test_flags["color"] = "b" if test_flags["color"] == "w" else "w"
+        test_flags["previous_move"] = chess_move
+
+        position = Position(test_board.board_content, test_flags)
+        assert test_board.key ^ position.state_key() == position.key
+
+    assert test_board.key != start
+    assert test_board.key == pieces_key([x.code for line in test_board.board_content for x in line])
@@ -0,0 +1,50 @@
+"""
+
+Zobrist hashing: 64 bits key of a position, updated incrementally when a move is played
+
+one random number per (piece, square), per castling rights mask and per en passant file,
+plus one for black to move. The key of a position is the XOR of the numbers of its features.
+The en passant file only counts when a pawn can actually take en passant.
+
+"""
+
+from random import Random
+
+from bitboard import BLACK, PAWN, pawn_attacks
+
+# fixed seed: keys must stay the same between runs (opening book, tables saved on disk)
+_random = Random(0x5A0B1157)
+
+# index is piece code (color * 6 + piece type) * 64 + square
+PIECE_KEYS = [_random.getrandbits(64) for _ in range(12 * 64)]
+CASTLING_KEYS = [_random.getrandbits(64) for _ in range(16)]
+EP_KEYS = [_random.getrandbits(64) for _ in range(8)]
+BLACK_TO_MOVE = _random.getrandbits(64)
+
+
+def pieces_key(squares: list[int]) -> int:
+    # part of the key given by the pieces (mailbox of piece codes, -1 for empty squares)
+    key = 0
+    for square, piece in enumerate(squares):
+        if piece >= 0:
+            key ^= PIECE_KEYS[piece * 64 + square]
+    return key
+
+
+def pawns_key(squares: list[int]) -> int:
+    # part of the key given by the pawns only (key of the pawn structure)
+    key = 0
+    for square, piece in enumerate(squares):
+        if piece >= 0 and piece % 6 == PAWN:
+            key ^= PIECE_KEYS[piece * 64 + square]
+    return key
+
+
+def state_key(pieces: list[int], color: int, castling: int, ep_square: int) -> int:
+    # part of the key given by the side to move, castling rights and en passant square
+    key = CASTLING_KEYS[castling]
+    if color == BLACK:
+        key ^= BLACK_TO_MOVE
+    if ep_square >= 0 and pawn_attacks(1 << ep_square, color ^ 1) & pieces[color * 6 + PAWN]:
+        key ^= EP_KEYS[ep_square & 7]
+    return key